@@ -0,0 +1,808 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""Reusable pieces for calling AWS Query APIs (EC2, IAM, etc.) with requests - used by http_aws.py.
+
+Calls go through a requests.Session whose connection pool keeps one keep-alive connection per endpoint, so repeated
+calls to the same endpoint skip the TCP and TLS handshakes.  call_regions() fans a single API call out across many
+regions concurrently with a bounded pool of worker threads, and merge_xml_responses() combines the results into one
+XML document.
+
+AwsClient is a long-lived client for making many calls from one process.  It resolves the region and credentials once
+and signs every request itself with SigV4, caching the derived signing key per date, region and service, so each call
+only costs two HMACs to sign instead of a fresh botocore session and key derivation.
+
+RetryPolicy retries throttled, failed and dropped requests with exponential backoff and full jitter, waiting at least as
+long as any Retry-After header asks, and can also limit the request rate to each endpoint with a token bucket.  The
+bucket's rate is halved whenever the endpoint throttles a request and creeps back up as requests succeed, so many
+threads sharing one policy settle just under the endpoint's limit instead of all retrying into it at once.  Its
+RetryStats count the retries and the time spent waiting.
+
+iter_elements() and paginate() follow NextToken from page to page and parse each page incrementally as it streams in,
+yielding one result item at a time and discarding it once the caller moves on, so memory use stays bounded no matter
+how many items there are.
+
+The following Python modules are required and can be installed via pip:
+- requests
+- aws-requests-auth (and botocore, unless credentials are given explicitly)
+- lxml (only to paginate and to merge XML responses)
+"""
+import collections
+import configparser
+import contextlib
+import datetime
+import email.utils
+import hashlib
+import hmac
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import parse_qsl, quote, urlencode, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_API_VERSION = '2015-10-01'
+
+DEFAULT_URL_TEMPLATE = 'https://{service}.{region}.amazonaws.com'
+
+# Region used if none is given and none is configured
+DEFAULT_REGION = 'us-east-1'
+
+# Number of regions to call at once by default
+DEFAULT_WORKERS = 8
+
+# Error codes which mean a request was throttled and should be retried more slowly
+THROTTLING_CODES = frozenset([
+    'Throttling', 'ThrottlingException', 'ThrottledException', 'RequestThrottledException', 'TooManyRequestsException',
+    'ProvisionedThroughputExceededException', 'TransactionInProgressException', 'RequestLimitExceeded',
+    'BandwidthLimitExceeded', 'LimitExceededException', 'RequestThrottled', 'SlowDown', 'PriorRequestNotComplete',
+    'EC2ThrottledException',
+])
+
+# Error codes which mean a request failed for a transient reason and can be retried
+TRANSIENT_CODES = frozenset(['RequestTimeout', 'RequestTimeoutException', 'InternalError', 'InternalFailure',
+                             'ServiceUnavailable', 'Unavailable'])
+
+# HTTP status codes which can be retried whatever the error code
+RETRYABLE_STATUS_CODES = frozenset([429, 500, 502, 503, 504])
+
+
+class AwsApiError(requests.HTTPError):
+    """An AWS API call returned an error response."""
+    def __init__(self, response, code=None, message=None):
+        """
+        :param response: requests.Response with the error
+        :param code: AWS error code, e.g. Throttling or InvalidParameterValue
+        :param message: AWS error message
+        """
+        super().__init__('{} {}: {}'.format(response.status_code, code, message), response=response)
+        self.status_code = response.status_code
+        self.code = code
+        self.message = message
+
+
+def api_error(response):
+    """Create an AwsApiError from an error response, reading the error code and message from its XML body if any.
+
+    :param response: requests.Response with an error status code
+    :return: AwsApiError
+    """
+    code = message = None
+    try:
+        import lxml.etree as etree
+        root = etree.fromstring(response.content)
+        code = root.findtext('.//{*}Code')
+        message = root.findtext('.//{*}Message')
+    except Exception:
+        # Not XML, or lxml isn't installed - the status code will have to do
+        pass
+    return AwsApiError(response, code or response.reason, message or response.text)
+
+
+def retry_after(response):
+    """Return the number of seconds a response's Retry-After header asks to wait, or None if it has none.
+
+    :param response: requests.Response
+    :return: seconds as a float, or None
+    """
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=datetime.timezone.utc)
+    return max(0.0, (when - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    """Thread-safe token bucket which limits the rate of requests, adapting to throttling.
+
+    A throttled request halves the rate, down to min_rate, and every successful one raises it by a hundredth of
+    max_rate, up to max_rate.  The rate is halved at most once per second, since requests already in flight when the
+    first one was throttled are likely to be throttled too.
+    """
+    def __init__(self, rate, burst=None, min_rate=None):
+        """
+        :param rate: maximum requests per second
+        :param burst: (optional) maximum requests which can be made at once after a quiet period, by default one
+                      second's worth or 1
+        :param min_rate: (optional) the rate never drops below this many requests per second, by default a
+                         sixteenth of rate
+        """
+        if rate <= 0:
+            raise ValueError('rate must be positive, not {!r}'.format(rate))
+        self.max_rate = float(rate)
+        self.min_rate = float(min_rate) if min_rate is not None else self.max_rate / 16
+        self.rate = self.max_rate
+        self.burst = float(burst) if burst is not None else max(1.0, self.max_rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._slowed = None
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Take one token, waiting for it if there are none.
+
+        :return: seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def throttled(self):
+        """Slow down after the endpoint throttled a request."""
+        with self._lock:
+            now = time.monotonic()
+            if self._slowed is not None and now - self._slowed < 1:
+                return
+            self._slowed = now
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate / 2)
+
+    def succeeded(self):
+        """Speed back up after a request got through."""
+        with self._lock:
+            if self.rate < self.max_rate:
+                self._refill(time.monotonic())
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 100)
+
+
+class RetryStats:
+    """Thread-safe counts of the requests made through a RetryPolicy."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+        self.retry_wait = 0.0
+        self.rate_wait = 0.0
+        self.errors = collections.Counter()
+
+    def record_request(self, rate_wait):
+        with self._lock:
+            self.requests += 1
+            self.rate_wait += rate_wait
+
+    def record_retry(self, code, delay, throttled):
+        with self._lock:
+            self.retries += 1
+            self.retry_wait += delay
+            self.errors[code] += 1
+            if throttled:
+                self.throttled += 1
+
+    def summary(self):
+        """Return a dict of the counts.
+
+        requests: requests sent, including retries
+        retries: requests which were retried
+        throttled: retries because the request was throttled
+        retry_wait: total seconds spent backing off before retries
+        rate_wait: total seconds spent waiting for the rate limiter
+        errors: dict of error code (or exception name) to the number of retries it caused
+        """
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'retries': self.retries,
+                'throttled': self.throttled,
+                'retry_wait': self.retry_wait,
+                'rate_wait': self.rate_wait,
+                'errors': dict(self.errors),
+            }
+
+
+class RetryPolicy:
+    """Retries throttled and transient failures with jittered exponential backoff, optionally rate limiting requests
+    to each endpoint.  Safe to share between threads, and sharing one policy lets them all slow down together.
+    """
+    def __init__(self, max_attempts=5, base_delay=0.1, max_delay=20.0, rate=None, burst=None):
+        """
+        :param max_attempts: maximum number of times to send each request, 1 for no retries
+        :param base_delay: seconds to back off for before the first retry, doubling for each retry after it
+        :param max_delay: maximum seconds to back off for
+        :param rate: (optional) maximum requests per second to each endpoint, adjusted down when throttled
+        :param burst: (optional) maximum requests to send to an endpoint at once, see TokenBucket
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rate = rate
+        self.burst = burst
+        self.stats = RetryStats()
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, url):
+        """Return the TokenBucket for the endpoint of a URL, or None if there's no rate limit."""
+        if self.rate is None:
+            return None
+        host = urlparse(url).netloc
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.rate, self.burst)
+        return bucket
+
+    def backoff(self, attempt, retry_after=None):
+        """Return the seconds to wait before retrying.
+
+        Full jitter: a random time up to base_delay * 2 ** (attempt - 1), capped at max_delay, so that clients which
+        failed together don't all retry together.  Never less than a Retry-After the server asked for.
+
+        :param attempt: number of the attempt which failed, starting from 1
+        :param retry_after: (optional) seconds the server asked to wait
+        """
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+    def send(self, url, send):
+        """Send a request, retrying it until it succeeds, fails for good or runs out of attempts.
+
+        :param url: URL of the request, to rate limit its endpoint
+        :param send: callable which sends the request and returns a requests.Response
+        :return: requests.Response of the last attempt, which may be an error
+        :raises requests.ConnectionError, requests.Timeout: if the last attempt couldn't get a response
+        """
+        bucket = self.bucket(url)
+        attempt = 0
+        while True:
+            attempt += 1
+            self.stats.record_request(bucket.acquire() if bucket is not None else 0.0)
+            server_delay = None
+            try:
+                response = send()
+            except (requests.ConnectionError, requests.Timeout) as ex:
+                if attempt >= self.max_attempts:
+                    raise
+                code = type(ex).__name__
+                throttled = False
+            else:
+                if response.ok:
+                    if bucket is not None:
+                        bucket.succeeded()
+                    return response
+                code = api_error(response).code
+                throttled = response.status_code == 429 or code in THROTTLING_CODES
+                if throttled and bucket is not None:
+                    bucket.throttled()
+                retryable = throttled or code in TRANSIENT_CODES or \
+                    response.status_code in RETRYABLE_STATUS_CODES
+                if not retryable or attempt >= self.max_attempts:
+                    return response
+                server_delay = retry_after(response)
+                response.close()
+            delay = self.backoff(attempt, server_delay)
+            self.stats.record_retry(code, delay, throttled)
+            time.sleep(delay)
+
+
+def make_session(num_hosts=32, connections_per_host=DEFAULT_WORKERS):
+    """Create a requests.Session which keeps connections to many endpoints alive for reuse.
+
+    :param num_hosts: number of endpoints to keep connection pools for - any more and the least recently used pool
+                      is closed, which would throw away its keep-alive connections
+    :param connections_per_host: maximum number of idle connections kept open to each endpoint
+    :return: requests.Session
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=num_hosts, pool_maxsize=connections_per_host)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def boto_auth(host, region, service):
+    """Create a SigV4 auth handler which uses botocore to find credentials.
+
+    Credentials are gathered automatically from environment variables, AWS config files, or IAM Role.
+
+    :param host: host name of the endpoint, e.g. ec2.us-east-1.amazonaws.com
+    :param region: AWS region
+    :param service: AWS service, e.g. ec2
+    :return: requests auth handler
+    """
+    # This line will fail if you do not have both aws-requests-auth and botocore installed
+    from aws_requests_auth.boto_utils import BotoAWSRequestsAuth
+    return BotoAWSRequestsAuth(aws_host=host, aws_region=region, aws_service=service)
+
+
+def static_auth(access_key, secret_key, token=None):
+    """Return an auth factory, like boto_auth(), which signs requests with the given credentials.
+
+    :param access_key: AWS Access Key Id
+    :param secret_key: AWS Secret Access Key
+    :param token: (optional) session token for temporary credentials
+    :return: callable taking (host, region, service) and returning a requests auth handler
+    """
+    from aws_requests_auth.aws_auth import AWSRequestsAuth
+
+    def make_auth(host, region, service):
+        return AWSRequestsAuth(aws_access_key=access_key, aws_secret_access_key=secret_key, aws_host=host,
+                               aws_region=region, aws_service=service, aws_token=token)
+    return make_auth
+
+
+def default_region():
+    """Find the configured AWS region, the same way the AWS CLI does.
+
+    Checks the AWS_REGION and AWS_DEFAULT_REGION environment variables, then the profile named by AWS_PROFILE (or the
+    default profile) in ~/.aws/config.
+
+    :return: region name, DEFAULT_REGION if none is configured
+    """
+    region = os.environ.get('AWS_REGION') or os.environ.get('AWS_DEFAULT_REGION')
+    if region:
+        return region
+
+    profile = os.environ.get('AWS_PROFILE', 'default')
+    section = profile if profile == 'default' else 'profile {}'.format(profile)
+    config = configparser.ConfigParser()
+    try:
+        config.read(os.environ.get('AWS_CONFIG_FILE', os.path.expanduser('~/.aws/config')))
+    except configparser.Error:
+        return DEFAULT_REGION
+    return config.get(section, 'region', fallback=DEFAULT_REGION)
+
+
+def _hmac_sha256(key, msg):
+    return hmac.new(key, msg.encode('utf-8'), hashlib.sha256).digest()
+
+
+class Credentials:
+    """AWS credentials which are resolved once, plus a cache of the SigV4 signing keys derived from them."""
+    def __init__(self, access_key=None, secret_key=None, token=None):
+        """
+        :param access_key: (optional) AWS Access Key Id - by default botocore finds credentials in environment
+                           variables, AWS config files, or the IAM Role
+        :param secret_key: (optional) AWS Secret Access Key
+        :param token: (optional) session token for temporary credentials
+        """
+        if access_key:
+            self._source = None
+            self._frozen = (access_key, secret_key, token)
+        else:
+            # This line will fail if you do not have botocore installed
+            from botocore.session import Session
+            self._source = Session().get_credentials()
+            if self._source is None:
+                raise ValueError('No AWS credentials found')
+            self._frozen = None
+        self._lock = threading.Lock()
+        self._keys = {}
+        self._keys_secret = None
+
+    def get(self):
+        """Return the current (access key, secret key, token).
+
+        botocore credentials which expire, such as an IAM Role's, are refreshed by botocore when they get close to
+        expiring.
+        """
+        if self._source is None:
+            return self._frozen
+        frozen = self._source.get_frozen_credentials()
+        return frozen.access_key, frozen.secret_key, frozen.token
+
+    def signing_key(self, secret_key, datestamp, region, service):
+        """Return the SigV4 signing key for a day, region and service, deriving it only the first time it's needed.
+
+        :param secret_key: secret key from get()
+        :param datestamp: UTC date as YYYYMMDD
+        :param region: AWS region
+        :param service: AWS service
+        :return: signing key bytes
+        """
+        cache_key = (datestamp, region, service)
+        with self._lock:
+            if secret_key != self._keys_secret:
+                # New credentials, so every key derived from the old ones is useless
+                self._keys = {}
+                self._keys_secret = secret_key
+            key = self._keys.get(cache_key)
+            if key is None:
+                # Keys for earlier days will never be used again
+                self._keys = {k: v for k, v in self._keys.items() if k[0] == datestamp}
+                key = _hmac_sha256(('AWS4' + secret_key).encode('utf-8'), datestamp)
+                for part in (region, service, 'aws4_request'):
+                    key = _hmac_sha256(key, part)
+                self._keys[cache_key] = key
+        return key
+
+
+class SigV4Auth(requests.auth.AuthBase):
+    """requests auth handler which signs requests with AWS Signature Version 4 using cached signing keys."""
+    def __init__(self, credentials, region, service):
+        """
+        :param credentials: Credentials, which may be shared by many SigV4Auth handlers
+        :param region: AWS region
+        :param service: AWS service, e.g. ec2
+        """
+        self.credentials = credentials
+        self.region = region
+        self.service = service
+
+    def __call__(self, r):
+        r.headers.update(self.headers(r.method, r.url, r.body))
+        return r
+
+    def headers(self, method, url, body=None, now=None):
+        """Return the headers which sign a request.
+
+        :param method: HTTP method
+        :param url: full URL including the query string
+        :param body: (optional) request body
+        :param now: (optional) datetime.datetime to sign the request as of, in UTC
+        :return: dict of headers
+        """
+        if now is None:
+            now = datetime.datetime.now(datetime.timezone.utc)
+        amzdate = now.strftime('%Y%m%dT%H%M%SZ')
+        datestamp = now.strftime('%Y%m%d')
+        access_key, secret_key, token = self.credentials.get()
+
+        parsed = urlparse(url)
+        canonical_uri = quote(parsed.path or '/', safe='/-_.~')
+        query = sorted((quote(k, safe='-_.~'), quote(v, safe='-_.~'))
+                       for k, v in parse_qsl(parsed.query, keep_blank_values=True))
+        canonical_querystring = '&'.join('{}={}'.format(k, v) for k, v in query)
+
+        canonical_headers = 'host:{}\nx-amz-date:{}\n'.format(parsed.netloc, amzdate)
+        signed_headers = 'host;x-amz-date'
+        if token:
+            canonical_headers += 'x-amz-security-token:{}\n'.format(token)
+            signed_headers += ';x-amz-security-token'
+
+        if body is None:
+            body = b''
+        elif isinstance(body, str):
+            body = body.encode('utf-8')
+        payload_hash = hashlib.sha256(body).hexdigest()
+
+        canonical_request = '\n'.join((method, canonical_uri, canonical_querystring, canonical_headers, signed_headers,
+                                       payload_hash))
+        credential_scope = '{}/{}/{}/aws4_request'.format(datestamp, self.region, self.service)
+        string_to_sign = '\n'.join(('AWS4-HMAC-SHA256', amzdate, credential_scope,
+                                    hashlib.sha256(canonical_request.encode('utf-8')).hexdigest()))
+        key = self.credentials.signing_key(secret_key, datestamp, self.region, self.service)
+        signature = hmac.new(key, string_to_sign.encode('utf-8'), hashlib.sha256).hexdigest()
+
+        headers = {
+            'Authorization': 'AWS4-HMAC-SHA256 Credential={}/{}, SignedHeaders={}, Signature={}'.format(
+                access_key, credential_scope, signed_headers, signature),
+            'x-amz-date': amzdate,
+        }
+        if token:
+            headers['x-amz-security-token'] = token
+        return headers
+
+
+def sigv4_auth(credentials=None):
+    """Return an auth factory, like boto_auth(), whose handlers all share one set of cached credentials.
+
+    :param credentials: (optional) Credentials, found by botocore by default
+    :return: callable taking (host, region, service) and returning a SigV4Auth
+    """
+    if credentials is None:
+        credentials = Credentials()
+
+    def make_auth(host, region, service):
+        return SigV4Auth(credentials, region, service)
+    return make_auth
+
+
+def call_api(session, url, api, version=DEFAULT_API_VERSION, auth=None, timeout=30, stream=False, retry=None,
+             **params):
+    """Make a GET request to an AWS Query API.
+
+    :param session: requests.Session to send the request with
+    :param url: endpoint URL, e.g. https://ec2.us-east-1.amazonaws.com
+    :param api: name of the API to call, e.g. DescribeVpcs
+    :param version: API version
+    :param auth: requests auth handler
+    :param timeout: seconds to wait for the server
+    :param stream: don't read the body until the caller does, e.g. through response.raw
+    :param retry: (optional) RetryPolicy to retry and rate limit the request with
+    :param params: other query parameters for the API
+    :return: requests.Response
+    """
+    query = {'Action': api, 'Version': version}
+    query.update(params)
+    # Encode spaces as %20 rather than +, which is what SigV4 expects in the canonical query string
+    query_string = urlencode(query, quote_via=quote, safe='-_.~')
+
+    def send():
+        return session.get(url, params=query_string, auth=auth, timeout=timeout, stream=stream)
+    if retry is None:
+        return send()
+    return retry.send(url, send)
+
+
+def _localname(element):
+    tag = element.tag
+    return tag[tag.rfind('}') + 1:]
+
+
+def iter_elements(session, url, api, version=DEFAULT_API_VERSION, auth=None, page_size=None, timeout=30, retry=None,
+                  **params):
+    """Generate the result items of a Query API call as lxml elements, following NextToken through every page.
+
+    The items are the <item> elements of the result set directly under the response's root element, e.g. each
+    <vpcSet><item> of DescribeVpcs.  Each element is cleared once the caller asks for the next one, so copy anything
+    which needs to be kept.
+
+    :param session: requests.Session to send the requests with
+    :param url: endpoint URL, e.g. https://ec2.us-east-1.amazonaws.com
+    :param api: name of the API to call, e.g. DescribeVpcs
+    :param version: API version
+    :param auth: requests auth handler
+    :param page_size: (optional) MaxResults to ask for per page
+    :param timeout: seconds to wait for the server
+    :param retry: (optional) RetryPolicy to retry and rate limit each page's request with
+    :param params: other query parameters for the API
+    :return: generator of lxml elements
+    :raises AwsApiError: if any page returns an error
+    """
+    import lxml.etree as etree
+
+    token = None
+    while True:
+        query = dict(params)
+        if page_size:
+            query['MaxResults'] = page_size
+        if token:
+            query['NextToken'] = token
+        response = call_api(session, url, api, version, auth, timeout, stream=True, retry=retry, **query)
+        with contextlib.closing(response):
+            if not response.ok:
+                raise api_error(response)
+            # Let urllib3 undo any gzip encoding as the parser reads from the raw stream
+            response.raw.decode_content = True
+
+            token = None
+            root = None
+            for event, element in etree.iterparse(response.raw, events=('start', 'end')):
+                if event == 'start':
+                    if root is None:
+                        root = element
+                    continue
+                parent = element.getparent()
+                if parent is root:
+                    if _localname(element) == 'nextToken':
+                        token = element.text
+                elif parent is not None and parent.getparent() is root and _localname(element) == 'item':
+                    yield element
+                    # Free the item, and the ones before it, now that the caller is done with it
+                    element.clear()
+                    while element.getprevious() is not None:
+                        del parent[0]
+        if not token:
+            return
+
+
+def element_to_dict(element):
+    """Convert an element of an AWS Query API response to plain Python data.
+
+    Elements with only <item> children become lists, other elements with children become dicts keyed by tag name,
+    and leaf elements become their text.
+    """
+    children = list(element)
+    if not children:
+        return element.text
+    if all(_localname(child) == 'item' for child in children):
+        return [element_to_dict(child) for child in children]
+    return {_localname(child): element_to_dict(child) for child in children}
+
+
+def paginate(session, url, api, version=DEFAULT_API_VERSION, auth=None, page_size=None, timeout=30, retry=None,
+             **params):
+    """Generate the result items of a Query API call as dicts, following NextToken through every page.
+
+    Takes the same arguments as iter_elements().
+
+    :return: generator of dicts
+    :raises AwsApiError: if any page returns an error
+    """
+    for element in iter_elements(session, url, api, version, auth, page_size, timeout, retry, **params):
+        yield element_to_dict(element)
+
+
+def call_regions(session, api, regions, service='ec2', version=DEFAULT_API_VERSION, make_auth=boto_auth,
+                 max_workers=DEFAULT_WORKERS, url_template=DEFAULT_URL_TEMPLATE, timeout=30, retry=None, **params):
+    """Call the same API in many regions concurrently.
+
+    :param session: requests.Session from make_session(), shared by all of the worker threads
+    :param api: name of the API to call, e.g. DescribeVpcs
+    :param regions: iterable of region names
+    :param service: AWS service, e.g. ec2
+    :param version: API version
+    :param make_auth: callable taking (host, region, service) and returning a requests auth handler
+    :param max_workers: maximum number of calls in flight at once
+    :param url_template: endpoint URL, formatted with service and region
+    :param timeout: seconds to wait for each server
+    :param retry: (optional) RetryPolicy shared by every call, which rate limits each region's endpoint separately
+    :param params: other query parameters for the API
+    :return: OrderedDict of region to requests.Response, or to the requests.RequestException if the call failed,
+             in the same order as regions
+    """
+    regions = list(regions)
+    results = collections.OrderedDict((region, None) for region in regions)
+    if not regions:
+        return results
+
+    def call(region):
+        url = url_template.format(service=service, region=region)
+        host = urlparse(url).netloc
+        return call_api(session, url, api, version, make_auth(host, region, service), timeout, retry=retry, **params)
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(regions))) as pool:
+        futures = {pool.submit(call, region): region for region in regions}
+        for future in as_completed(futures):
+            try:
+                results[futures[future]] = future.result()
+            except requests.RequestException as ex:
+                results[futures[future]] = ex
+    return results
+
+
+def describe_regions(session, region='us-east-1', version=DEFAULT_API_VERSION, make_auth=boto_auth,
+                     url_template=DEFAULT_URL_TEMPLATE, retry=None):
+    """Return the names of all of the EC2 regions enabled for the account.
+
+    :param session: requests.Session to send the request with
+    :param region: region to ask
+    :param version: EC2 API version
+    :param make_auth: callable taking (host, region, service) and returning a requests auth handler
+    :param url_template: endpoint URL, formatted with service and region
+    :param retry: (optional) RetryPolicy to retry the request with
+    :return: list of region names
+    :raises requests.HTTPError: if the call fails
+    """
+    import lxml.etree as etree
+
+    url = url_template.format(service='ec2', region=region)
+    response = call_api(session, url, 'DescribeRegions', version,
+                        make_auth(urlparse(url).netloc, region, 'ec2'), retry=retry)
+    response.raise_for_status()
+    root = etree.fromstring(response.content)
+    return [element.text for element in root.iter('{*}regionName')]
+
+
+def merge_xml_responses(responses):
+    """Merge the responses from call_regions() into a single XML document.
+
+    Each response becomes a <Region name="..." status="..."> element containing the response's own XML, or its text
+    if it isn't XML.  Failed calls get an error attribute instead of a status.
+
+    :param responses: mapping of region to requests.Response or exception
+    :return: XML document as bytes
+    """
+    import lxml.etree as etree
+
+    merged = etree.Element('MultiRegionResponse')
+    for region, response in responses.items():
+        element = etree.SubElement(merged, 'Region', name=region)
+        if isinstance(response, Exception):
+            element.set('error', str(response))
+            continue
+        element.set('status', str(response.status_code))
+        try:
+            element.append(etree.fromstring(response.content))
+        except etree.XMLSyntaxError:
+            element.text = response.text
+    return etree.tostring(merged, pretty_print=True, xml_declaration=True, encoding='utf-8')
+
+
+class AwsClient:
+    """Long-lived client for one AWS service in one region, for making many calls from the same process.
+
+    The region and credentials are resolved once, connections are kept alive between calls, and requests are signed
+    with cached SigV4 signing keys.  Throttled and transient failures are retried with backoff.  Safe to share between
+    threads.
+    """
+    def __init__(self, service='ec2', region=None, endpoint=None, version=DEFAULT_API_VERSION, credentials=None,
+                 session=None, timeout=30, retry=None):
+        """
+        :param service: AWS service, e.g. ec2
+        :param region: (optional) AWS region, found by default_region() by default
+        :param endpoint: (optional) endpoint URL or host name, e.g. http://localhost:8000
+        :param version: API version
+        :param credentials: (optional) Credentials, which can be shared between clients
+        :param session: (optional) requests.Session, which can be shared between clients
+        :param timeout: seconds to wait for the server on each call
+        :param retry: (optional) RetryPolicy, which can be shared between clients - RetryPolicy() by default, or
+                      RetryPolicy(max_attempts=1) to never retry
+        """
+        self.service = service
+        self.region = region or default_region()
+        if endpoint is None:
+            endpoint = DEFAULT_URL_TEMPLATE.format(service=service, region=self.region)
+        self.url = endpoint if '://' in endpoint else 'https://{}'.format(endpoint)
+        self.version = version
+        self.credentials = credentials if credentials is not None else Credentials()
+        self.auth = SigV4Auth(self.credentials, self.region, service)
+        self.session = session if session is not None else make_session()
+        self.timeout = timeout
+        self.retry = retry if retry is not None else RetryPolicy()
+
+    def call(self, api, **params):
+        """Call an API and return its response.
+
+        :param api: name of the API to call, e.g. DescribeVpcs
+        :param params: other query parameters for the API
+        :return: requests.Response
+        :raises AwsApiError: if the API returns an error
+        """
+        response = call_api(self.session, self.url, api, self.version, self.auth, self.timeout, retry=self.retry,
+                            **params)
+        if not response.ok:
+            raise api_error(response)
+        return response
+
+    def iter_elements(self, api, page_size=None, **params):
+        """Generate the result items of an API call as lxml elements, following NextToken through every page.
+
+        Each element is cleared once the caller asks for the next one, see iter_elements().
+
+        :param api: name of the API to call, e.g. DescribeVpcs
+        :param page_size: (optional) MaxResults to ask for per page
+        :param params: other query parameters for the API
+        :return: generator of lxml elements
+        :raises AwsApiError: if any page returns an error
+        """
+        return iter_elements(self.session, self.url, api, self.version, self.auth, page_size, self.timeout, self.retry,
+                             **params)
+
+    def paginate(self, api, page_size=None, **params):
+        """Generate the result items of an API call as dicts, following NextToken through every page.
+
+        :param api: name of the API to call, e.g. DescribeVpcs
+        :param page_size: (optional) MaxResults to ask for per page
+        :param params: other query parameters for the API
+        :return: generator of dicts
+        :raises AwsApiError: if any page returns an error
+        """
+        return paginate(self.session, self.url, api, self.version, self.auth, page_size, self.timeout, self.retry,
+                        **params)
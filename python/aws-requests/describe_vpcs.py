@@ -1,17 +1,17 @@
 #!/usr/bin/env python
 # coding=utf-8
-"""Directly call the DescribeVpcs EC2 API using the aws-requests-auth module.
+"""Directly call the DescribeVpcs EC2 API using aws_client.AwsClient.
 
 This is intended to be an example which can be easily modified to call other APIs and/or services and is effectively
 a command-line programmatic replacement for using a graphical tool like Postman (https://www.getpostman.com).
 
+The endpoint and credentials can be overridden, e.g. to run against fake_aws_server.py without an AWS account:
+    describe_vpcs.py -e http://127.0.0.1:8000/ -c fake:fake
+
 The following Python modules are required and can be installed via pip:
 - requests
     * Requests allows you to send HTTP/1.1 requests. There’s no need to manually add query strings to your URLs.
     * http://docs.python-requests.org
-- aws-requests-auth
-    * AWS signature version 4 signing process for the requests module
-    * https://github.com/DavidMuller/aws-requests-auth
 - botocore
     * A low-level interface to a growing number of Amazon Web Services (used here to automatically gather AWS creds)
     * https://github.com/boto/botocore
@@ -22,48 +22,54 @@ The following Python modules are required and can be installed via pip:
     * Pygments is a generic syntax highlighter that supports 300 languages including JSON, XML, HTML, YAML, Java, etc.
     * http://pygments.org
 """
+import argparse
+import sys
+
+import lxml.etree as etree
 from pygments import highlight
-from pygments.lexers import guess_lexer
+from pygments.lexers import XmlLexer
 from pygments.formatters import TerminalFormatter
 import requests
-# This line will fail if you do not have both aws-requests-auth and botocore installed
-from aws_requests_auth.boto_utils import BotoAWSRequestsAuth
-
-
-if __name__ == '__main__':
-    # Configure AWS basics
-    aws_region = 'us-east-1'
-    aws_service = 'ec2'
-    aws_endpoint = '{}.{}.amazonaws.com'.format(aws_service, aws_region)
-
-    # Use Boto to automatically gather AWS credentials from environment variables, AWS config files, or IAM Role
-    auth = BotoAWSRequestsAuth(aws_host=aws_endpoint,
-                               aws_region=aws_region,
-                               aws_service=aws_service)
 
-    # Configure details of the API call
-    api = 'DescribeVpcs'
-    api_version = '2015-10-01'
-    params = {'Action': api, 'Version': api_version}
-    url = 'https://{}'.format(aws_endpoint)
+import aws_client
 
-    # Send a GET request
-    response = requests.get(url=url, params=params, auth=auth)
 
-    # Print response details
-    print('Response code: {}'.format(response.status_code))
-    print('Headers: {}'.format(response.headers))
-
-    # Convert the response content from an encoded byte string to a Unicode string
-    response_bytes = response.content
-    response_str = response_bytes.decode()
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='List every VPC with the DescribeVpcs EC2 API')
+    parser.add_argument('-r', '--region', help='The region to use. Overrides config/env settings.')
+    parser.add_argument('-e', '--endpoint', help='Override the default URL - e.g. http://127.0.0.1:8000/')
+    parser.add_argument('-c', '--creds',
+                        help="Override AWS Access Key Id and AWS Secret Access Key - i.e. <Access_Key>:<Secret_Key>")
+    args = parser.parse_args()
 
-    # If the respose is XML, ensure that it is nicely formatted with good indenting and newlines
-    if response_str.startswith('<?xml'):
-        import lxml.etree as etree
+    # Use the given credentials, or else use Boto to automatically gather AWS credentials from environment variables,
+    # AWS config files, or IAM Role
+    credentials = None
+    if args.creds:
+        access_key, sep, secret_key = args.creds.partition(':')
+        if not sep:
+            parser.error('Credentials must be provided in the format "<AWS_Access_Key_Id>:<AWS_Secret_Access_key>"')
+        credentials = aws_client.Credentials(access_key, secret_key)
 
-        response_bytes = etree.tostring(etree.fromstring(response.content), pretty_print=True)
+    # Configure AWS basics - the region defaults to the one in the environment or ~/.aws/config
+    client = aws_client.AwsClient(service='ec2', region=args.region, endpoint=args.endpoint, version='2015-10-01',
+                                  credentials=credentials)
 
-    # Pretty-print the content of the response with syntax highlighting for readability
-    highlighted_text = highlight(response_bytes, guess_lexer(response_str), TerminalFormatter())
-    print(highlighted_text)
+    # Send GET requests for every page of results, following NextToken from one page to the next.  Each page is parsed
+    # as it streams in, and each VPC is printed and then discarded as soon as it has been parsed.
+    count = 0
+    try:
+        for vpc in client.iter_elements('DescribeVpcs'):
+            # Pretty-print each VPC with syntax highlighting for readability
+            print(highlight(etree.tostring(vpc, pretty_print=True), XmlLexer(), TerminalFormatter()), end='')
+            count += 1
+    except aws_client.AwsApiError as ex:
+        sys.stderr.write('DescribeVpcs error after {} VPCs: {}\n'.format(count, ex))
+        sys.exit(-1)
+    except requests.exceptions.ConnectionError:
+        sys.stderr.write('Error connecting to host {!r}\n'.format(client.url))
+        sys.exit(-1)
+    except requests.exceptions.Timeout:
+        sys.stderr.write('Timed out waiting for host {!r} after {} VPCs\n'.format(client.url, count))
+        sys.exit(-1)
+    print('{} VPCs'.format(count))
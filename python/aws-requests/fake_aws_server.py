@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""A local stand-in for AWS Query APIs (EC2 style), for exercising http_aws.py and aws_client.py without AWS.
+
+Any Describe* action returns a paginated result set of generated items, following MaxResults and NextToken the same
+way EC2 does, e.g. DescribeVpcs returns <vpcSet><item><vpcId>vpc-00000000</vpcId>...</item></vpcSet>.
+DescribeRegions returns a fixed list of regions.  Requests are not authenticated.
+
+Responses can be slowed down and made to fail, to test client concurrency and retry settings:
+- latency and jitter delay every response
+- error_rate fails that fraction of requests with a 500 InternalError
+- throttle_rate fails that fraction of requests with a 503 RequestLimitExceeded
+- max_rps throttles requests beyond that rate, like a real API's rate limit
+Throttling responses carry a Retry-After header when retry_after is set.
+
+Usage: fake_aws_server.py [-h] [--port PORT] [--items ITEMS] ... (run with --help for every option)
+"""
+import argparse
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+from xml.sax.saxutils import escape
+
+XMLNS = 'http://ec2.amazonaws.com/doc/2015-10-01/'
+
+REGIONS = ['us-east-1', 'us-east-2', 'us-west-1', 'us-west-2', 'ca-central-1', 'eu-west-1', 'eu-west-2', 'eu-west-3',
+           'eu-central-1', 'eu-north-1', 'ap-south-1', 'ap-northeast-1', 'ap-northeast-2', 'ap-southeast-1',
+           'ap-southeast-2', 'sa-east-1']
+
+# Page size when the request doesn't give MaxResults
+DEFAULT_PAGE_SIZE = 1000
+
+
+class FakeAwsConfig:
+    """Behaviour of a FakeAwsServer, which can be changed while it is running."""
+    def __init__(self, items=100, page_size=DEFAULT_PAGE_SIZE, latency=0.0, jitter=0.0, error_rate=0.0,
+                 throttle_rate=0.0, max_rps=None, retry_after=None):
+        """
+        :param items: number of items in the result set of every Describe* action
+        :param page_size: items per page when the request doesn't give MaxResults
+        :param latency: seconds to delay every response by
+        :param jitter: up to this many extra seconds to delay each response by, at random
+        :param error_rate: fraction of requests to fail with 500 InternalError
+        :param throttle_rate: fraction of requests to fail with 503 RequestLimitExceeded
+        :param max_rps: (optional) throttle requests beyond this many per second
+        :param retry_after: (optional) seconds to send in the Retry-After header of throttling responses
+        """
+        self.items = items
+        self.page_size = page_size
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.max_rps = max_rps
+        self.retry_after = retry_after
+
+
+class _RateWindow:
+    """Counts requests in the current one-second window to enforce max_rps."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._window = 0
+        self._count = 0
+
+    def admit(self, max_rps):
+        with self._lock:
+            window = int(time.monotonic())
+            if window != self._window:
+                self._window = window
+                self._count = 0
+            self._count += 1
+            return self._count <= max_rps
+
+
+class FakeAwsHandler(BaseHTTPRequestHandler):
+    """Request handler for FakeAwsServer."""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self._handle(dict(parse_qsl(urlparse(self.path).query, keep_blank_values=True)))
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        params = dict(parse_qsl(urlparse(self.path).query, keep_blank_values=True))
+        params.update(parse_qsl(self.rfile.read(length).decode('utf-8'), keep_blank_values=True))
+        self._handle(params)
+
+    def log_message(self, fmt, *args):
+        if not self.server.quiet:
+            super().log_message(fmt, *args)
+
+    def _handle(self, params):
+        config = self.server.config
+        delay = config.latency + random.random() * config.jitter
+        if delay > 0:
+            time.sleep(delay)
+
+        self.server.count_request()
+        throttled = config.max_rps is not None and not self.server.rate_window.admit(config.max_rps)
+        roll = random.random()
+        if throttled or roll < config.throttle_rate:
+            headers = {} if config.retry_after is None else {'Retry-After': str(config.retry_after)}
+            self._send_error(503, 'RequestLimitExceeded', 'Request limit exceeded.', headers)
+        elif roll < config.throttle_rate + config.error_rate:
+            self._send_error(500, 'InternalError', 'An internal error has occurred.')
+        else:
+            action = params.get('Action', '')
+            if action == 'DescribeRegions':
+                self._send_xml(200, self._regions_body())
+            elif action.startswith('Describe') and len(action) > len('Describe'):
+                self._send_page(action, params)
+            else:
+                self._send_error(400, 'InvalidAction', 'The action {} is not valid for this web service.'.format(
+                    action))
+
+    def _send_xml(self, status, body, headers=None):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/xml;charset=UTF-8')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, status, code, message, headers=None):
+        self.server.count_error(code)
+        body = ('<?xml version="1.0" encoding="UTF-8"?>\n<Response><Errors><Error><Code>{}</Code><Message>{}</Message>'
+                '</Error></Errors><RequestID>{}</RequestID></Response>'.format(code, escape(message), uuid.uuid4()))
+        self._send_xml(status, body, headers)
+
+    def _regions_body(self):
+        items = ''.join('<item><regionName>{0}</regionName><regionEndpoint>ec2.{0}.amazonaws.com</regionEndpoint>'
+                        '</item>'.format(region) for region in REGIONS)
+        return ('<?xml version="1.0" encoding="UTF-8"?>\n<DescribeRegionsResponse xmlns="{}"><requestId>{}</requestId>'
+                '<regionInfo>{}</regionInfo></DescribeRegionsResponse>'.format(XMLNS, uuid.uuid4(), items))
+
+    def _send_page(self, action, params):
+        config = self.server.config
+        try:
+            start = int(params.get('NextToken') or 0)
+        except ValueError:
+            start = -1
+        try:
+            page_size = int(params.get('MaxResults') or config.page_size)
+        except ValueError:
+            page_size = 0
+        if start < 0 or page_size < 1:
+            self._send_error(400, 'InvalidParameterValue', 'Invalid NextToken or MaxResults')
+            return
+
+        # e.g. DescribeVpcs -> vpc, vpcSet and vpcId
+        noun = action[len('Describe'):]
+        noun = noun[0].lower() + noun[1:]
+        if noun.endswith('s'):
+            noun = noun[:-1]
+        prefix = noun.lower()
+        end = min(start + page_size, config.items)
+        items = ''.join('<item><{0}Id>{1}-{2:08x}</{0}Id><state>available</state><tagSet><item><key>Name</key>'
+                        '<value>{0} {2}</value></item></tagSet></item>'.format(noun, prefix, i)
+                        for i in range(start, end))
+        next_token = '<nextToken>{}</nextToken>'.format(end) if end < config.items else ''
+        self._send_xml(200, '<?xml version="1.0" encoding="UTF-8"?>\n<{0}Response xmlns="{1}"><requestId>{2}'
+                            '</requestId><{3}Set>{4}</{3}Set>{5}</{0}Response>'.format(action, XMLNS, uuid.uuid4(),
+                                                                                       noun, items, next_token))
+
+
+class FakeAwsServer(ThreadingHTTPServer):
+    """HTTP server which answers AWS Query API requests from generated fixtures.
+
+    Can be used as a context manager which runs the server in a background thread.
+    """
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, config=None, quiet=True):
+        """
+        :param host: address to listen on
+        :param port: port to listen on, 0 to pick a free one
+        :param config: (optional) FakeAwsConfig
+        :param quiet: don't log each request
+        """
+        super().__init__((host, port), FakeAwsHandler)
+        self.config = config if config is not None else FakeAwsConfig()
+        self.quiet = quiet
+        self.rate_window = _RateWindow()
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.errors = {}
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return 'http://{}:{}/'.format(host, port)
+
+    def count_request(self):
+        with self._stats_lock:
+            self.requests += 1
+
+    def count_error(self, code):
+        with self._stats_lock:
+            self.errors[code] = self.errors.get(code, 0) + 1
+
+    def start(self):
+        """Serve requests in a background thread."""
+        self._thread = threading.Thread(target=self.serve_forever, name='fake-aws-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def add_config_arguments(parser):
+    """Add command-line options for every FakeAwsConfig setting to an argparse parser."""
+    parser.add_argument('--items', type=int, default=100, help='number of items in every Describe* result set')
+    parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE,
+                        help='items per page when the request has no MaxResults')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='milliseconds to delay every response by')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='up to this many extra milliseconds of delay')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests to fail with a 500')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='fraction of requests to throttle with a 503')
+    parser.add_argument('--max-rps', type=float, help='throttle requests beyond this many per second')
+    parser.add_argument('--retry-after', type=int, help='seconds to send in Retry-After when throttling')
+
+
+def config_from_args(args):
+    """Create a FakeAwsConfig from options added by add_config_arguments()."""
+    return FakeAwsConfig(items=args.items, page_size=args.page_size, latency=args.latency_ms / 1000.0,
+                         jitter=args.jitter_ms / 1000.0, error_rate=args.error_rate,
+                         throttle_rate=args.throttle_rate, max_rps=args.max_rps, retry_after=args.retry_after)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Local stand-in for AWS Query APIs')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on')
+    parser.add_argument('--port', type=int, default=8000, help='port to listen on')
+    parser.add_argument('-q', '--quiet', action='store_true', help="don't log each request")
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server = FakeAwsServer(args.host, args.port, config_from_args(args), quiet=args.quiet)
+    print('Serving fake AWS Query APIs on {} - try: http_aws.py -c fake:fake -e {} DescribeVpcs'.format(
+        server.url, server.url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print('{} requests, errors: {}'.format(server.requests, server.errors))
+
+
+if __name__ == '__main__':
+    main()
@@ -24,30 +24,101 @@ The following Python modules are required and can be installed via pip:
 - colorama
     * Makes ANSI escape character sequences for producing colored terminal text
     * https://pypi.org/project/colorama/
+
+Only the standard library is imported when the script starts.  requests is imported once the arguments have been
+parsed, and pygments and colorama only when there is something to highlight or color, so --raw and --json output
+never load them at all.  The lexer is picked from the response's Content-Type rather than guessed by trying every
+lexer pygments has against the text.
 """
 import argparse
+import collections
+import functools
+import json
 import os
 import sys
+from urllib.parse import urlparse
+
 
-import colorama
-from colorama import Fore
-from pygments import highlight
-from pygments.lexers import guess_lexer
-from pygments.formatters import TerminalFormatter
-import requests
+@functools.lru_cache(maxsize=None)
+def _fore():
+    """Import and initialize colorama the first time it's needed, returning its Fore colors or None without it."""
+    try:
+        import colorama
+    except ImportError:
+        return None
+    colorama.init(autoreset=True)
+    return colorama.Fore
 
 
-def perror(msg, color=Fore.LIGHTRED_EX):
+def perror(msg, color='LIGHTRED_EX'):
     """ Print error message to sys.stderr.
 
     :param msg: an error message to print out
-    :param color: (optional) color escape to output error with
+    :param color: (optional) name of the colorama Fore color to output error with
     """
     err_msg = "{}\n".format(msg)
-    err_msg = color + err_msg + Fore.RESET
+    fore = _fore()
+    if fore is not None:
+        err_msg = getattr(fore, color) + err_msg + fore.RESET
     sys.stderr.write(err_msg)
 
 
+def lexer_for(content_type, text=''):
+    """Return the pygments lexer for a response, by its Content-Type or else by its first character.
+
+    :param content_type: (optional) Content-Type header of the response
+    :param text: (optional) the response text
+    :return: XML, JSON or plain text pygments lexer
+    """
+    from pygments.lexers.data import JsonLexer
+    from pygments.lexers.html import XmlLexer
+    from pygments.lexers.special import TextLexer
+
+    content_type = (content_type or '').lower()
+    if 'json' in content_type:
+        return JsonLexer()
+    if 'xml' in content_type:
+        return XmlLexer()
+    start = text.lstrip()[:1]
+    if start == '<':
+        return XmlLexer()
+    if start in ('{', '['):
+        return JsonLexer()
+    return TextLexer()
+
+
+def highlight(text, content_type=None):
+    """Syntax highlight text for the terminal.
+
+    :param text: str or UTF-8 bytes to highlight
+    :param content_type: (optional) Content-Type of the text, to pick the lexer with
+    :return: str with ANSI color escapes
+    """
+    import pygments
+    from pygments.formatters import TerminalFormatter
+
+    if isinstance(text, bytes):
+        text = text.decode('utf-8', 'replace')
+    _fore()
+    return pygments.highlight(text, lexer_for(content_type, text), TerminalFormatter())
+
+
+def xml_to_json(content):
+    """Convert an XML response to JSON, as an object with the root element's name as its only key.
+
+    :param content: response body as bytes
+    :return: JSON str, or None if the content isn't XML
+    """
+    import lxml.etree as etree
+    import aws_client
+
+    try:
+        root = etree.fromstring(content)
+    except etree.XMLSyntaxError:
+        return None
+    return json.dumps({etree.QName(root).localname: aws_client.element_to_dict(root)})
+
+
 # Set the pager(s) for use with the ppaged() method for displaying output using a pager
 if sys.platform.startswith('win'):
     pager_wrap = pager_chop = 'more'
@@ -117,7 +188,6 @@ def ppaged(msg, end='\n', wrap=False):
 
 def main(argv=None):
     """Run when invoked from the command-line."""
-    colorama.init(autoreset=True)
     # Create an arparse argument parser for parsing command-line arguments
     desc = 'A command line HTTP client for AWS services with an intuitive UI, XML support and syntax highlighting.'
     epilog = 'See the AWS Documentation for API references for each service:  https://docs.aws.amazon.com'
@@ -125,35 +195,41 @@ def main(argv=None):
     parser.add_argument('-r', '--region', help='The region to use. Overrides config/env settings.')
     parser.add_argument('-s', '--service', help='AWS service - e.g. ec2, s3, etc.', default='ec2')
     parser.add_argument('-e', '--endpoint',
-                        help="Override command's default URL with the given URL - e.g. ec2.us-east-1.amazonaws.com")
+                        help="Override command's default URL with the given URL - e.g. ec2.us-east-1.amazonaws.com "
+                             "(with --regions, {region} and {service} in it are filled in for each region)")
     parser.add_argument('-c', '--creds',
                         help="Override AWS Access Key Id and AWS Secret Access Key - i.e. <Access_Key>:<Secret_Key>")
     parser.add_argument('-v', '--version', help='API version to use for the service', default='2015-10-01')
+    parser.add_argument('-R', '--regions',
+                        help='Comma-separated regions to call the API in concurrently, or "all" for every EC2 region')
+    parser.add_argument('-j', '--jobs', type=int,
+                        help='Maximum number of regions to call at once with --regions (default: 8)')
+    parser.add_argument('-a', '--all-pages', action='store_true',
+                        help='Follow NextToken through every page of results, printing each item as it arrives')
+    parser.add_argument('--page-size', type=int, help='MaxResults to ask for per page with --all-pages')
+    parser.add_argument('--retries', type=int, default=4,
+                        help='Times to retry throttled, failed or dropped requests, with jittered exponential backoff')
+    parser.add_argument('--max-rate', type=float,
+                        help='Limit requests to each endpoint to this many per second, slowing down when throttled')
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument('--raw', action='store_true',
+                        help='Print only the response body exactly as received, without formatting or highlighting')
+    output.add_argument('--json', action='store_true',
+                        help='Print only the response converted to JSON, one line per item with --all-pages')
     parser.add_argument('-p', '--paginate', action='store_true', help='Paginate long output')
     parser.add_argument('-w', '--wrap', action='store_true',
                         help='Wrap long lines in paginated output instead of chopping them off')
     parser.add_argument('api', help='Name of the API to call - e.g. "DescribeVpcs" (for ec2 service)')
     args = parser.parse_args(argv)
 
+    # Deferred until now so that --help and usage errors don't pay for importing requests
+    import aws_client
+
     # --- Configure AWS basics ---
 
     # Configure AWS region
-    aws_region = 'us-east-1'    # Default if not overriden on command-line or specified in config file
-    if args.region:
-        aws_region = args.region
-    else:
-        import os
-        # Read the region from the ~/.aws/config file if it exists
-        try:
-            with open(os.path.expanduser('~/.aws/config')) as f:
-                data = f.read()
-                lines = data.splitlines()
-                for line in lines:
-                    if line.startswith('region = '):
-                        aws_region = line.split('region = ')[1]
-                        break
-        except (FileNotFoundError, PermissionError):
-            pass
+    # Use the region from the command-line, or else from the environment or ~/.aws/config, defaulting to us-east-1
+    aws_region = args.region or aws_client.default_region()
 
     # Configure AWS service
     if args.service:
@@ -168,39 +244,77 @@ def main(argv=None):
         aws_endpoint = '{}.{}.amazonaws.com'.format(aws_service, aws_region)
 
     if args.creds:
-        from aws_requests_auth.aws_auth import AWSRequestsAuth
         # Use the specified AWS access and secret key
         try:
             access_key, secret_key = args.creds.split(':')
-            auth = AWSRequestsAuth(aws_access_key=access_key,
-                                   aws_secret_access_key=secret_key,
-                                   aws_host=aws_endpoint,
-                                   aws_region=aws_region,
-                                   aws_service=aws_service)
         except ValueError as ex:
             perror('Credentials must be proviced in the format "<AWS_Access_Key_Id>:<AWS_Secret_Access_key>')
             return -1
+        credentials = aws_client.Credentials(access_key, secret_key)
     else:
-        # This line will fail if you do not have both aws-requests-auth and botocore installed
-        from aws_requests_auth.boto_utils import BotoAWSRequestsAuth
         # Use Boto to automatically gather AWS credentials from environment variables, AWS config files, or IAM Role
-        auth = BotoAWSRequestsAuth(aws_host=aws_endpoint,
-                                   aws_region=aws_region,
-                                   aws_service=aws_service)
+        try:
+            credentials = aws_client.Credentials()
+        except ValueError as ex:
+            perror(ex)
+            return -1
+    # Every request is signed with the same credentials and cached signing keys
+    make_auth = aws_client.sigv4_auth(credentials)
+    # Retry throttling and server errors, and rate limit each endpoint if asked to
+    retry = aws_client.RetryPolicy(max_attempts=args.retries + 1, rate=args.max_rate)
+
+    try:
+        if args.regions:
+            return call_regions(args, aws_region, aws_service, make_auth, retry)
+        return call_api(args, aws_region, aws_service, aws_endpoint, make_auth, retry)
+    finally:
+        print_retry_stats(retry.stats)
+
+
+def call_api(args, aws_region, aws_service, aws_endpoint, make_auth, retry):
+    """Call the API once, or page through all of its results, and print the response.
+
+    :param args: parsed command-line arguments
+    :param aws_region: AWS region
+    :param aws_service: AWS service
+    :param aws_endpoint: endpoint URL or host name
+    :param make_auth: callable taking (host, region, service) and returning a requests auth handler
+    :param retry: aws_client.RetryPolicy
+    :return: 0 on success, otherwise -1 (with --raw or --json, also if the API returned an error)
+    """
+    import requests
+    import aws_client
 
     # Configure details of the API call
     api = args.api
     api_version = args.version
-    params = {'Action': api, 'Version': api_version}
-    url = 'https://{}'.format(aws_endpoint)
+    url = aws_endpoint if '://' in aws_endpoint else 'https://{}'.format(aws_endpoint)
+    auth = make_auth(urlparse(url).netloc, aws_region, aws_service)
+
+    if args.all_pages:
+        return print_all_pages(args, url, auth, retry)
 
     # Send a GET request
     try:
         # TODO: Support PUT requests for Mutating API calls
-        response = requests.get(url=url, params=params, auth=auth)
+        response = aws_client.call_api(aws_client.make_session(), url, api, api_version, auth, retry=retry)
     except requests.exceptions.ConnectionError:
         perror('Error connecting to host {!r}'.format(url))
         return -1
+    except requests.exceptions.Timeout:
+        perror('Timed out waiting for host {!r}'.format(url))
+        return -1
+
+    if args.raw or args.json:
+        # Just the body, for scripts - they can tell success from the exit status
+        output_text = response.text
+        if args.json:
+            output_text = xml_to_json(response.content) or json.dumps({'text': response.text})
+        if args.paginate:
+            ppaged(output_text, wrap=args.wrap)
+        else:
+            print(output_text)
+        return 0 if response.ok else -1
 
     # Gather response details
     response_text = 'Response code: {}'.format(response.status_code)
@@ -209,6 +323,7 @@ def main(argv=None):
     # Convert the response content from an encoded byte string to a Unicode string
     response_bytes = response.content
     response_str = response_bytes.decode()
+    content_type = response.headers.get('Content-Type')
 
     # If the respose is XML, ensure that it is nicely formatted with good indenting and newlines
     if response_str.startswith('<?xml'):
@@ -219,7 +334,7 @@ def main(argv=None):
             pass
 
     # Pretty-print the content of the response with syntax highlighting for readability
-    highlighted_text = highlight(response_bytes, guess_lexer(response_str), TerminalFormatter())
+    highlighted_text = highlight(response_bytes, content_type)
     output_text = '{}\n{}\n{}'.format(response_text, header_text, highlighted_text)
     if args.paginate:
         ppaged(output_text, wrap=args.wrap)
@@ -228,5 +343,144 @@ def main(argv=None):
     return 0
 
 
+def print_retry_stats(stats):
+    """Print how many requests were retried and how long was spent waiting to sys.stderr, if there were any.
+
+    :param stats: aws_client.RetryStats
+    """
+    summary = stats.summary()
+    if summary['retries'] or summary['rate_wait']:
+        errors = ', '.join('{} x{}'.format(code, count) for code, count in sorted(summary['errors'].items()))
+        perror('Retried {} of {} requests ({}) after {:.2f} s of backoff, {:.2f} s waiting for the rate limit'.format(
+            summary['retries'], summary['requests'], errors or 'none', summary['retry_wait'], summary['rate_wait']),
+            color='YELLOW')
+
+
+def print_all_pages(args, url, auth, retry=None):
+    """Stream every result item of every page of the API call, printing each one as soon as it has been parsed.
+
+    :param args: parsed command-line arguments
+    :param url: endpoint URL
+    :param auth: requests auth handler
+    :param retry: (optional) aws_client.RetryPolicy to retry each page's request with
+    :return: 0 on success, otherwise -1
+    """
+    import lxml.etree as etree
+    import requests
+    import aws_client
+
+    if args.json:
+        def format_item(element):
+            return json.dumps(aws_client.element_to_dict(element)) + '\n'
+    elif args.raw:
+        def format_item(element):
+            return etree.tostring(element, encoding='unicode', with_tail=False) + '\n'
+    else:
+        def format_item(element):
+            return highlight(etree.tostring(element, pretty_print=True), 'text/xml')
+    session = aws_client.make_session()
+    # With a pager, the whole output has to be collected first
+    chunks = [] if args.paginate else None
+    count = 0
+    try:
+        for element in aws_client.iter_elements(session, url, args.api, args.version, auth, args.page_size,
+                                                retry=retry):
+            text = format_item(element)
+            if chunks is None:
+                print(text, end='')
+            else:
+                chunks.append(text)
+            count += 1
+    except aws_client.AwsApiError as ex:
+        perror('{} error after {} items: {}'.format(args.api, count, ex))
+        return -1
+    except requests.exceptions.ConnectionError:
+        perror('Error connecting to host {!r}'.format(url))
+        return -1
+    except requests.exceptions.Timeout:
+        perror('Timed out waiting for host {!r} after {} items'.format(url, count))
+        return -1
+
+    # Only the items themselves with --raw or --json, so the output stays one item per line
+    summary = '' if args.raw or args.json else '{} items\n'.format(count)
+    if chunks is None:
+        print(summary, end='')
+    else:
+        ppaged('{}{}'.format(''.join(chunks), summary), wrap=args.wrap)
+    return 0
+
+
+def call_regions(args, aws_region, aws_service, make_auth, retry=None):
+    """Call the API in many regions at once over pooled keep-alive connections and print the merged results.
+
+    :param args: parsed command-line arguments
+    :param aws_region: region to ask for the list of regions when --regions is "all"
+    :param aws_service: AWS service
+    :param make_auth: callable taking (host, region, service) and returning a requests auth handler
+    :param retry: (optional) aws_client.RetryPolicy shared by every call
+    :return: 0 if every call succeeded, otherwise -1
+    """
+    import requests
+    import aws_client
+
+    url_template = aws_client.DEFAULT_URL_TEMPLATE
+    if args.endpoint:
+        url_template = args.endpoint if '://' in args.endpoint else 'https://{}'.format(args.endpoint)
+
+    jobs = args.jobs or aws_client.DEFAULT_WORKERS
+    session = aws_client.make_session(connections_per_host=jobs)
+    try:
+        if args.regions == 'all':
+            regions = aws_client.describe_regions(session, aws_region, make_auth=make_auth,
+                                                  url_template=url_template, retry=retry)
+        else:
+            regions = [region.strip() for region in args.regions.split(',') if region.strip()]
+    except requests.exceptions.RequestException as ex:
+        perror('Error listing regions: {}'.format(ex))
+        return -1
+
+    responses = aws_client.call_regions(session, args.api, regions, aws_service, args.version, make_auth=make_auth,
+                                        max_workers=jobs, url_template=url_template, retry=retry)
+
+    failed = any(isinstance(response, Exception) or not response.ok for response in responses.values())
+    if args.json:
+        results = collections.OrderedDict()
+        for region, response in responses.items():
+            if isinstance(response, Exception):
+                results[region] = {'error': str(response)}
+            else:
+                body = xml_to_json(response.content)
+                results[region] = {'status': response.status_code,
+                                   'response': json.loads(body) if body else response.text}
+        print(json.dumps(results))
+        return -1 if failed else 0
+
+    status_lines = []
+    for region, response in responses.items():
+        if isinstance(response, Exception):
+            status_lines.append('{}: error connecting - {}'.format(region, response))
+        else:
+            status_lines.append('{}: response code {}'.format(region, response.status_code))
+
+    try:
+        merged = aws_client.merge_xml_responses(responses)
+        highlighted_text = merged.decode('utf-8') if args.raw else highlight(merged, 'text/xml')
+    except ImportError:
+        # Without lxml, just show each response one after another
+        highlighted_text = '\n'.join(response.text for response in responses.values()
+                                     if not isinstance(response, Exception))
+    if args.raw:
+        # No status lines either, just the XML
+        print(highlighted_text)
+        return -1 if failed else 0
+
+    output_text = '{}\n{}'.format('\n'.join(status_lines), highlighted_text)
+    if args.paginate:
+        ppaged(output_text, wrap=args.wrap)
+    else:
+        print(output_text)
+    return -1 if failed else 0
+
+
 if __name__ == '__main__':
     sys.exit(main())
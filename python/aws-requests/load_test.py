@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""Load generator for AWS Query API clients, for benchmarking concurrency and retry settings offline.
+
+Requests are started at a fixed target rate regardless of how quickly earlier ones finish (an open-loop test), and
+handed to a bounded pool of worker threads which share one AwsClient.  Latency is measured from when each request was
+scheduled to start, so time spent waiting for a free worker counts against it, just as it would for a real caller.
+
+Throttled and failed requests are retried by the client's aws_client.RetryPolicy, which can also limit the request
+rate, so the same test shows how well its backoff and rate limiting hold up throughput.
+
+By default a FakeAwsServer is started in-process - give a URL to test against another server instead.
+
+Usage: load_test.py [-h] [-r RATE] [-d DURATION] [-w WORKERS] ... [url] (run with --help for every option)
+"""
+import argparse
+import collections
+import queue
+import threading
+import time
+
+import requests
+
+import aws_client
+import fake_aws_server
+
+
+class LoadStats:
+    """Thread-safe results of a load test."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = []
+        self.successes = 0
+        self.failures = 0
+        self.errors = collections.Counter()
+        self.elapsed = 0.0
+
+    def record(self, latency, error_code=None):
+        """Record one request.
+
+        :param latency: seconds from when the request was scheduled until it finished, including any retries
+        :param error_code: (optional) AWS error code if the request finally failed
+        """
+        with self._lock:
+            self.latencies.append(latency)
+            if error_code is None:
+                self.successes += 1
+            else:
+                self.failures += 1
+                self.errors[error_code] += 1
+
+    def percentile(self, percentile):
+        """Return the given percentile (0-100) of the latencies in seconds, or None if there are none."""
+        with self._lock:
+            samples = sorted(self.latencies)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(round(percentile / 100.0 * (len(samples) - 1))))]
+
+    def summary(self):
+        """Return a dict summarizing the load test."""
+        total = self.successes + self.failures
+        return {
+            'requests': total,
+            'successes': self.successes,
+            'failures': self.failures,
+            'errors': dict(self.errors),
+            'elapsed': self.elapsed,
+            'throughput': self.successes / self.elapsed if self.elapsed > 0 else 0.0,
+            'latency_p50': self.percentile(50),
+            'latency_p90': self.percentile(90),
+            'latency_p99': self.percentile(99),
+            'latency_max': self.percentile(100),
+        }
+
+
+def error_code(call):
+    """Make a call, returning the error code it failed with, if any.
+
+    :param call: callable which makes one request and raises aws_client.AwsApiError or requests.RequestException
+    :return: None on success, otherwise the AWS error code or the name of the exception
+    """
+    try:
+        call()
+    except aws_client.AwsApiError as ex:
+        return ex.code
+    except requests.RequestException as ex:
+        return type(ex).__name__
+    return None
+
+
+def run_load(call, rate, duration, workers):
+    """Start calls at a fixed rate for a while, with a bounded number in progress at once.
+
+    :param call: callable returning None on success or else an error code, e.g. a wrapper around error_code()
+    :param rate: calls to start per second
+    :param duration: seconds to keep starting calls for
+    :param workers: maximum number of calls in progress at once
+    :return: LoadStats
+    """
+    stats = LoadStats()
+    scheduled = queue.Queue()
+
+    def worker():
+        while True:
+            start = scheduled.get()
+            if start is None:
+                return
+            code = call()
+            stats.record(time.monotonic() - start, code)
+
+    threads = [threading.Thread(target=worker, name='load-{}'.format(i)) for i in range(workers)]
+    for t in threads:
+        t.start()
+
+    begin = time.monotonic()
+    for i in range(int(rate * duration)):
+        start = begin + i / rate
+        delay = start - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        scheduled.put(start)
+    for _ in threads:
+        scheduled.put(None)
+    for t in threads:
+        t.join()
+    stats.elapsed = time.monotonic() - begin
+    return stats
+
+
+def format_summary(summary, retry_summary=None):
+    """Format a LoadStats summary for printing.
+
+    :param summary: dict from LoadStats.summary()
+    :param retry_summary: (optional) dict from aws_client.RetryStats.summary()
+    """
+    def ms(seconds):
+        return 'n/a' if seconds is None else '{:.1f} ms'.format(seconds * 1000)
+
+    lines = [
+        'Requests:    {} in {:.2f} s ({} succeeded, {} failed)'.format(summary['requests'], summary['elapsed'],
+                                                                       summary['successes'], summary['failures']),
+        'Throughput:  {:.1f} successful requests/sec'.format(summary['throughput']),
+        'Latency:     p50 {}, p90 {}, p99 {}, max {}'.format(ms(summary['latency_p50']), ms(summary['latency_p90']),
+                                                             ms(summary['latency_p99']), ms(summary['latency_max'])),
+    ]
+    if retry_summary is not None:
+        lines.append('Retries:     {} of {} requests sent ({} throttled), {:.2f} s backing off, {:.2f} s rate limited'
+                     .format(retry_summary['retries'], retry_summary['requests'], retry_summary['throttled'],
+                             retry_summary['retry_wait'], retry_summary['rate_wait']))
+        if retry_summary['errors']:
+            lines.append('Retried:     {}'.format(', '.join('{} x{}'.format(code, count) for code, count in
+                                                          sorted(retry_summary['errors'].items()))))
+    if summary['errors']:
+        lines.append('Errors:      {}'.format(', '.join('{} x{}'.format(code, count)
+                                                        for code, count in sorted(summary['errors'].items()))))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test an AWS Query API endpoint, by default a local fake one')
+    parser.add_argument('url', nargs='?', help='endpoint to test, instead of starting a fake server')
+    parser.add_argument('--api', default='DescribeVpcs', help='API to call')
+    parser.add_argument('-r', '--rate', type=float, default=50.0, help='requests to start per second')
+    parser.add_argument('-d', '--duration', type=float, default=10.0, help='seconds to keep starting requests for')
+    parser.add_argument('-w', '--workers', type=int, default=16, help='maximum number of requests in progress')
+    parser.add_argument('--retries', type=int, default=4, help='times to retry throttled or failed requests')
+    parser.add_argument('--backoff-ms', type=float, default=100.0,
+                        help='milliseconds to back off for before the first retry, doubling for each one after')
+    parser.add_argument('--max-backoff-ms', type=float, default=20000.0, help='most milliseconds to back off for')
+    parser.add_argument('--client-rps', type=float,
+                        help='limit requests to this many per second, slowing down further when throttled')
+    parser.add_argument('-a', '--all-pages', action='store_true', help='fetch every page of results per request')
+    parser.add_argument('--max-results', type=int, help='MaxResults to ask for per page')
+    fake = parser.add_argument_group('fake server options', 'used when no url is given')
+    fake_aws_server.add_config_arguments(fake)
+    args = parser.parse_args(argv)
+
+    server = None
+    url = args.url
+    if url is None:
+        server = fake_aws_server.FakeAwsServer(config=fake_aws_server.config_from_args(args)).start()
+        url = server.url
+
+    retry = aws_client.RetryPolicy(args.retries + 1, args.backoff_ms / 1000.0, args.max_backoff_ms / 1000.0,
+                                   rate=args.client_rps)
+    client = aws_client.AwsClient(endpoint=url, credentials=aws_client.Credentials('fake', 'fake'),
+                                  session=aws_client.make_session(connections_per_host=args.workers), retry=retry)
+    params = {} if args.max_results is None else {'MaxResults': args.max_results}
+    if args.all_pages:
+        def request():
+            for _ in client.paginate(args.api, **params):
+                pass
+    else:
+        def request():
+            client.call(args.api, **params)
+
+    try:
+        stats = run_load(lambda: error_code(request), args.rate, args.duration, args.workers)
+    finally:
+        if server is not None:
+            server.stop()
+    print(format_summary(stats.summary(), retry.stats.summary()))
+
+
+if __name__ == '__main__':
+    main()
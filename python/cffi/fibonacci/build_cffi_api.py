@@ -0,0 +1,21 @@
+#!/usr/bin/env python
+""" Build a CFFI extension module in API (out-of-line) mode for computing the nth fibonacci number.
+
+Unlike the ABI mode used by test_cffi.py, which opens libfibonacci.so with dlopen() at runtime, API mode compiles a
+real CPython extension module named _fib_cffi which calls the C function directly and is therefore faster to call.
+"""
+import cffi
+
+from fib_cffi import CDEF
+
+ffibuilder = cffi.FFI()
+
+# Declare the functions which should be callable from Python
+ffibuilder.cdef(CDEF)
+
+# Name of the extension module to create, the C source to include, and the sources to compile into it
+ffibuilder.set_source('_fib_cffi', '#include "fibonacci.h"', sources=['fibonacci.c'], include_dirs=['.'],
+                      extra_compile_args=['-std=c11', '-O3'])
+
+if __name__ == '__main__':
+    ffibuilder.compile(verbose=True)
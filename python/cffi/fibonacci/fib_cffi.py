@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+""" Shared CFFI declarations for the fibonacci library and a helper for calling its batch entry point.
+
+compute_fibonacci_batch() computes the fibonacci number for every n in a buffer with a single call across the FFI
+boundary, which amortizes the per-call overhead that dominates when calling compute_fibonacci() for small n.
+"""
+import array
+
+import cffi
+
+# C declarations shared by ABI mode (dlopen) and API mode (build_cffi_api.py)
+CDEF = """
+int compute_fibonacci(int n);
+void compute_fibonacci_batch(const int *ns, int *out, size_t count);
+"""
+
+# struct module formats of buffers holding native C ints, e.g. array.array('i') or a NumPy int32 array
+INT_FORMATS = ('i', '@i', '=i')
+
+
+def open_abi_library(path='./libfibonacci.so'):
+    """Load the fibonacci shared library in ABI mode.
+
+    :param path: path to libfibonacci.so
+    :return: tuple of (ffi, lib)
+    """
+    ffi = cffi.FFI()
+    ffi.cdef(CDEF)
+    return ffi, ffi.dlopen(path)
+
+
+def batch_caller(ffi, lib):
+    """Create a Python function which calls compute_fibonacci_batch in lib for whole buffers of n values.
+
+    :param ffi: FFI instance which declared CDEF
+    :param lib: library (ABI mode) or lib object of the API mode extension module
+    :return: function taking (ns, out=None) where ns and out support the buffer protocol and hold C ints; out is
+             allocated as an array.array('i') if not given and is returned after being filled in
+    """
+    int_size = ffi.sizeof('int')
+
+    def compute_fibonacci_batch(ns, out=None):
+        ns_view = memoryview(ns)
+        if ns_view.itemsize != int_size or ns_view.format not in INT_FORMATS:
+            raise TypeError('ns must be a buffer of C ints')
+        count = ns_view.nbytes // int_size
+        if out is None:
+            out = array.array('i', bytes(count * int_size))
+        out_view = memoryview(out)
+        if out_view.itemsize != int_size or out_view.format not in INT_FORMATS:
+            raise TypeError('out must be a buffer of C ints')
+        if out_view.nbytes < ns_view.nbytes:
+            raise ValueError('output buffer is smaller than the input buffer')
+
+        lib.compute_fibonacci_batch(ffi.from_buffer('int[]', ns),
+                                    ffi.from_buffer('int[]', out, require_writable=True),
+                                    count)
+        return out
+
+    return compute_fibonacci_batch
+
+
+if __name__ == '__main__':
+    import sys
+    import timeit
+
+    import fib_python
+
+    n = 20
+    try:
+        n = int(sys.argv[1])
+    except Exception:
+        pass
+
+    batch_size = 100000
+    try:
+        batch_size = int(sys.argv[2])
+    except Exception:
+        pass
+
+    ffi, libfib = open_abi_library()
+    compute_batch = batch_caller(ffi, libfib)
+    ns = array.array('i', [n]) * batch_size
+    out = array.array('i', [0]) * batch_size
+
+    fib_py = fib_python.compute_fibonacci(n)
+    compute_batch(ns, out)
+    if any(fib != fib_py for fib in out):
+        raise(ValueError(out[0]))
+
+    scalar_tot = timeit.timeit(lambda: [libfib.compute_fibonacci(x) for x in ns], number=1)
+    batch_tot = timeit.timeit(lambda: compute_batch(ns, out), number=1)
+    scalar_avg = scalar_tot / batch_size
+    batch_avg = batch_tot / batch_size
+
+    print("fib({}) = {}".format(n, fib_py))
+    print("CFFI/C scalar average time per n:  {0:.2g}".format(scalar_avg))
+    print("CFFI/C batch average time per n:   {0:.2g}".format(batch_avg))
+    print("CFFI/C batch speedup: {0:.2g} times".format(scalar_avg/batch_avg))
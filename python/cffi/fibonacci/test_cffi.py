@@ -5,6 +5,27 @@ in a non-recursive fashion and compare it to the pure Python implementation.
 import cffi
 import fib_python
 
+
+def test_batch():
+    import array
+    import fib_cffi
+    ffi, lib = fib_cffi.open_abi_library()
+    ns = array.array('i', [0, 1, 20])
+    assert([1, 2, 17711] == list(fib_cffi.batch_caller(ffi, lib)(ns)))
+
+
+def test_batch_rejects_non_int_buffers():
+    import array
+    import pytest
+    import fib_cffi
+    ffi, lib = fib_cffi.open_abi_library()
+    compute_batch = fib_cffi.batch_caller(ffi, lib)
+    with pytest.raises(TypeError):
+        compute_batch(array.array('f', [20.0]))
+    with pytest.raises(TypeError):
+        compute_batch(array.array('i', [20]), array.array('f', [0.0]))
+
+
 if __name__ == '__main__':
     import sys
     import timeit
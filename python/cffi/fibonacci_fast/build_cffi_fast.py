@@ -0,0 +1,20 @@
+#!/usr/bin/env python
+""" Build the _fib_fast CFFI extension module (API mode) wrapping the fast doubling C implementation in fib_fast.c.
+"""
+import cffi
+
+ffibuilder = cffi.FFI()
+
+# Declare the functions and constants which should be callable from Python
+ffibuilder.cdef("""
+#define FIB_OK ...
+#define FIB_OVERFLOW ...
+int compute_fibonacci_u64(int n, uint64_t *result);
+int compute_fibonacci_u128(int n, uint64_t *high, uint64_t *low);
+""")
+
+ffibuilder.set_source('_fib_fast', '#include "fib_fast.h"', sources=['fib_fast.c'], include_dirs=['.'],
+                      extra_compile_args=['-std=gnu11', '-O3'])
+
+if __name__ == '__main__':
+    ffibuilder.compile(verbose=True)
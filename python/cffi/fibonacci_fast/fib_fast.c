@@ -0,0 +1,145 @@
+/* File : fib_fast.c
+ *
+ * Fast doubling implementation of the fibonacci algorithm which needs O(log n) arithmetic operations instead of O(n),
+ * using the identities:
+ *
+ *     F(2k)   = F(k) * (2*F(k+1) - F(k))
+ *     F(2k+1) = F(k)^2 + F(k+1)^2
+ *
+ * The compiler's checked arithmetic builtins are used to detect overflow.  Every intermediate value is no larger than
+ * the final result, so overflow is only reported when the result itself doesn't fit.
+ */
+#include "fib_fast.h"
+
+/* The other examples return F(n+2) using the standard indexing where F(0) = 0 and F(1) = 1 */
+#define FIB_INDEX_OFFSET 2
+
+/* Index of the highest set bit in m, which must be non-zero */
+static int highest_bit(unsigned int m)
+{
+    int bit = 0;
+    while (m >>= 1)
+        bit++;
+    return bit;
+}
+
+int compute_fibonacci_u64(int n, uint64_t *result)
+{
+    if (n < 0)
+    {
+        /* Matches the loop based implementations, which never iterate for negative n */
+        *result = 1;
+        return FIB_OK;
+    }
+
+    unsigned int m = (unsigned int)n + FIB_INDEX_OFFSET;
+    uint64_t a = 0; /* F(k)   */
+    uint64_t b = 1; /* F(k+1) */
+    uint64_t c, d, t, aa, bb;
+
+    /* Walk every bit of m except the last one to get (F(k), F(k+1)) for k = m / 2 */
+    for (int bit = highest_bit(m); bit > 0; bit--)
+    {
+        /* c = F(2k) = a * (b + (b - a)) - computed this way since 2*b may overflow even when c doesn't */
+        if (__builtin_add_overflow(b, b - a, &t) || __builtin_mul_overflow(a, t, &c))
+            return FIB_OVERFLOW;
+        /* d = F(2k+1) = a*a + b*b */
+        if (__builtin_mul_overflow(a, a, &aa) || __builtin_mul_overflow(b, b, &bb) ||
+            __builtin_add_overflow(aa, bb, &d))
+            return FIB_OVERFLOW;
+
+        if ((m >> bit) & 1)
+        {
+            a = d;
+            if (__builtin_add_overflow(c, d, &b))
+                return FIB_OVERFLOW;
+        }
+        else
+        {
+            a = c;
+            b = d;
+        }
+    }
+
+    /* Only compute the one value needed for the last bit, F(m+1) may overflow even when F(m) doesn't */
+    if (m & 1)
+    {
+        if (__builtin_mul_overflow(a, a, &aa) || __builtin_mul_overflow(b, b, &bb) ||
+            __builtin_add_overflow(aa, bb, result))
+            return FIB_OVERFLOW;
+    }
+    else if (__builtin_add_overflow(b, b - a, &t) || __builtin_mul_overflow(a, t, result))
+    {
+        return FIB_OVERFLOW;
+    }
+    return FIB_OK;
+}
+
+#ifdef __SIZEOF_INT128__
+/* Same algorithm as compute_fibonacci_u64() using 128-bit integers */
+static int compute_fibonacci_uint128(int n, unsigned __int128 *result)
+{
+    if (n < 0)
+    {
+        *result = 1;
+        return FIB_OK;
+    }
+
+    unsigned int m = (unsigned int)n + FIB_INDEX_OFFSET;
+    unsigned __int128 a = 0;
+    unsigned __int128 b = 1;
+    unsigned __int128 c, d, t, aa, bb;
+
+    for (int bit = highest_bit(m); bit > 0; bit--)
+    {
+        if (__builtin_add_overflow(b, b - a, &t) || __builtin_mul_overflow(a, t, &c))
+            return FIB_OVERFLOW;
+        if (__builtin_mul_overflow(a, a, &aa) || __builtin_mul_overflow(b, b, &bb) ||
+            __builtin_add_overflow(aa, bb, &d))
+            return FIB_OVERFLOW;
+
+        if ((m >> bit) & 1)
+        {
+            a = d;
+            if (__builtin_add_overflow(c, d, &b))
+                return FIB_OVERFLOW;
+        }
+        else
+        {
+            a = c;
+            b = d;
+        }
+    }
+
+    if (m & 1)
+    {
+        if (__builtin_mul_overflow(a, a, &aa) || __builtin_mul_overflow(b, b, &bb) ||
+            __builtin_add_overflow(aa, bb, result))
+            return FIB_OVERFLOW;
+    }
+    else if (__builtin_add_overflow(b, b - a, &t) || __builtin_mul_overflow(a, t, result))
+    {
+        return FIB_OVERFLOW;
+    }
+    return FIB_OK;
+}
+#endif
+
+int compute_fibonacci_u128(int n, uint64_t *high, uint64_t *low)
+{
+#ifdef __SIZEOF_INT128__
+    unsigned __int128 value;
+    int status = compute_fibonacci_uint128(n, &value);
+    if (status == FIB_OK)
+    {
+        *high = (uint64_t)(value >> 64);
+        *low = (uint64_t)value;
+    }
+    return status;
+#else
+    (void)n;
+    (void)high;
+    (void)low;
+    return FIB_OVERFLOW;
+#endif
+}
@@ -0,0 +1,21 @@
+/* File : fib_fast.h
+ *
+ * Header declaring the public interface for the fast doubling fibonacci algorithms.
+ *
+ * Like compute_fibonacci() in the other examples, these compute fib(0) = 1, fib(1) = 2, fib(2) = 3, ...
+ *
+ * Each function returns FIB_OK and stores the result on success or returns FIB_OVERFLOW if the result does not fit.
+ */
+
+#pragma once
+#include <stdint.h> // uint64_t
+
+#define FIB_OK 0
+#define FIB_OVERFLOW 1
+
+/* Compute the nth fibonacci number as a 64-bit unsigned integer */
+extern int compute_fibonacci_u64(int n, uint64_t *result);
+
+/* Compute the nth fibonacci number as a 128-bit unsigned integer, returned as high and low 64-bit halves.
+ * Always returns FIB_OVERFLOW if the compiler doesn't support __int128. */
+extern int compute_fibonacci_u128(int n, uint64_t *high, uint64_t *low);
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+""" Overflow-safe O(log n) fibonacci using the fast doubling algorithm.
+
+The loop based compute_fibonacci() examples are O(n), and the C and Cython versions silently overflow a C int past
+n=44.  compute_fibonacci_fast() gives exact results for any n and automatically picks the cheapest implementation which
+can hold the result:
+
+- n <= U64_MAX_N:   C fast doubling with uint64_t arithmetic
+- n <= U128_MAX_N:  C fast doubling with unsigned __int128 arithmetic
+- otherwise:        Python fast doubling with arbitrary precision integers
+
+The C implementations come from the _fib_fast CFFI extension module (build it with "python build_cffi_fast.py").  If
+it hasn't been built, or if the C code reports an overflow, the Python implementation is used.
+
+Like the other examples, fib(0) = 1, fib(1) = 2, fib(2) = 3, ...
+"""
+try:
+    from _fib_fast import ffi, lib
+except ImportError:
+    ffi = lib = None
+
+# Largest n whose result fits in 64 and 128 bits - i.e. F(93) < 2**64 and F(186) < 2**128
+U64_MAX_N = 91
+U128_MAX_N = 184
+
+
+def compute_fibonacci_doubling(n):
+    """
+    Computes fibonacci sequence using fast doubling with Python's arbitrary precision integers
+    """
+    if n < 0:
+        return 1
+
+    # Standard indexing where F(0) = 0 and F(1) = 1
+    m = n + 2
+    a, b = 0, 1  # F(k), F(k+1)
+    for bit in bin(m)[2:]:
+        # Walk the bits of m from the most significant, doubling k each step and adding one if the bit is set
+        c = a * ((b << 1) - a)  # F(2k)
+        d = a * a + b * b       # F(2k+1)
+        if bit == '1':
+            a, b = d, c + d
+        else:
+            a, b = c, d
+    return a
+
+
+def compute_fibonacci_fast(n):
+    """
+    Computes fibonacci sequence exactly, using the fastest available implementation for the size of n
+    """
+    if lib is not None:
+        if n <= U64_MAX_N:
+            result = ffi.new('uint64_t *')
+            if lib.compute_fibonacci_u64(n, result) == lib.FIB_OK:
+                return result[0]
+        elif n <= U128_MAX_N:
+            parts = ffi.new('uint64_t[2]')
+            if lib.compute_fibonacci_u128(n, parts, parts + 1) == lib.FIB_OK:
+                return (parts[0] << 64) | parts[1]
+    return compute_fibonacci_doubling(n)
+
+
+if __name__ == '__main__':
+    import sys
+    import timeit
+
+    import fib_python
+
+    n = 20
+    try:
+        n = int(sys.argv[1])
+    except Exception:
+        pass
+
+    number_of_times = 10000
+    try:
+        number_of_times = int(sys.argv[2])
+    except Exception:
+        pass
+
+    fib_py = fib_python.compute_fibonacci(n)
+    fib_fast = compute_fibonacci_fast(n)
+    if fib_py != fib_fast:
+        raise(ValueError(fib_fast))
+
+    py_tot = timeit.timeit("compute_fibonacci({})".format(n),
+                           setup="from fib_python import compute_fibonacci",
+                           number=number_of_times)
+    fast_tot = timeit.timeit("compute_fibonacci_fast({})".format(n),
+                             setup="from fib_fast import compute_fibonacci_fast",
+                             number=number_of_times)
+    py_avg = py_tot / number_of_times
+    fast_avg = fast_tot / number_of_times
+
+    if fib_py.bit_length() < 10000:
+        print("fib({}) = {}".format(n, fib_py))
+    else:
+        print("fib({}) has {} bits".format(n, fib_py.bit_length()))
+    print("C extension available: {}".format(lib is not None))
+    print("Python loop average time:     {0:.2g}".format(py_avg))
+    print("Fast doubling average time:   {0:.2g}".format(fast_avg))
+    print("Fast doubling speedup: {0:.2g} times".format(py_avg/fast_avg))
@@ -1,8 +1,24 @@
 """ Cython implementation for computing the nth fibonacci number in a
 non-recursive fashion.
 """
+from cpython cimport array
+import array
 
-cpdef int compute_fibonacci_cython(int n):
+cdef array.array _int_array_template = array.array('i', [])
+
+# Buffer format strings meaning a native C int
+INT_FORMATS = ('i', '@i', '=i')
+
+
+cdef check_int_buffer(obj):
+    """ Raise TypeError, as the CFFI and SWIG batch functions do, unless obj is a buffer of C ints - otherwise the typed
+    memoryview would fail with a ValueError about a dtype mismatch.
+    """
+    view = memoryview(obj)
+    if view.itemsize != sizeof(int) or view.format not in INT_FORMATS:
+        raise TypeError("buffers must contain C ints")
+
+cpdef int compute_fibonacci_cython(int n) nogil:
     """ Compute the nth fibonacci number in a non-recursive fashion.
     """
     cdef int a, b, intermediate, x
@@ -12,3 +28,26 @@ cpdef int compute_fibonacci_cython(int n):
         a = a + b
         b = intermediate
     return a
+
+
+def compute_fibonacci_cython_batch(ns, out=None):
+    """ Compute the fibonacci number for every n in a buffer of C ints in a single call.
+
+    ns can be any object supporting the buffer protocol, such as an array.array('i') or a NumPy int32 array.  The
+    results are written to out, which is allocated as an array.array('i') if not given, and out is returned.
+    """
+    check_int_buffer(ns)
+    cdef const int[::1] ns_view = ns
+    if out is None:
+        out = array.clone(_int_array_template, ns_view.shape[0], zero=False)
+    else:
+        check_int_buffer(out)
+    cdef int[::1] out_view = out
+    if out_view.shape[0] < ns_view.shape[0]:
+        raise ValueError("output buffer is smaller than the input buffer")
+
+    cdef Py_ssize_t i
+    with nogil:
+        for i in range(ns_view.shape[0]):
+            out_view[i] = compute_fibonacci_cython(ns_view[i])
+    return out
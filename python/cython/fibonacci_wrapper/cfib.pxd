@@ -1,2 +1,3 @@
 cdef extern from "fibonacci.h":
     int compute_fibonacci(int n)
+    void compute_fibonacci_batch(const int *ns, int *out, size_t count) nogil
@@ -1,6 +1,44 @@
 # distutils: libraries = "fibonacci"
 # distutils: library_dirs = "."
+from cpython cimport array
+import array
 cimport cfib
 
+cdef array.array _int_array_template = array.array('i', [])
+
+# Buffer format strings meaning a native C int
+INT_FORMATS = ('i', '@i', '=i')
+
+
+cdef check_int_buffer(obj):
+    """ Raise TypeError, as the CFFI and SWIG batch functions do, unless obj is a buffer of C ints - otherwise the typed
+    memoryview would fail with a ValueError about a dtype mismatch.
+    """
+    view = memoryview(obj)
+    if view.itemsize != sizeof(int) or view.format not in INT_FORMATS:
+        raise TypeError("buffers must contain C ints")
+
 cpdef int compute_fibonacci_wrapper(int n):
     return cfib.compute_fibonacci(n)
+
+def compute_fibonacci_wrapper_batch(ns, out=None):
+    """ Compute the fibonacci number for every n in a buffer of C ints with a single call into the C library.
+
+    ns can be any object supporting the buffer protocol, such as an array.array('i') or a NumPy int32 array.  The
+    results are written to out, which is allocated as an array.array('i') if not given, and out is returned.
+    """
+    check_int_buffer(ns)
+    cdef const int[::1] ns_view = ns
+    if out is None:
+        out = array.clone(_int_array_template, ns_view.shape[0], zero=False)
+    else:
+        check_int_buffer(out)
+    cdef int[::1] out_view = out
+    if out_view.shape[0] < ns_view.shape[0]:
+        raise ValueError("output buffer is smaller than the input buffer")
+    if ns_view.shape[0] == 0:
+        return out
+
+    with nogil:
+        cfib.compute_fibonacci_batch(&ns_view[0], &out_view[0], ns_view.shape[0])
+    return out
@@ -2,6 +2,7 @@
  *
  * Implementation of the algorithm in C to be compiled to a dynamic library
  */
+#include "fibonacci.h"
 
 int compute_fibonacci(int n)
 {
@@ -16,3 +17,11 @@ int compute_fibonacci(int n)
     }
     return a;
 }
+
+void compute_fibonacci_batch(const int *ns, int *out, size_t count)
+{
+    for (size_t i = 0; i < count; i++)
+    {
+        out[i] = compute_fibonacci(ns[i]);
+    }
+}
@@ -4,4 +4,9 @@
  */
 
 #pragma once
+#include <stddef.h> // size_t
+
 extern int compute_fibonacci(int n);
+
+/* Compute fibonacci numbers for count values of n in one call, storing them in out */
+extern void compute_fibonacci_batch(const int *ns, int *out, size_t count);
@@ -2,3 +2,18 @@ import cyfib
 
 def test_valid():
     assert(17711 == cyfib.compute_fibonacci_wrapper(20))
+
+def test_batch():
+    import array
+    ns = array.array('i', [0, 1, 20])
+    assert([1, 2, 17711] == list(cyfib.compute_fibonacci_wrapper_batch(ns)))
+
+def test_batch_rejects_non_int_buffers():
+    import array
+    import pytest
+    with pytest.raises(TypeError):
+        cyfib.compute_fibonacci_wrapper_batch(array.array('f', [20.0]))
+    with pytest.raises(TypeError):
+        cyfib.compute_fibonacci_wrapper_batch(array.array('i', [20]), array.array('f', [0.0]))
+    with pytest.raises(ValueError):
+        cyfib.compute_fibonacci_wrapper_batch(array.array('i', [0, 1, 20]), array.array('i', [0]))
@@ -1,18 +1,53 @@
+from cpython.buffer cimport PyObject_GetBuffer, PyBuffer_Release, PyBUF_ANY_CONTIGUOUS, PyBUF_FORMAT, PyBUF_WRITABLE
 from cpython.mem cimport PyMem_Malloc, PyMem_Realloc, PyMem_Free
 
+import sys
+
 cdef extern from "string.h":
     void *memcpy(void *str1, const void *str2, size_t n)
 
+cdef extern from "math.h":
+    double sqrt(double x)
+
+# Buffer format strings meaning a native double - besides the native prefixes, ctypes and explicitly ordered NumPy dtypes
+# give the byte order, which is fine as long as it is ours
+DOUBLE_FORMATS = {b'd', b'@d', b'=d'} | ({b'<d'} if sys.byteorder == 'little' else {b'>d', b'!d'})
+
+
+cdef struct Moments:
+    # Running moments of two equally sized arrays, computed in a single pass with Welford's algorithm
+    double mean_x
+    double mean_y
+    double m2_x     # sum of squared differences from mean_x
+    double m2_y     # sum of squared differences from mean_y
+    double c_xy     # sum of products of differences from the means (co-moment)
+
+
 cdef class StatisticalArray:
     cdef double* values
-    cdef int num_values
-    cdef max_values
+    cdef Py_ssize_t num_values
+    cdef Py_ssize_t max_values
+
+    # When wrapping another object's buffer (see from_buffer), values points into that buffer instead of memory we own
+    cdef Py_buffer source_view
+    cdef bint wraps_buffer
+    cdef bint readonly
+
+    # Number of buffers we have exported which are still alive - values must not move while this is non-zero
+    cdef int export_count
+    cdef Py_ssize_t export_shape[1]
+    cdef Py_ssize_t export_strides[1]
 
     def __cinit__(StatisticalArray self, StatisticalArray copy_from=None, *pargs, **kwargs):
+        self.wraps_buffer = False
+        self.readonly = False
+        self.export_count = 0
         if copy_from:
             self.num_values = copy_from.num_values
-            self.max_values = copy_from.max_values
-            self.values = <double*> PyMem_Malloc(copy_from.max_values * sizeof(double))
+            self.max_values = copy_from.num_values
+            self.values = <double*> PyMem_Malloc(max(copy_from.num_values, 1) * sizeof(double))
+            if self.values == NULL:
+                raise MemoryError()
             memcpy(self.values, copy_from.values, copy_from.num_values * sizeof(double))
         else:
             self.values = NULL
@@ -20,11 +55,67 @@ cdef class StatisticalArray:
             self.max_values = 0
 
     def __dealloc__(StatisticalArray self):
-        if self.values != NULL:
+        if self.wraps_buffer:
+            PyBuffer_Release(&self.source_view)
+        elif self.values != NULL:
             PyMem_Free(self.values)
 
+    @staticmethod
+    def from_buffer(object source):
+        """ Create a StatisticalArray which shares memory with any contiguous buffer of doubles, such as a float64
+        NumPy array or an array.array('d'), without copying it.
+
+        Changes made through __setitem__ are visible in the source object.  The data is only copied if values are
+        appended, since the source buffer can't be resized.
+        """
+        cdef StatisticalArray result = StatisticalArray()
+        try:
+            PyObject_GetBuffer(source, &result.source_view, PyBUF_ANY_CONTIGUOUS | PyBUF_FORMAT | PyBUF_WRITABLE)
+        except (BufferError, ValueError):
+            # Fall back to read-only access for immutable sources such as bytes or read-only NumPy arrays
+            PyObject_GetBuffer(source, &result.source_view, PyBUF_ANY_CONTIGUOUS | PyBUF_FORMAT)
+            result.readonly = True
+        result.wraps_buffer = True
+
+        cdef bytes buffer_format = result.source_view.format if result.source_view.format != NULL else b'B'
+        if result.source_view.itemsize != sizeof(double) or buffer_format not in DOUBLE_FORMATS:
+            raise TypeError("buffer must contain doubles, not {!r}".format(buffer_format))
+
+        result.values = <double*> result.source_view.buf
+        result.num_values = result.source_view.len // sizeof(double)
+        result.max_values = result.num_values
+        return result
+
+    def __getbuffer__(StatisticalArray self, Py_buffer *buffer, int flags):
+        if flags & PyBUF_WRITABLE and self.readonly:
+            raise BufferError("StatisticalArray wraps a read-only buffer")
+
+        self.export_shape[0] = self.num_values
+        self.export_strides[0] = sizeof(double)
+        buffer.buf = <void*> self.values
+        buffer.obj = self
+        buffer.len = self.num_values * sizeof(double)
+        buffer.readonly = self.readonly
+        buffer.itemsize = sizeof(double)
+        if flags & PyBUF_FORMAT:
+            buffer.format = 'd'
+        else:
+            buffer.format = NULL
+        buffer.ndim = 1
+        buffer.shape = self.export_shape
+        buffer.strides = self.export_strides
+        buffer.suboffsets = NULL
+        buffer.internal = NULL
+        self.export_count += 1
+
+    def __releasebuffer__(StatisticalArray self, Py_buffer *buffer):
+        self.export_count -= 1
+
+    def __len__(StatisticalArray self):
+        return self.num_values
+
     def __iter__(StatisticalArray self):
-        cdef int index
+        cdef Py_ssize_t index
         for index in range(self.num_values):
             yield self.values[index]
 
@@ -38,6 +129,9 @@ cdef class StatisticalArray:
         return self.values[index]
 
     def __setitem__(StatisticalArray self, int index, double value):
+        if self.readonly:
+            raise TypeError("StatisticalArray wraps a read-only buffer")
+
         if index < 0:
             index = index + self.num_values
 
@@ -46,17 +140,41 @@ cdef class StatisticalArray:
 
         self.values[index] = value
 
+    cdef int _grow(StatisticalArray self) except -1:
+        cdef Py_ssize_t new_max = self.max_values * 2 if self.max_values > 0 else 8
+        cdef double* new_values
+
+        if self.export_count > 0:
+            raise BufferError("cannot resize a StatisticalArray while its buffer is exported")
+
+        if self.wraps_buffer:
+            # The source buffer can't grow, so take a private copy of the data and stop sharing memory with it
+            new_values = <double*> PyMem_Malloc(new_max * sizeof(double))
+            if new_values == NULL:
+                raise MemoryError()
+            memcpy(new_values, self.values, self.num_values * sizeof(double))
+            PyBuffer_Release(&self.source_view)
+            self.wraps_buffer = False
+            self.readonly = False
+        else:
+            new_values = <double*> PyMem_Realloc(self.values, new_max * sizeof(double))
+            if new_values == NULL:
+                raise MemoryError()
+
+        self.values = new_values
+        self.max_values = new_max
+        return 0
+
     cpdef append(StatisticalArray self, double value):
         if self.num_values == self.max_values:
-            self.max_values = self.max_values * 2 if self.max_values > 0 else 8
-            self.values = <double*> PyMem_Realloc(self.values, self.max_values * sizeof(double))
+            self._grow()
 
         self.values[self.num_values] = value
 
         self.num_values += 1
 
     cpdef double mean(StatisticalArray self):
-        cdef int index
+        cdef Py_ssize_t index
         cdef double total = 0.0
 
         for index in range(self.num_values):
@@ -64,32 +182,224 @@ cdef class StatisticalArray:
 
         return total / self.num_values
 
-    cpdef double variance(StatisticalArray self):
-        cdef StatisticalArray temp = StatisticalArray()
-        cdef double mean = self.mean()
-        cdef int index
+    cdef Moments _moments(StatisticalArray self, StatisticalArray other):
+        # Single pass over both arrays (other may be self) without allocating any temporaries
+        cdef Moments m
+        cdef Py_ssize_t index
+        cdef double n, x, y, dx, dy
 
+        m.mean_x = m.mean_y = m.m2_x = m.m2_y = m.c_xy = 0.0
         for index in range(self.num_values):
-            temp.append((self.values[index] - mean)**2)
+            n = index + 1
+            x = self.values[index]
+            y = other.values[index]
+            dx = x - m.mean_x
+            dy = y - m.mean_y
+            m.mean_x += dx / n
+            m.mean_y += dy / n
+            m.m2_x += dx * (x - m.mean_x)
+            m.m2_y += dy * (y - m.mean_y)
+            m.c_xy += dx * (y - m.mean_y)
+        return m
+
+    cdef double _variance(StatisticalArray self):
+        cdef Py_ssize_t index
+        cdef double n, x, delta, mean = 0.0, m2 = 0.0
 
-        return temp.mean()
+        for index in range(self.num_values):
+            n = index + 1
+            x = self.values[index]
+            delta = x - mean
+            mean += delta / n
+            m2 += delta * (x - mean)
+        return m2
+
+    cpdef double variance(StatisticalArray self):
+        if self.num_values == 0:
+            raise ZeroDivisionError("variance of an empty StatisticalArray")
+        return self._variance() / self.num_values
 
     cpdef double covariance(StatisticalArray self, StatisticalArray other) except? -200.0:
         if self.num_values != other.num_values:
             raise ValueError("Array sizes differ")
+        if self.num_values == 0:
+            raise ZeroDivisionError("covariance of empty StatisticalArrays")
 
-        cdef StatisticalArray temp = StatisticalArray()
-        cdef double self_mean = self.mean()
-        cdef double other_mean = other.mean()
-        cdef int index
-
-        for index in range(self.num_values):
-            temp.append((self.values[index] - self_mean) * (other.values[index] - other_mean))
-
-        return temp.mean()
+        return self._moments(other).c_xy / self.num_values
 
     cpdef double standard_deviation(StatisticalArray self):
         return self.variance() ** 0.5
 
     cpdef double pearson_coefficient(StatisticalArray self, StatisticalArray other) except? -200.0:
-        return self.covariance(other) / (self.standard_deviation() * other.standard_deviation())
+        if self.num_values != other.num_values:
+            raise ValueError("Array sizes differ")
+
+        # The 1/n factors in the covariance and both standard deviations cancel out
+        cdef Moments m = self._moments(other)
+        return m.c_xy / sqrt(m.m2_x * m.m2_y)
+
+
+cdef class RunningStatistics:
+    """ Constant memory statistics over an unbounded stream of values.
+
+    Only the running moments are kept (count, mean, sum of squared differences from the mean, min and max), never the
+    values themselves.  Accumulators built from separate chunks, threads or processes can be combined with merge().
+    """
+    cdef readonly Py_ssize_t count
+    cdef double _mean
+    cdef double _m2
+    cdef double _min
+    cdef double _max
+
+    def __cinit__(RunningStatistics self):
+        self.count = 0
+        self._mean = self._m2 = self._min = self._max = 0.0
+
+    def __reduce__(RunningStatistics self):
+        return _rebuild_running_statistics, (self.count, self._mean, self._m2, self._min, self._max)
+
+    cpdef add(RunningStatistics self, double value):
+        cdef double delta
+        if self.count == 0 or value < self._min:
+            self._min = value
+        if self.count == 0 or value > self._max:
+            self._max = value
+        self.count += 1
+        delta = value - self._mean
+        self._mean += delta / self.count
+        self._m2 += delta * (value - self._mean)
+
+    def extend(RunningStatistics self, const double[:] values):
+        """ Add every value in a buffer of doubles, such as a StatisticalArray or a float64 NumPy array.
+        """
+        cdef Py_ssize_t index
+        for index in range(values.shape[0]):
+            self.add(values[index])
+
+    cpdef merge(RunningStatistics self, RunningStatistics other):
+        """ Combine the moments of another accumulator into this one, as if all of its values had been added here.
+        """
+        cdef Py_ssize_t total
+        cdef double delta
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count, self._mean, self._m2 = other.count, other._mean, other._m2
+            self._min, self._max = other._min, other._max
+            return
+
+        total = self.count + other.count
+        delta = other._mean - self._mean
+        self._mean += delta * other.count / total
+        self._m2 += other._m2 + delta * delta * self.count * other.count / total
+        self._min = min(self._min, other._min)
+        self._max = max(self._max, other._max)
+        self.count = total
+
+    def __iadd__(RunningStatistics self, RunningStatistics other):
+        self.merge(other)
+        return self
+
+    cdef int _check_not_empty(RunningStatistics self) except -1:
+        if self.count == 0:
+            raise ZeroDivisionError("no values have been added")
+        return 0
+
+    cpdef double mean(RunningStatistics self):
+        self._check_not_empty()
+        return self._mean
+
+    cpdef double variance(RunningStatistics self):
+        self._check_not_empty()
+        return self._m2 / self.count
+
+    cpdef double standard_deviation(RunningStatistics self):
+        return self.variance() ** 0.5
+
+    @property
+    def min(RunningStatistics self):
+        self._check_not_empty()
+        return self._min
+
+    @property
+    def max(RunningStatistics self):
+        self._check_not_empty()
+        return self._max
+
+
+def _rebuild_running_statistics(count, mean, m2, minimum, maximum):
+    cdef RunningStatistics stats = RunningStatistics()
+    stats.count, stats._mean, stats._m2, stats._min, stats._max = count, mean, m2, minimum, maximum
+    return stats
+
+
+cdef class RunningCovariance:
+    """ Constant memory covariance and Pearson coefficient over an unbounded stream of (x, y) pairs.
+
+    Keeps RunningStatistics for x and y plus their co-moment, and supports merge() just like RunningStatistics.
+    """
+    cdef readonly RunningStatistics x
+    cdef readonly RunningStatistics y
+    cdef double _c_xy
+
+    def __cinit__(RunningCovariance self):
+        self.x = RunningStatistics()
+        self.y = RunningStatistics()
+        self._c_xy = 0.0
+
+    def __reduce__(RunningCovariance self):
+        return _rebuild_running_covariance, (self.x, self.y, self._c_xy)
+
+    @property
+    def count(RunningCovariance self):
+        return self.x.count
+
+    cpdef add(RunningCovariance self, double x, double y):
+        # The co-moment update needs the old mean of x and the new mean of y
+        cdef double dx = x - self.x._mean
+        self.x.add(x)
+        self.y.add(y)
+        self._c_xy += dx * (y - self.y._mean)
+
+    def extend(RunningCovariance self, const double[:] xs, const double[:] ys):
+        """ Add every pair of values from two equally sized buffers of doubles.
+        """
+        cdef Py_ssize_t index
+        if xs.shape[0] != ys.shape[0]:
+            raise ValueError("Array sizes differ")
+        for index in range(xs.shape[0]):
+            self.add(xs[index], ys[index])
+
+    cpdef merge(RunningCovariance self, RunningCovariance other):
+        """ Combine the moments of another accumulator into this one, as if all of its pairs had been added here.
+        """
+        cdef Py_ssize_t count = self.x.count, other_count = other.x.count
+        cdef double dx, dy
+        if other_count == 0:
+            return
+        if count > 0:
+            dx = other.x._mean - self.x._mean
+            dy = other.y._mean - self.y._mean
+            self._c_xy += other._c_xy + dx * dy * count * other_count / (count + other_count)
+        else:
+            self._c_xy = other._c_xy
+        self.x.merge(other.x)
+        self.y.merge(other.y)
+
+    def __iadd__(RunningCovariance self, RunningCovariance other):
+        self.merge(other)
+        return self
+
+    cpdef double covariance(RunningCovariance self) except? -200.0:
+        self.x._check_not_empty()
+        return self._c_xy / self.x.count
+
+    cpdef double pearson_coefficient(RunningCovariance self) except? -200.0:
+        self.x._check_not_empty()
+        return self._c_xy / sqrt(self.x._m2 * self.y._m2)
+
+
+def _rebuild_running_covariance(x, y, c_xy):
+    cdef RunningCovariance covariance = RunningCovariance()
+    covariance.x, covariance.y, covariance._c_xy = x, y, c_xy
+    return covariance
@@ -15,3 +15,20 @@ b.append(random.random())
 
 pc = a.pearson_coefficient(b)
 print("a.pearson_coefficient(b) = {}".format(pc))
+
+# Wrap an existing buffer of doubles, like an array.array('d') or a float64 NumPy array, without copying it
+import array
+samples = array.array('d', [random.random() for _ in range(1000)])
+c = statistics.StatisticalArray.from_buffer(samples)
+print("c.variance() = {}".format(c.variance()))
+
+# StatisticalArray also exports its data through the buffer protocol, e.g. numpy.asarray(c) shares its memory
+print("memoryview(c).nbytes = {}".format(memoryview(c).nbytes))
+
+# Streaming accumulators keep only running moments, so chunks can be processed separately and merged afterwards
+first_half = statistics.RunningStatistics()
+first_half.extend(samples[:500])
+second_half = statistics.RunningStatistics()
+second_half.extend(samples[500:])
+first_half.merge(second_half)
+print("merged variance = {}".format(first_half.variance()))
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+ Vectorized version of the dictionary challenge criteria using NumPy.
+
+ Instead of building a frozenset for one word at a time, every word in the
+ dictionary is encoded once into NumPy arrays:
+
+ - lengths: the length of each word
+ - masks:   a 26-bit mask of the distinct letters in each word
+ - counts:  the number of times each letter a-z appears in each word
+
+ matches_criteria_batch() and has_correct_consonants_batch() then evaluate the
+ same rules as matches_criteria() and has_correct_consonants() in
+ dictionary_challenge.py for the whole dictionary at once using array
+ operations.
+
+ Words containing characters outside of a-z can't be represented by the
+ encoding, so they are flagged and checked with the scalar functions instead.
+
+ The following Python module is required and can be installed via pip:
+ - numpy
+"""
+import sys
+import time
+from typing import Iterable, List, NamedTuple
+
+import numpy as np
+
+from dictionary_challenge import DICTIONARY_FILE, MAGIC_WORD_LENGTH, VOWELS, matches_criteria
+
+NUM_LETTERS = 26
+VOWEL_COLUMNS = np.array(sorted(ord(v) - ord("a") for v in VOWELS))
+CONSONANT_COLUMNS = np.setdiff1d(np.arange(NUM_LETTERS), VOWEL_COLUMNS)
+VOWEL_MASK = int(np.bitwise_or.reduce(1 << VOWEL_COLUMNS))
+_LETTER_BITS = (1 << np.arange(NUM_LETTERS, dtype=np.uint32)).astype(np.uint32)
+
+
+class EncodedWords(NamedTuple):
+    """Column-oriented encoding of a list of words."""
+    words: List[str]
+    lengths: np.ndarray  # int64, shape (N,)
+    masks: np.ndarray    # uint32, shape (N,)
+    counts: np.ndarray   # uint8, shape (N, 26)
+    valid: np.ndarray    # bool, shape (N,) - False if the word has characters outside of a-z
+
+
+def encode_words(words: Iterable[str]) -> EncodedWords:
+    """Encode words into letter masks and per-letter counts.
+
+    :param words: words to encode
+    :return: EncodedWords holding one row per word
+    """
+    words = list(words)
+    num_words = len(words)
+    if num_words == 0:
+        return EncodedWords(words, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint32),
+                            np.zeros((0, NUM_LETTERS), dtype=np.uint8), np.zeros(0, dtype=bool))
+
+    # Fixed-width byte matrix with one word per row, padded with NUL bytes
+    raw = np.array([w.encode("ascii", "replace") for w in words], dtype=bytes)
+    width = raw.dtype.itemsize
+    chars = raw.view(np.uint8).reshape(num_words, width)
+
+    lengths = np.fromiter((len(w) for w in words), dtype=np.int64, count=num_words)
+    is_letter = (chars >= ord("a")) & (chars <= ord("z"))
+    is_padding = np.arange(width) >= lengths[:, None]
+    valid = np.all(is_letter | is_padding, axis=1)
+
+    # Histogram of letters per row, built one character position at a time so the temporaries are the size of one
+    # column rather than of every letter in the dictionary.  Each row appears at most once per column, so a plain
+    # fancy-indexed increment is safe (no need for np.add.at), and it saturates at 255 rather than wrapping around.
+    counts = np.zeros((num_words, NUM_LETTERS), dtype=np.uint8)
+    for col in range(width):
+        rows = np.flatnonzero(is_letter[:, col])
+        cells = (rows, chars[rows, col] - ord("a"))
+        counts[cells] = np.minimum(counts[cells], 254) + 1
+
+    masks = ((counts > 0) * _LETTER_BITS).sum(axis=1, dtype=np.uint32)
+    return EncodedWords(words, lengths, masks, counts, valid)
+
+
+def has_correct_consonants_batch(encoded: EncodedWords) -> np.ndarray:
+    """Vectorized has_correct_consonants(): does each word contain exactly two letters that are not vowels?
+
+    :param encoded: encoded words
+    :return: boolean array, True for words with the correct consonants
+    """
+    consonant_counts = encoded.counts[:, CONSONANT_COLUMNS]
+    num_unique_consonants = np.count_nonzero(consonant_counts, axis=1)
+    num_consonants = consonant_counts.sum(axis=1, dtype=np.int64)
+    return (num_unique_consonants == 2) | ((num_unique_consonants == 1) & (num_consonants == 2))
+
+
+def matches_criteria_batch(encoded: EncodedWords) -> np.ndarray:
+    """Vectorized matches_criteria(): does each word match the criteria?
+
+    :param encoded: encoded words
+    :return: boolean array, True for matching words
+    """
+    has_all_vowels = (encoded.masks & VOWEL_MASK) == VOWEL_MASK
+    has_consonant = (encoded.masks & ~np.uint32(VOWEL_MASK)) != 0
+    result = has_all_vowels & has_consonant & has_correct_consonants_batch(encoded)
+
+    # Fall back to the scalar check for anything the encoding can't represent
+    for i in np.flatnonzero(~encoded.valid):
+        result[i] = matches_criteria(encoded.words[i])
+    return result
+
+
+def find_matches(encoded: EncodedWords, length: int = MAGIC_WORD_LENGTH) -> List[str]:
+    """Find all encoded words of the given length which match the criteria, in dictionary order.
+
+    :param encoded: encoded words
+    :param length: required word length
+    :return: list of matching words
+    """
+    selected = (encoded.lengths == length) & matches_criteria_batch(encoded)
+    return [encoded.words[i] for i in np.flatnonzero(selected)]
+
+
+if __name__ == "__main__":
+    dictionary = DICTIONARY_FILE
+    if len(sys.argv) > 1:
+        dictionary = sys.argv[1]
+
+    with open(dictionary) as cur_file:
+        all_words = [line.strip() for line in cur_file]
+
+    start = time.perf_counter()
+    encoded_words = encode_words(all_words)
+    encode_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    word_matches = find_matches(encoded_words)
+    batch_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scalar_matches = [w for w in all_words if len(w) == MAGIC_WORD_LENGTH and matches_criteria(w)]
+    scalar_time = time.perf_counter() - start
+
+    if word_matches != scalar_matches:
+        raise ValueError(word_matches)
+
+    print(word_matches)
+    print("Encoding time:  {0:.2g} s (one time cost)".format(encode_time))
+    print("Scalar time:    {0:.2g} s".format(scalar_time))
+    print("Batch time:     {0:.2g} s".format(batch_time))
+    print("Batch speedup:  {0:.2g} times".format(scalar_time / batch_time))
@@ -0,0 +1 @@
+python setup.py build_ext --inplace
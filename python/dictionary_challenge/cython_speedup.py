@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+""" Time the Cython implementation of the dictionary challenge criteria against the pure Python fallback on the
+bundled dictionary.
+
+Build the Cython extension first with build_cython.sh.  If it hasn't been built, only the fallback is timed.
+"""
+import fast_match_python
+
+try:
+    import fast_match
+except ImportError:
+    fast_match = None
+
+from dictionary_challenge import DICTIONARY_FILE
+
+if __name__ == '__main__':
+    import sys
+    import timeit
+
+    dictionary = DICTIONARY_FILE
+    if len(sys.argv) > 1:
+        dictionary = sys.argv[1]
+
+    number_of_times = 10
+    try:
+        number_of_times = int(sys.argv[2])
+    except Exception:
+        pass
+
+    with open(dictionary, 'rb') as cur_file:
+        data = cur_file.read()
+
+    py_matches = fast_match_python.find_matches_buffer(data)
+    print(py_matches)
+
+    py_tot = timeit.timeit(lambda: fast_match_python.find_matches_buffer(data), number=number_of_times)
+    py_avg = py_tot / number_of_times
+    print("Python average time:  {0:.2g}".format(py_avg))
+
+    if fast_match is None:
+        print("Cython extension not built, run build_cython.sh to compare against it")
+        sys.exit(0)
+
+    cy_matches = fast_match.find_matches_buffer(data)
+    if cy_matches != py_matches:
+        raise(ValueError(cy_matches))
+
+    cy_tot = timeit.timeit(lambda: fast_match.find_matches_buffer(data), number=number_of_times)
+    cy_avg = cy_tot / number_of_times
+    print("Cython average time:  {0:.2g}".format(cy_avg))
+    print("Cython speedup: {0:.2g} times".format(py_avg/cy_avg))
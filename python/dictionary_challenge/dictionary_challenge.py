@@ -66,7 +66,7 @@ def main():
     with open(DICTIONARY_FILE) as cur_file:
         # Read words and filter to those of desired length that match criteria
         matches = []
-        for line in cur_file.readlines():
+        for line in cur_file:
             word = line.strip()
             if len(word) == MAGIC_WORD_LENGTH and matches_criteria(word):
                 matches.append(word)
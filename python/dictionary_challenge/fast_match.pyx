@@ -0,0 +1,66 @@
+# cython: boundscheck=False, wraparound=False
+""" Cython implementation of the dictionary challenge criteria which works directly on bytes buffers.
+"""
+from libc.string cimport memset
+
+cdef unsigned char[5] VOWEL_BYTES = [b'a', b'e', b'i', b'o', b'u']
+
+
+cdef bint _matches(const unsigned char[:] data, Py_ssize_t start, Py_ssize_t end):
+    """ Check the word stored in data[start:end] against the criteria without creating any Python objects.
+    """
+    cdef int counts[256]
+    cdef bint is_vowel[256]
+    cdef Py_ssize_t i
+    cdef int v, num_unique_consonants = 0, num_consonants = 0
+    cdef unsigned char c
+
+    memset(counts, 0, sizeof(counts))
+    memset(is_vowel, 0, sizeof(is_vowel))
+    for v in range(5):
+        is_vowel[VOWEL_BYTES[v]] = 1
+
+    for i in range(start, end):
+        c = data[i]
+        if not is_vowel[c]:
+            if counts[c] == 0:
+                num_unique_consonants += 1
+            num_consonants += 1
+        counts[c] += 1
+
+    # Every vowel must be present and there must be at least one letter which is not a vowel
+    for v in range(5):
+        if counts[VOWEL_BYTES[v]] == 0:
+            return 0
+    return num_unique_consonants == 2 or (num_unique_consonants == 1 and num_consonants == 2)
+
+
+cpdef bint matches_criteria_bytes(const unsigned char[:] word):
+    """ Determine if a word, given as bytes, matches the criteria.
+    """
+    return _matches(word, 0, word.shape[0])
+
+
+cpdef list find_matches_buffer(const unsigned char[:] data, int length=7):
+    """ Find all words of the given length which match the criteria in a buffer of newline separated words.
+
+    Trailing carriage returns and spaces are ignored, so files with Windows line endings work as well.
+    """
+    cdef list matches = []
+    cdef Py_ssize_t size = data.shape[0]
+    cdef Py_ssize_t start = 0, end, stop
+
+    while start < size:
+        end = start
+        while end < size and data[end] != b'\n':
+            end += 1
+
+        # Strip trailing whitespace such as the '\r' from '\r\n' line endings
+        stop = end
+        while stop > start and (data[stop - 1] == b'\r' or data[stop - 1] == b' ' or data[stop - 1] == b'\t'):
+            stop -= 1
+
+        if stop - start == length and _matches(data, start, stop):
+            matches.append(bytes(data[start:stop]).decode())
+        start = end + 1
+    return matches
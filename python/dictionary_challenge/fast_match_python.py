@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+""" Pure Python fallback for fast_match.pyx which works on bytes buffers.
+
+It is used when the Cython extension hasn't been built and acts as the baseline
+for cython_speedup.py.
+"""
+from dictionary_challenge import MAGIC_WORD_LENGTH, VOWELS
+
+VOWEL_BYTES = frozenset(ord(vowel) for vowel in VOWELS)
+
+
+def matches_criteria_bytes(word: bytes) -> bool:
+    """Determine if a word, given as bytes, matches the criteria.
+
+    :param word: word to test
+    :return: True if it is a match, False otherwise
+    """
+    letters = frozenset(word)
+    if not VOWEL_BYTES < letters:
+        return False
+    consonants = letters - VOWEL_BYTES
+    return len(consonants) == 2 or (len(consonants) == 1 and word.count(next(iter(consonants))) == 2)
+
+
+def find_matches_buffer(data: bytes, length: int = MAGIC_WORD_LENGTH) -> list:
+    """Find all words of the given length which match the criteria in a buffer of newline separated words.
+
+    :param data: newline separated words
+    :param length: required word length
+    :return: list of matching words
+    """
+    matches = []
+    for line in data.split(b"\n"):
+        word = line.rstrip()
+        if len(word) == length and matches_criteria_bytes(word):
+            matches.append(word.decode())
+    return matches
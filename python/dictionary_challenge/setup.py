@@ -0,0 +1,7 @@
+from setuptools import setup
+from Cython.Build import cythonize
+
+setup(
+    name = "fast_match",
+    ext_modules = cythonize('fast_match.pyx', compiler_directives={'embedsignature': True, 'language_level': 3}),
+)
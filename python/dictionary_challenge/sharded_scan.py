@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+ Multi-process scan of very large dictionary files for the dictionary challenge.
+
+ Rather than reading the whole file into memory, the dictionary is memory-mapped
+ and split into byte ranges which always begin and end on a line boundary.  Each
+ range is filtered by a separate worker process which maps the file itself and
+ walks its range in fixed size blocks, so memory use stays flat no matter how
+ large the file is.  Only the matching words are sent back to the parent, and
+ results are merged in the original file order.
+
+ Usage: sharded_scan.py [dictionary_file] [num_workers]
+"""
+import locale
+import mmap
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple
+
+from dictionary_challenge import DICTIONARY_FILE, MAGIC_WORD_LENGTH, matches_criteria
+
+# Each worker scans its range this many bytes at a time (rounded to a line boundary)
+BLOCK_SIZE = 16 * 1024 * 1024
+
+# Create more shards than workers so that a slow shard doesn't leave the other workers idle
+SHARDS_PER_WORKER = 4
+
+
+def split_ranges(path: str, num_shards: int) -> List[Tuple[int, int]]:
+    """Split a file into roughly equal byte ranges which are aligned to line boundaries.
+
+    :param path: path to the file to split
+    :param num_shards: desired number of ranges
+    :return: list of (start, end) byte offsets covering the whole file, in order
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+
+    num_shards = max(1, min(num_shards, size))
+    with open(path, "rb") as cur_file, mmap.mmap(cur_file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        boundaries = [0]
+        for shard in range(1, num_shards):
+            # Move each nominal split point forward to just past the next newline
+            newline = mm.find(b"\n", max(size * shard // num_shards, boundaries[-1]))
+            if newline == -1:
+                break
+            if newline + 1 > boundaries[-1]:
+                boundaries.append(newline + 1)
+        if boundaries[-1] != size:
+            boundaries.append(size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def scan_range(path: str, start: int, end: int, length: int = MAGIC_WORD_LENGTH) -> List[str]:
+    """Find the words matching the criteria within one line-aligned byte range of a file.
+
+    :param path: path to the dictionary file
+    :param start: offset of the first byte of the range
+    :param end: offset one past the last byte of the range
+    :param length: required word length, in characters
+    :return: matching words in file order
+    :raises UnicodeDecodeError: if the range isn't valid text in the locale's encoding, as with main()
+    """
+    # The encoding open() uses in text mode, as main() does
+    encoding = locale.getpreferredencoding(False)
+    matches = []
+    with open(path, "rb") as cur_file, mmap.mmap(cur_file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        pos = start
+        while pos < end:
+            block_end = min(pos + BLOCK_SIZE, end)
+            if block_end < end:
+                newline = mm.find(b"\n", block_end, end)
+                block_end = end if newline == -1 else newline + 1
+
+            # Decode before checking lengths, which are in characters, the same way main() reads the file -
+            # blocks end on a newline, so no multi-byte character is ever split between two of them
+            for line in mm[pos:block_end].decode(encoding).split("\n"):
+                word = line.strip()
+                if len(word) == length and matches_criteria(word):
+                    matches.append(word)
+            pos = block_end
+    return matches
+
+
+def _scan_range_star(args: Tuple[str, int, int, int]) -> List[str]:
+    """Unpack a tuple of arguments for scan_range() so it can be used with Executor.map()."""
+    return scan_range(*args)
+
+
+def sharded_scan(path: str = DICTIONARY_FILE, num_workers: int = None,
+                 length: int = MAGIC_WORD_LENGTH) -> List[str]:
+    """Scan a dictionary file for words matching the criteria using a pool of worker processes.
+
+    :param path: path to the dictionary file
+    :param num_workers: (optional) number of worker processes, defaults to the number of CPUs
+    :param length: required word length
+    :return: matching words in the same order as the file
+    """
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+
+    ranges = split_ranges(path, num_workers * SHARDS_PER_WORKER)
+    if num_workers == 1:
+        return [word for start, end in ranges for word in scan_range(path, start, end, length)]
+
+    tasks = [(path, start, end, length) for start, end in ranges]
+    matches = []
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        # map() yields results in submission order, which keeps the merged results in file order
+        for shard_matches in executor.map(_scan_range_star, tasks):
+            matches.extend(shard_matches)
+    return matches
+
+
+if __name__ == "__main__":
+    dictionary = DICTIONARY_FILE
+    if len(sys.argv) > 1:
+        dictionary = sys.argv[1]
+
+    workers = None
+    try:
+        workers = int(sys.argv[2])
+    except (IndexError, ValueError):
+        pass
+
+    begin = time.perf_counter()
+    word_matches = sharded_scan(dictionary, workers)
+    elapsed = time.perf_counter() - begin
+    print(word_matches)
+    print("Scan took {0:.2g} s".format(elapsed))
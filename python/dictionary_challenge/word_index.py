@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+ A reusable, persistent index for answering dictionary word-pattern queries.
+
+ dictionary_challenge.py answers one fixed question by scanning the whole
+ dictionary.  This module scans the dictionary exactly once, streaming it line
+ by line, and stores every word in a nested index which is pickled to disk next
+ to the dictionary file.  Later runs load the pickle instead of re-scanning.
+
+ Words are indexed by:
+
+ 1. length
+ 2. vowel signature - the count of each vowel [aeiou] packed into one integer
+ 3. once mask - a 26-bit mask of the letters which appear exactly once
+
+ Queries of the form "length N, these letters exactly once, K other letters"
+ only look at the words of length N.  When every vowel is one of the letters
+ required exactly once, the vowel signature is fully determined, so only that
+ one signature's buckets are checked; otherwise every signature for the length
+ is checked, though whole signatures are ruled out without looking at their
+ masks.  Within a signature each once mask is tested with a single AND, rather
+ than each word.  The most recent query results are kept in an LRU cache.
+"""
+import os
+import pickle
+import sys
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, List, Tuple
+
+DICTIONARY_FILE = "fulldictionary00.txt"
+INDEX_SUFFIX = ".idx"
+INDEX_FORMAT_VERSION = 1
+VOWELS = "aeiou"
+
+# Number of query results each WordIndex keeps, least recently used first out
+QUERY_CACHE_SIZE = 128
+
+# Each vowel gets a 4-bit field in the vowel signature; a count of 15 means "15 or more"
+_VOWEL_FIELD_BITS = 4
+_VOWEL_FIELD_MAX = (1 << _VOWEL_FIELD_BITS) - 1
+
+# length -> vowel signature -> once mask -> words
+IndexType = Dict[int, Dict[int, Dict[int, List[str]]]]
+
+
+def letter_bit(letter: str) -> int:
+    """Return the bit used for a lowercase ASCII letter in a 26-bit letter mask.
+
+    :param letter: single lowercase letter in the range a-z
+    :return: integer with exactly one bit set
+    """
+    offset = ord(letter) - ord("a")
+    if not 0 <= offset < 26:
+        raise ValueError("not a lowercase ASCII letter: {!r}".format(letter))
+    return 1 << offset
+
+
+def letters_to_mask(letters: Iterable[str]) -> int:
+    """Convert an iterable of lowercase letters into a 26-bit letter mask.
+
+    :param letters: lowercase letters in the range a-z
+    :return: bitwise OR of the bit for each letter
+    """
+    mask = 0
+    for letter in letters:
+        mask |= letter_bit(letter)
+    return mask
+
+
+def vowel_signature(counts: Dict[str, int]) -> int:
+    """Pack the number of times each vowel appears into a single integer.
+
+    :param counts: mapping of letter to number of occurrences
+    :return: vowel counts packed into consecutive 4-bit fields, in the order of VOWELS
+    """
+    signature = 0
+    for position, vowel in enumerate(VOWELS):
+        count = min(counts.get(vowel, 0), _VOWEL_FIELD_MAX)
+        signature |= count << (position * _VOWEL_FIELD_BITS)
+    return signature
+
+
+def vowel_count(signature: int, vowel: str) -> int:
+    """Extract the count for one vowel from a packed vowel signature.
+
+    :param signature: vowel signature created by vowel_signature()
+    :param vowel: one of the letters in VOWELS
+    :return: number of times that vowel appears (saturating at 15)
+    """
+    position = VOWELS.index(vowel)
+    return (signature >> (position * _VOWEL_FIELD_BITS)) & _VOWEL_FIELD_MAX
+
+
+def word_keys(word: str) -> Tuple[int, int, int]:
+    """Compute the index keys for a word.
+
+    Characters outside of a-z are allowed and simply never appear in the once mask.
+
+    :param word: word to compute keys for
+    :return: (length, vowel signature, once mask)
+    """
+    counts = Counter(word)
+    once_mask = 0
+    for letter, count in counts.items():
+        if count == 1 and "a" <= letter <= "z":
+            once_mask |= letter_bit(letter)
+    return len(word), vowel_signature(counts), once_mask
+
+
+class WordIndex:
+    """Persistent index of a dictionary file answering exact-letter queries quickly."""
+
+    def __init__(self, index: IndexType, query_cache_size: int = QUERY_CACHE_SIZE):
+        """Wrap an already built index - see build() and load() for the usual constructors.
+
+        :param index: nested index of length -> vowel signature -> once mask -> words
+        :param query_cache_size: number of query results to keep, 0 to disable caching
+        """
+        self._index = index
+        self._query_cache_size = query_cache_size
+        self._query_cache: "OrderedDict[Tuple[int, str, int], List[str]]" = OrderedDict()
+
+    @classmethod
+    def build(cls, words: Iterable[str]) -> "WordIndex":
+        """Build an index from an iterable of words in a single pass.
+
+        :param words: words to index, blank entries are ignored
+        :return: new WordIndex
+        """
+        index: IndexType = {}
+        for word in words:
+            if not word:
+                continue
+            length, signature, once_mask = word_keys(word)
+            by_signature = index.setdefault(length, {})
+            by_mask = by_signature.setdefault(signature, {})
+            by_mask.setdefault(once_mask, []).append(word)
+        return cls(index)
+
+    @classmethod
+    def from_file(cls, dictionary_path: str = DICTIONARY_FILE) -> "WordIndex":
+        """Build an index by streaming a dictionary file with one word per line.
+
+        :param dictionary_path: path to the dictionary file
+        :return: new WordIndex
+        """
+        with open(dictionary_path) as cur_file:
+            return cls.build(line.strip() for line in cur_file)
+
+    @classmethod
+    def load(cls, dictionary_path: str = DICTIONARY_FILE, index_path: str = None) -> "WordIndex":
+        """Load the on-disk index for a dictionary, (re)building it if it is missing or stale.
+
+        The index is considered stale when the size or modification time of the dictionary differs from the one
+        recorded when the index was written.
+
+        :param dictionary_path: path to the dictionary file
+        :param index_path: (optional) path to the index file, defaults to the dictionary path plus INDEX_SUFFIX
+        :return: WordIndex for the dictionary
+        """
+        if index_path is None:
+            index_path = dictionary_path + INDEX_SUFFIX
+
+        dict_stat = os.stat(dictionary_path)
+        source = (dict_stat.st_size, dict_stat.st_mtime_ns)
+        try:
+            with open(index_path, "rb") as index_file:
+                version, index_source, index = pickle.load(index_file)
+            if version == INDEX_FORMAT_VERSION and tuple(index_source) == source:
+                return cls(index)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError, ValueError):
+            pass
+
+        word_index = cls.from_file(dictionary_path)
+        word_index.save(index_path, source)
+        return word_index
+
+    def save(self, index_path: str, source: Tuple[int, int] = (0, 0)):
+        """Write the index to disk.
+
+        The file is written to a temporary name and then renamed so concurrent readers never see a partial index.
+
+        :param index_path: path to write the index to
+        :param source: (size, mtime_ns) of the dictionary the index was built from
+        """
+        tmp_path = "{}.{}.tmp".format(index_path, os.getpid())
+        with open(tmp_path, "wb") as index_file:
+            pickle.dump((INDEX_FORMAT_VERSION, source, self._index), index_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, index_path)
+
+    def query(self, length: int, exactly_once: str, num_other: int) -> List[str]:
+        """Find all words of a given length which contain each letter in exactly_once exactly one time and
+        num_other letters which are not in exactly_once.
+
+        The results of the last QUERY_CACHE_SIZE distinct queries are cached, so repeating a recent query only costs
+        a dictionary lookup.
+
+        :param length: total length of the target word
+        :param exactly_once: letters which must each appear exactly once
+        :param num_other: number of remaining letters, none of which may be one of the exactly_once letters
+        :return: matching words, in dictionary order within each bucket
+        """
+        required = "".join(sorted(set(exactly_once)))
+        key = (length, required, num_other)
+        cached = self._query_cache.get(key)
+        if cached is not None:
+            self._query_cache.move_to_end(key)
+            return list(cached)
+
+        matches = []
+        # If every required letter appears exactly once, the rest of the word is made up of other letters, so the
+        # word length alone determines num_other
+        if length == len(required) + num_other:
+            required_mask = letters_to_mask(required)
+            required_vowels = [v for v in VOWELS if v in required]
+            by_signature = self._index.get(length, {})
+            if len(required_vowels) == len(VOWELS):
+                # Every vowel appears exactly once, so there is only one signature to look at
+                signature = vowel_signature(dict.fromkeys(VOWELS, 1))
+                signatures = [(signature, by_signature[signature])] if signature in by_signature else []
+            else:
+                # Vowels which aren't required may appear any number of times, so check every signature
+                signatures = by_signature.items()
+            for signature, by_mask in signatures:
+                # Prune whole groups of words using the vowel signature before looking at masks
+                if any(vowel_count(signature, v) != 1 for v in required_vowels):
+                    continue
+                for once_mask, words in by_mask.items():
+                    if required_mask & ~once_mask == 0:
+                        matches.extend(words)
+
+        if self._query_cache_size > 0:
+            self._query_cache[key] = matches
+            if len(self._query_cache) > self._query_cache_size:
+                self._query_cache.popitem(last=False)
+        return list(matches)
+
+    def __len__(self) -> int:
+        return sum(len(words) for by_signature in self._index.values()
+                   for by_mask in by_signature.values() for words in by_mask.values())
+
+
+if __name__ == "__main__":
+    dictionary = DICTIONARY_FILE
+    if len(sys.argv) > 1:
+        dictionary = sys.argv[1]
+
+    start = time.perf_counter()
+    word_index = WordIndex.load(dictionary)
+    load_time = time.perf_counter() - start
+    print("Loaded index of {} words in {:.3g} s".format(len(word_index), load_time))
+
+    # Same criteria as dictionary_challenge.py: 7 letters, all vowels exactly once, 2 other letters
+    start = time.perf_counter()
+    word_matches = word_index.query(7, VOWELS, 2)
+    query_time = time.perf_counter() - start
+    print(word_matches)
+    print("First query took {:.3g} s".format(query_time))
+
+    start = time.perf_counter()
+    word_index.query(7, VOWELS, 2)
+    print("Repeated query took {:.3g} s".format(time.perf_counter() - start))
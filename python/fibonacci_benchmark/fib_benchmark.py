@@ -0,0 +1,373 @@
+#!/usr/bin/env python
+""" Benchmark every available fibonacci backend from the Cython, CFFI, SWIG and ctypes examples side by side.
+
+Each of the example directories has its own timing script comparing one backend against the pure Python version.
+This script discovers all of the backends which have been built, runs each of them across a sweep of n values and
+call counts (with a warmup and several repeats) and prints a table of the results.  The results can optionally be
+saved as JSON and/or CSV.  With --batch-size, the batch entry points are timed instead, which compute many values
+with a single call across the FFI boundary, and times are reported per computed value.  With --cache, each backend
+is also timed behind a FibonacciCache (see fib_cache.py), both cold and warm.
+
+Backends which haven't been built are simply skipped.  To build them:
+    python/cython/fibonacci:            ./build_cython.sh
+    python/cython/fibonacci_wrapper:    ./build_cython.sh
+    python/cffi/fibonacci:              ./build_c_dynamic_lib.sh && python build_cffi_api.py
+    python/swig/fibonacci:              ./build_swig_python_wrapper.sh
+    python/cffi/fibonacci_fast:         python build_cffi_fast.py
+
+The cffi and ctypes backends load libfibonacci.so from python/cffi/fibonacci and the Cython wrapper needs
+LD_LIBRARY_PATH to include python/cython/fibonacci_wrapper.
+"""
+import argparse
+import array
+import csv
+import json
+import os
+import statistics
+import sys
+import timeit
+from collections import OrderedDict
+
+# Directory containing all of the Python examples
+PYTHON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CYTHON_DIR = os.path.join(PYTHON_DIR, 'cython', 'fibonacci')
+CYTHON_WRAPPER_DIR = os.path.join(PYTHON_DIR, 'cython', 'fibonacci_wrapper')
+CFFI_DIR = os.path.join(PYTHON_DIR, 'cffi', 'fibonacci')
+SWIG_DIR = os.path.join(PYTHON_DIR, 'swig', 'fibonacci')
+FAST_DIR = os.path.join(PYTHON_DIR, 'cffi', 'fibonacci_fast')
+
+# The pure Python implementation is identical in every example directory
+sys.path.append(CYTHON_DIR)
+from fib_python import compute_fibonacci  # noqa: E402
+
+from fib_cache import FibonacciCache  # noqa: E402
+
+
+def _import_from(directory, module_name):
+    """Import a module which lives in one of the example directories.
+
+    :param directory: directory containing the module
+    :param module_name: name of the module to import
+    :return: the imported module
+    """
+    import importlib
+    if directory not in sys.path:
+        sys.path.append(directory)
+    return importlib.import_module(module_name)
+
+
+def load_python():
+    return compute_fibonacci
+
+
+def load_cython():
+    return _import_from(CYTHON_DIR, 'fib').compute_fibonacci_cython
+
+
+def load_cython_wrapper():
+    return _import_from(CYTHON_WRAPPER_DIR, 'cyfib').compute_fibonacci_wrapper
+
+
+def load_cffi_abi():
+    _, libfib = _import_from(CFFI_DIR, 'fib_cffi').open_abi_library(os.path.join(CFFI_DIR, 'libfibonacci.so'))
+    return libfib.compute_fibonacci
+
+
+def load_cffi_api():
+    return _import_from(CFFI_DIR, '_fib_cffi').lib.compute_fibonacci
+
+
+def load_swig():
+    return _import_from(SWIG_DIR, 'fibonacci').compute_fibonacci
+
+
+def load_ctypes():
+    import ctypes
+    libfib = ctypes.CDLL(os.path.join(CFFI_DIR, 'libfibonacci.so'))
+    libfib.compute_fibonacci.argtypes = [ctypes.c_int]
+    libfib.compute_fibonacci.restype = ctypes.c_int
+    return libfib.compute_fibonacci
+
+
+def load_doubling_python():
+    return _import_from(FAST_DIR, 'fib_fast').compute_fibonacci_doubling
+
+
+def load_doubling_auto():
+    fib_fast = _import_from(FAST_DIR, 'fib_fast')
+    if fib_fast.lib is None:
+        raise ImportError('the _fib_fast extension module has not been built')
+    return fib_fast.compute_fibonacci_fast
+
+
+# Name of each backend mapped to a function which loads it and returns its compute_fibonacci callable
+BACKENDS = OrderedDict([
+    ('python', load_python),
+    ('cython', load_cython),
+    ('cython-wrapper', load_cython_wrapper),
+    ('cffi-abi', load_cffi_abi),
+    ('cffi-api', load_cffi_api),
+    ('swig', load_swig),
+    ('ctypes', load_ctypes),
+    ('doubling-python', load_doubling_python),
+    ('doubling-auto', load_doubling_auto),
+])
+
+
+def load_python_batch():
+    def compute_fibonacci_batch(ns, out=None):
+        if out is None:
+            out = array.array('i', bytes(memoryview(ns).nbytes))
+        for i, n in enumerate(ns):
+            out[i] = compute_fibonacci(n)
+        return out
+    return compute_fibonacci_batch
+
+
+def load_cython_batch():
+    return _import_from(CYTHON_DIR, 'fib').compute_fibonacci_cython_batch
+
+
+def load_cython_wrapper_batch():
+    return _import_from(CYTHON_WRAPPER_DIR, 'cyfib').compute_fibonacci_wrapper_batch
+
+
+def load_cffi_abi_batch():
+    fib_cffi = _import_from(CFFI_DIR, 'fib_cffi')
+    return fib_cffi.batch_caller(*fib_cffi.open_abi_library(os.path.join(CFFI_DIR, 'libfibonacci.so')))
+
+
+def load_cffi_api_batch():
+    module = _import_from(CFFI_DIR, '_fib_cffi')
+    return _import_from(CFFI_DIR, 'fib_cffi').batch_caller(module.ffi, module.lib)
+
+
+def load_swig_batch():
+    return _import_from(SWIG_DIR, 'fibonacci').compute_fibonacci_batch
+
+
+def load_ctypes_batch():
+    import ctypes
+    libfib = ctypes.CDLL(os.path.join(CFFI_DIR, 'libfibonacci.so'))
+    c_int_p = ctypes.POINTER(ctypes.c_int)
+    libfib.compute_fibonacci_batch.argtypes = [c_int_p, c_int_p, ctypes.c_size_t]
+    libfib.compute_fibonacci_batch.restype = None
+
+    def compute_fibonacci_batch(ns, out=None):
+        if out is None:
+            out = array.array('i', bytes(memoryview(ns).nbytes))
+        count = len(ns)
+        libfib.compute_fibonacci_batch((ctypes.c_int * count).from_buffer(ns),
+                                       (ctypes.c_int * count).from_buffer(out), count)
+        return out
+    return compute_fibonacci_batch
+
+
+# Name of each backend mapped to a function which loads it and returns its batch entry point, which takes (ns, out=None)
+# buffers of C ints, fills out (allocating it if not given) with one call across the FFI boundary and returns it
+BATCH_BACKENDS = OrderedDict([
+    ('python', load_python_batch),
+    ('cython', load_cython_batch),
+    ('cython-wrapper', load_cython_wrapper_batch),
+    ('cffi-abi', load_cffi_abi_batch),
+    ('cffi-api', load_cffi_api_batch),
+    ('swig', load_swig_batch),
+    ('ctypes', load_ctypes_batch),
+])
+
+
+def batched(batch_func, batch_size):
+    """Adapt a batch entry point so it can be timed like a scalar compute_fibonacci callable.
+
+    Calling the returned function with n computes fib(n) batch_size times using one call to batch_func.
+
+    :param batch_func: batch entry point taking (ns, out) buffers
+    :param batch_size: number of values of n per call
+    :return: function taking n and returning the first result
+    """
+    buffers = {}
+
+    def compute_fibonacci(n):
+        if n not in buffers:
+            buffers[n] = (array.array('i', [n]) * batch_size, array.array('i', [0]) * batch_size)
+        ns, out = buffers[n]
+        batch_func(ns, out)
+        return out[0]
+    return compute_fibonacci
+
+
+def discover_backends(names=None, batch_size=None):
+    """Load every backend which is available.
+
+    :param names: (optional) only try to load backends with these names
+    :param batch_size: (optional) load the batch entry points instead, each computing this many values per call
+    :return: tuple of (OrderedDict of name -> callable, dict of name -> reason it couldn't be loaded)
+    """
+    available = OrderedDict()
+    missing = {}
+    for name, loader in (BATCH_BACKENDS if batch_size else BACKENDS).items():
+        if names and name not in names:
+            continue
+        try:
+            func = loader()
+            available[name] = batched(func, batch_size) if batch_size else func
+        except (ImportError, OSError, AttributeError) as ex:
+            missing[name] = str(ex)
+    return available, missing
+
+
+def time_backend(func, n, number, repeat, warmup):
+    """Time calls to a single backend.
+
+    :param func: compute_fibonacci callable to time
+    :param n: argument to pass to func
+    :param number: number of calls per timing sample
+    :param repeat: number of timing samples
+    :param warmup: number of untimed calls made first
+    :return: dict with the best and median average time per call in seconds
+    """
+    for _ in range(warmup):
+        func(n)
+
+    timer = timeit.Timer(lambda: func(n))
+    samples = [total / number for total in timer.repeat(repeat=repeat, number=number)]
+    return {'best': min(samples), 'median': statistics.median(samples)}
+
+
+def time_cold_cache(cached, n, number):
+    """Time calls to a cached backend which always start with an empty LRU cache, i.e. every call is a miss unless n
+    is in the precomputed table.
+
+    :param cached: FibonacciCache wrapping a backend
+    :param n: argument to pass to the backend
+    :param number: number of timing samples, each of a single call
+    :return: dict with the best and median time per call in seconds
+    """
+    timer = timeit.Timer(lambda: cached(n), setup=cached.cache_clear)
+    samples = timer.repeat(repeat=number, number=1)
+    return {'best': min(samples), 'median': statistics.median(samples)}
+
+
+def run_benchmarks(backends, n_values, numbers, repeat, warmup, batch_size=None, cache_size=None, table_size=0):
+    """Run every backend across the sweep of n values and call counts.
+
+    :param backends: OrderedDict of backend name -> compute_fibonacci callable
+    :param n_values: list of n values to compute
+    :param numbers: list of number of calls per timing sample
+    :param repeat: number of timing samples per measurement
+    :param warmup: number of untimed calls per measurement
+    :param batch_size: (optional) number of values each call computes when timing batch entry points - times are
+                       reported per computed value
+    :param cache_size: (optional) also time each backend wrapped in a FibonacciCache of this size, both cold (empty
+                       cache) and warm (after warmup)
+    :param table_size: size of the precomputed table used by the FibonacciCache
+    :return: list of result dicts, one per backend/n/number/cache combination
+    """
+    values_per_call = batch_size or 1
+    results = []
+    for n in n_values:
+        expected = compute_fibonacci(n)
+        for number in numbers:
+            python_time = None
+            for name, func in backends.items():
+                timings = [('none', func, time_backend(func, n, number, repeat, warmup), None)]
+                if cache_size is not None:
+                    cached = FibonacciCache(func, maxsize=cache_size, table_size=table_size)
+                    timings.append(('cold', cached, time_cold_cache(cached, n, number), cached.cache_info()))
+                    cached.cache_clear()
+                    timings.append(('warm', cached, time_backend(cached, n, number, repeat, warmup),
+                                    cached.cache_info()))
+
+                for cache_mode, timed_func, timing, info in timings:
+                    timing = {key: value / values_per_call for key, value in timing.items()}
+                    if name == 'python' and cache_mode == 'none':
+                        python_time = timing['best']
+                    result = OrderedDict([
+                        ('backend', name),
+                        ('n', n),
+                        ('number', number),
+                        ('batch_size', values_per_call),
+                        ('cache', cache_mode),
+                        ('best', timing['best']),
+                        ('median', timing['median']),
+                        ('speedup', python_time / timing['best'] if python_time else None),
+                        ('hit_rate', info.hit_rate if info else None),
+                        # C int results silently overflow for large n
+                        ('correct', timed_func(n) == expected),
+                    ])
+                    results.append(result)
+    return results
+
+
+def format_table(results):
+    """Format benchmark results as a plain text table.
+
+    :param results: list of result dicts from run_benchmarks()
+    :return: table as a string
+    """
+    row_format = '{:<16} {:>6} {:>9} {:>7} {:>6} {:>12} {:>12} {:>9} {:>9} {:>8}'
+    header = row_format.format('backend', 'n', 'number', 'batch', 'cache', 'best (s)', 'median (s)', 'speedup',
+                               'hit rate', 'correct')
+    lines = [header, '-' * len(header)]
+    for r in results:
+        speedup = '{:.3g}'.format(r['speedup']) if r['speedup'] else '-'
+        hit_rate = '{:.1%}'.format(r['hit_rate']) if r['hit_rate'] is not None else '-'
+        lines.append(row_format.format(r['backend'], r['n'], r['number'], r['batch_size'], r['cache'],
+                                       '{:.3g}'.format(r['best']), '{:.3g}'.format(r['median']), speedup, hit_rate,
+                                       'yes' if r['correct'] else 'NO'))
+    return '\n'.join(lines)
+
+
+def write_json(results, path):
+    with open(path, 'w') as outfile:
+        json.dump(results, outfile, indent=4)
+
+
+def write_csv(results, path):
+    with open(path, 'w', newline='') as outfile:
+        writer = csv.DictWriter(outfile, fieldnames=list(results[0].keys()))
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark all available fibonacci backends')
+    parser.add_argument('-n', '--n', type=int, nargs='+', default=[5, 20, 40], help='fibonacci numbers to compute')
+    parser.add_argument('--number', type=int, nargs='+', default=[1000, 100000],
+                        help='number of calls per timing sample')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='number of timing samples')
+    parser.add_argument('-w', '--warmup', type=int, default=100, help='number of untimed warmup calls')
+    parser.add_argument('-b', '--backends', nargs='+', choices=list(BACKENDS), help='only run these backends')
+    parser.add_argument('--batch-size', type=int,
+                        help='time the batch entry points, computing this many values per call')
+    parser.add_argument('--cache', type=int, metavar='MAXSIZE',
+                        help='also time each backend behind an LRU cache of this size, cold and warm')
+    parser.add_argument('--table-size', type=int, default=0,
+                        help='precompute results for n below this in the cache (requires --cache)')
+    parser.add_argument('--json', help='save results as JSON to this file')
+    parser.add_argument('--csv', help='save results as CSV to this file')
+    args = parser.parse_args(argv)
+    if args.table_size and args.cache is None:
+        parser.error('--table-size requires --cache')
+
+    backends, missing = discover_backends(args.backends, args.batch_size)
+    for name, reason in missing.items():
+        print('Skipping {}: {}'.format(name, reason), file=sys.stderr)
+    if not backends:
+        print('No backends available', file=sys.stderr)
+        return 1
+
+    results = run_benchmarks(backends, args.n, args.number, args.repeat, args.warmup, args.batch_size, args.cache,
+                             args.table_size)
+    print(format_table(results))
+
+    if args.json:
+        write_json(results, args.json)
+    if args.csv:
+        write_csv(results, args.csv)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+""" Memoizing cache for any compute_fibonacci backend - pure Python, Cython, CFFI, SWIG or ctypes.
+
+FibonacciCache wraps a compute_fibonacci callable with a bounded LRU cache and keeps counters for hits, misses and
+evictions.  Optionally, the results for every n below table_size are precomputed into a list so that lookups for small
+n never touch the LRU bookkeeping at all.
+
+The cache is not thread-safe; wrap each backend separately per thread if needed.
+"""
+from collections import OrderedDict
+
+
+class CacheInfo:
+    """Counters describing how effective a FibonacciCache has been."""
+    def __init__(self, hits=0, misses=0, evictions=0, currsize=0, maxsize=0, table_size=0):
+        self.hits = hits
+        self.misses = misses
+        self.evictions = evictions
+        self.currsize = currsize
+        self.maxsize = maxsize
+        self.table_size = table_size
+
+    @property
+    def hit_rate(self):
+        """Fraction of lookups which were answered from the table or the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __repr__(self):
+        return ('CacheInfo(hits={}, misses={}, evictions={}, currsize={}, maxsize={}, table_size={}, '
+                'hit_rate={:.3f})'.format(self.hits, self.misses, self.evictions, self.currsize, self.maxsize,
+                                         self.table_size, self.hit_rate))
+
+
+class FibonacciCache:
+    """Bounded LRU cache with an optional precomputed table in front of a compute_fibonacci callable."""
+    def __init__(self, func, maxsize=1024, table_size=0):
+        """
+        :param func: compute_fibonacci callable taking n
+        :param maxsize: maximum number of results kept in the LRU cache, 0 disables it
+        :param table_size: precompute the results for 0 <= n < table_size
+        """
+        if maxsize < 0:
+            raise ValueError('maxsize must not be negative')
+        self.func = func
+        self.maxsize = maxsize
+        self._table = [func(n) for n in range(table_size)]
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __call__(self, n):
+        if 0 <= n < len(self._table):
+            self.hits += 1
+            return self._table[n]
+
+        cache = self._cache
+        if n in cache:
+            self.hits += 1
+            cache.move_to_end(n)
+            return cache[n]
+
+        self.misses += 1
+        value = self.func(n)
+        if self.maxsize:
+            cache[n] = value
+            if len(cache) > self.maxsize:
+                # Evict the least recently used entry
+                cache.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def cache_info(self):
+        """Return a snapshot of the cache counters.
+
+        :return: CacheInfo
+        """
+        return CacheInfo(self.hits, self.misses, self.evictions, len(self._cache), self.maxsize, len(self._table))
+
+    def cache_clear(self, reset_stats=True):
+        """Empty the LRU cache, leaving the precomputed table intact.
+
+        :param reset_stats: also reset the hit, miss and eviction counters
+        """
+        self._cache.clear()
+        if reset_stats:
+            self.hits = self.misses = self.evictions = 0
+
+
+def memoize(maxsize=1024, table_size=0):
+    """Decorator which wraps a compute_fibonacci function in a FibonacciCache.
+
+    :param maxsize: maximum number of results kept in the LRU cache
+    :param table_size: precompute the results for 0 <= n < table_size
+    :return: decorator
+    """
+    def decorator(func):
+        return FibonacciCache(func, maxsize=maxsize, table_size=table_size)
+    return decorator
+
+
+if __name__ == '__main__':
+    import os
+    import sys
+    import timeit
+
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cython', 'fibonacci'))
+    from fib_python import compute_fibonacci
+
+    n = 20
+    try:
+        n = int(sys.argv[1])
+    except Exception:
+        pass
+
+    number_of_times = 100000
+    try:
+        number_of_times = int(sys.argv[2])
+    except Exception:
+        pass
+
+    cached = FibonacciCache(compute_fibonacci)
+    py_tot = timeit.timeit(lambda: compute_fibonacci(n), number=number_of_times)
+    # A cold call is a miss, so time many single calls which each start with an empty cache
+    cold_time = min(timeit.repeat(lambda: cached(n), setup=cached.cache_clear, number=1, repeat=1000))
+    warm_tot = timeit.timeit(lambda: cached(n), number=number_of_times)
+
+    print("fib({}) = {}".format(n, cached(n)))
+    print("Uncached average time:    {0:.2g}".format(py_tot / number_of_times))
+    print("Cold cache time:          {0:.2g}".format(cold_time))
+    print("Warm cache average time:  {0:.2g}".format(warm_tot / number_of_times))
+    print(cached.cache_info())
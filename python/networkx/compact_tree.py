@@ -0,0 +1,282 @@
+#!/usr/bin/env python
+""" Compact, array-backed directory tree.
+
+A networkx DiGraph keeps a dict of attributes per node plus adjacency dicts per edge, which costs hundreds of bytes
+per filesystem entry.  CompactTree instead stores one row per entry in typed columns:
+
+    parent   int64    index of the parent directory, -1 for the root
+    name     bytes    offsets into one shared buffer of encoded names
+    size     uint64   st_size
+    mode     uint32   st_mode
+    mtime    int64    st_mtime_ns
+    depth    uint16   distance from the root
+
+which is under 40 bytes per entry plus the name itself.  Rows are appended parents-first, so every parent has a
+smaller index than its children and subtree aggregates can be computed in a single reverse pass.  Child lists for
+traversal are built on demand as a compressed (CSR) index, and a networkx graph is only created if asked for.
+
+NumPy is used to speed up the aggregation and index building when it is installed, but is not required.
+
+Usage: compact_tree.py [root_dir] [max_workers]
+"""
+import os
+import stat
+import sys
+import time
+from array import array
+from collections import deque
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from dir_graph import walk_tree
+
+ROOT_PARENT = -1
+
+
+class CompactTree:
+    """Directory tree stored as columns of typed arrays with one row per filesystem entry."""
+    def __init__(self):
+        self.parent = array('q')
+        self.name_offsets = array('Q', [0])
+        self.names = bytearray()
+        self.size = array('Q')
+        self.mode = array('I')
+        self.mtime = array('q')
+        self.depth = array('H')
+        # Built lazily by children() and invalidated by append()
+        self._child_offsets = None
+        self._child_index = None
+
+    @classmethod
+    def from_walk(cls, root, max_workers=None, onerror=None):
+        """Build a CompactTree by walking a directory tree with dir_graph.walk_tree().
+
+        :param root: path to the root directory
+        :param max_workers: (optional) number of directories to scan at once
+        :param onerror: (optional) called with any OSError
+        :return: CompactTree whose row 0 is the root, named by its absolute path
+        """
+        tree = cls()
+        # Only directories can be parents, so this dict is much smaller than the tree itself
+        dir_index = {}
+        for entry in walk_tree(root, max_workers, onerror):
+            parent = ROOT_PARENT if entry.parent is None else dir_index[entry.parent]
+            index = tree.append(parent, entry.name if parent != ROOT_PARENT else entry.path, entry.size, entry.mode,
+                                entry.mtime)
+            if entry.is_dir:
+                dir_index[entry.path] = index
+        return tree
+
+    @classmethod
+    def from_networkx(cls, graph, root):
+        """Build a CompactTree from a networkx graph laid out like dir_graph.build_graph().
+
+        :param graph: networkx DiGraph with name, size, mode and mtime node attributes
+        :param root: full path of the root node
+        :return: CompactTree
+        """
+        import networkx as nx
+
+        tree = cls()
+        nodes = graph.nodes
+        index = {root: tree.append(ROOT_PARENT, root, nodes[root]['size'], nodes[root]['mode'], nodes[root]['mtime'])}
+        # Breadth-first order adds every parent before its children
+        for parent, child in nx.bfs_edges(graph, root):
+            attrs = nodes[child]
+            index[child] = tree.append(index[parent], attrs['name'], attrs['size'], attrs['mode'], attrs['mtime'])
+        return tree
+
+    def append(self, parent, name, size, mode, mtime=0):
+        """Add an entry, which must come after its parent.
+
+        :param parent: index of the parent directory, or ROOT_PARENT for the root
+        :param name: file name, or the full path for the root
+        :param size: size in bytes
+        :param mode: st_mode
+        :param mtime: st_mtime_ns
+        :return: index of the new entry
+        """
+        index = len(self.parent)
+        if parent != ROOT_PARENT and not 0 <= parent < index:
+            raise ValueError('parent {} must be added before its children'.format(parent))
+        self.parent.append(parent)
+        self.names += os.fsencode(name)
+        self.name_offsets.append(len(self.names))
+        self.size.append(size)
+        self.mode.append(mode)
+        self.mtime.append(mtime)
+        self.depth.append(0 if parent == ROOT_PARENT else self.depth[parent] + 1)
+        self._child_offsets = self._child_index = None
+        return index
+
+    def __len__(self):
+        return len(self.parent)
+
+    @property
+    def nbytes(self):
+        """Approximate number of bytes used by the columns."""
+        columns = (self.parent, self.name_offsets, self.size, self.mode, self.mtime, self.depth,
+                   self._child_offsets or (), self._child_index or ())
+        return len(self.names) + sum(len(c) * c.itemsize for c in columns if c)
+
+    def name(self, index):
+        return os.fsdecode(bytes(self.names[self.name_offsets[index]:self.name_offsets[index + 1]]))
+
+    def path(self, index):
+        """Full path of an entry, rebuilt from the names of its ancestors."""
+        parts = []
+        while index != ROOT_PARENT:
+            parts.append(self.name(index))
+            index = self.parent[index]
+        return os.path.join(*reversed(parts))
+
+    def is_dir(self, index):
+        return stat.S_ISDIR(self.mode[index])
+
+    def _build_child_index(self):
+        """Build the CSR child index: the children of i are _child_index[_child_offsets[i]:_child_offsets[i + 1]]."""
+        n = len(self)
+        if np is not None and n:
+            parent = np.frombuffer(self.parent, dtype=np.int64)[1:]
+            counts = np.bincount(parent, minlength=n)
+            offsets = np.zeros(n + 1, dtype=np.int64)
+            np.cumsum(counts, out=offsets[1:])
+            # A stable sort keeps each directory's children in the order they were added
+            child_index = np.argsort(parent, kind='stable') + 1
+            self._child_offsets = array('q', offsets.tobytes())
+            self._child_index = array('q', child_index.astype(np.int64).tobytes())
+            return
+
+        offsets = array('q', bytes(8 * (n + 1)))
+        for p in self.parent[1:]:
+            offsets[p + 1] += 1
+        for i in range(n):
+            offsets[i + 1] += offsets[i]
+        child_index = array('q', bytes(8 * max(n - 1, 0)))
+        fill = array('q', offsets[:n])
+        for child in range(1, n):
+            p = self.parent[child]
+            child_index[fill[p]] = child
+            fill[p] += 1
+        self._child_offsets = offsets
+        self._child_index = child_index
+
+    def children(self, index):
+        """Indices of the entries directly inside a directory."""
+        if self._child_offsets is None:
+            self._build_child_index()
+        return self._child_index[self._child_offsets[index]:self._child_offsets[index + 1]]
+
+    def bfs(self, start=0):
+        """Generate entry indices breadth-first from start."""
+        todo = deque([start])
+        while todo:
+            index = todo.popleft()
+            yield index
+            todo.extend(self.children(index))
+
+    def dfs(self, start=0):
+        """Generate entry indices depth-first (pre-order) from start."""
+        todo = [start]
+        while todo:
+            index = todo.pop()
+            yield index
+            # Reverse so children are visited in the order they were added
+            todo.extend(reversed(self.children(index)))
+
+    def find(self, path):
+        """Return the index of the entry with the given path, or None if it isn't in the tree.
+
+        :param path: full path, or a path relative to the root
+        """
+        root = self.name(0)
+        relative = os.path.relpath(os.path.join(root, path), root)
+        if relative == os.curdir:
+            return 0
+        # Outside the root - but a name which merely starts with '..', such as '..data', is inside it
+        if relative == os.pardir or relative.startswith(os.pardir + os.sep):
+            return None
+        index = 0
+        for part in relative.split(os.sep):
+            encoded = os.fsencode(part)
+            for child in self.children(index):
+                if self.names[self.name_offsets[child]:self.name_offsets[child + 1]] == encoded:
+                    index = child
+                    break
+            else:
+                return None
+        return index
+
+    def subtree_sizes(self):
+        """Total size in bytes of every entry plus everything below it.
+
+        :return: numpy uint64 array if NumPy is installed, otherwise an array('Q'), indexed like the tree
+        """
+        if np is not None:
+            totals = np.array(np.frombuffer(self.size, dtype=np.uint64))
+            if len(self) <= 1:
+                return totals
+            parent = np.frombuffer(self.parent, dtype=np.int64)
+            depth = np.frombuffer(self.depth, dtype=np.uint16)
+            # Fold each level into the one above it, deepest first
+            order = np.argsort(depth, kind='stable')
+            bounds = np.searchsorted(depth[order], np.arange(int(depth.max()) + 2))
+            for level in range(int(depth.max()), 0, -1):
+                rows = order[bounds[level]:bounds[level + 1]]
+                np.add.at(totals, parent[rows], totals[rows])
+            return totals
+
+        totals = array('Q', self.size)
+        # Children always come after their parents, so one reverse pass sees every child before its parent
+        for index in range(len(self) - 1, 0, -1):
+            totals[self.parent[index]] += totals[index]
+        return totals
+
+    def to_networkx(self):
+        """Export to a networkx DiGraph with the same layout as dir_graph.build_graph().
+
+        :return: (graph, full path of the root node)
+        """
+        import networkx as nx
+
+        graph = nx.DiGraph()
+        paths = []
+        for index in range(len(self)):
+            parent = self.parent[index]
+            path = self.name(index) if parent == ROOT_PARENT else os.path.join(paths[parent], self.name(index))
+            paths.append(path)
+            graph.add_node(path, name=os.path.basename(path) or path, is_dir=self.is_dir(index), size=self.size[index],
+                           mode=self.mode[index], mtime=self.mtime[index])
+            if parent != ROOT_PARENT:
+                graph.add_edge(paths[parent], path)
+        return graph, paths[0] if paths else None
+
+
+if __name__ == '__main__':
+    root_dir = '.'
+    if len(sys.argv) > 1:
+        root_dir = sys.argv[1]
+
+    workers = None
+    try:
+        workers = int(sys.argv[2])
+    except (IndexError, ValueError):
+        pass
+
+    begin = time.perf_counter()
+    tree = CompactTree.from_walk(root_dir, workers)
+    elapsed = time.perf_counter() - begin
+    print("Built a compact tree of {} entries in {:.3g} s using {} bytes ({:.1f} bytes/entry)".format(
+        len(tree), elapsed, tree.nbytes, tree.nbytes / max(len(tree), 1)))
+
+    begin = time.perf_counter()
+    sizes = tree.subtree_sizes()
+    elapsed = time.perf_counter() - begin
+    print("Aggregated subtree sizes in {:.3g} s".format(elapsed))
+
+    print("\nLargest entries directly under {}:".format(tree.path(0)))
+    for child in sorted(tree.children(0), key=lambda i: sizes[i], reverse=True)[:10]:
+        print("\t{:>14} {}{}".format(int(sizes[child]), tree.name(child), os.sep if tree.is_dir(child) else ''))
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+""" Scalable directory graph builder.
+
+Walks a directory tree with os.scandir(), so each entry is stat'ed at most once via DirEntry.stat(), and scans
+subdirectories concurrently in a thread pool - scandir() and stat() release the GIL while they wait on the filesystem,
+which matters most on network shares.
+
+Nodes are keyed by their full path, so same-named files in different directories are separate nodes.
+
+Usage: dir_graph.py [root_dir] [max_workers]
+"""
+import collections
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+try:
+    import networkx as nx
+except ImportError:
+    nx = None
+
+# One filesystem entry found by walk_tree()
+#   path: full path, which is also the node key
+#   parent: full path of the containing directory, None for the root
+#   name: basename
+#   is_dir: True for directories (symbolic links to directories are not followed, so they are not directories here)
+#   size: st_size in bytes
+#   mode: st_mode
+#   mtime: st_mtime_ns
+Entry = collections.namedtuple('Entry', ['path', 'parent', 'name', 'is_dir', 'size', 'mode', 'mtime'])
+
+
+def root_entry(root):
+    """Return the Entry for the root directory of a walk.
+
+    :param root: path to the root directory
+    :return: Entry with an absolute path and no parent
+    """
+    path = os.path.abspath(root)
+    st = os.stat(path)
+    return Entry(path, None, os.path.basename(path) or path, True, st.st_size, st.st_mode, st.st_mtime_ns)
+
+
+def scan_directory(path, onerror=None):
+    """List the entries of a single directory.
+
+    :param path: full path of the directory
+    :param onerror: (optional) called with the OSError if the directory or one of its entries can't be read
+    :return: list of Entry, one per child of the directory
+    """
+    entries = []
+    try:
+        with os.scandir(path) as it:
+            for d in it:
+                try:
+                    # follow_symlinks=False both avoids loops and lets stat() reuse what readdir() already returned
+                    is_dir = d.is_dir(follow_symlinks=False)
+                    st = d.stat(follow_symlinks=False)
+                except OSError as err:
+                    if onerror is not None:
+                        onerror(err)
+                    continue
+                entries.append(Entry(d.path, path, d.name, is_dir, st.st_size, st.st_mode, st.st_mtime_ns))
+    except OSError as err:
+        if onerror is not None:
+            onerror(err)
+    return entries
+
+
+def walk_tree(root, max_workers=None, onerror=None):
+    """Generate an Entry for the root directory and everything below it, scanning directories concurrently.
+
+    Each directory's children are generated together, but directories are generated in whatever order their scans
+    finish, so parents always come before their children but the overall order is not deterministic.
+
+    :param root: path to the root directory
+    :param max_workers: (optional) number of directories to scan at once, defaults to ThreadPoolExecutor's default
+    :param onerror: (optional) called with any OSError, like os.walk() - by default unreadable entries are skipped
+    :return: generator of Entry
+    """
+    top = root_entry(root)
+    yield top
+
+    with ThreadPoolExecutor(max_workers) as pool:
+        pending = {pool.submit(scan_directory, top.path, onerror)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                for entry in future.result():
+                    if entry.is_dir:
+                        pending.add(pool.submit(scan_directory, entry.path, onerror))
+                    yield entry
+
+
+def build_graph(root, max_workers=None, onerror=None):
+    """Build a networkx DiGraph of a directory tree with an edge from each directory to each of its children.
+
+    Every node is keyed by its full path and has name, is_dir, size, mode and mtime attributes.
+
+    :param root: path to the root directory
+    :param max_workers: (optional) number of directories to scan at once
+    :param onerror: (optional) called with any OSError
+    :return: (graph, full path of the root node)
+    """
+    if nx is None:
+        raise ImportError('build_graph() requires networkx')
+
+    graph = nx.DiGraph()
+    root_path = None
+    for entry in walk_tree(root, max_workers, onerror):
+        graph.add_node(entry.path, name=entry.name, is_dir=entry.is_dir, size=entry.size, mode=entry.mode,
+                       mtime=entry.mtime)
+        if entry.parent is None:
+            root_path = entry.path
+        else:
+            graph.add_edge(entry.parent, entry.path)
+    return graph, root_path
+
+
+if __name__ == '__main__':
+    root_dir = '.'
+    if len(sys.argv) > 1:
+        root_dir = sys.argv[1]
+
+    workers = None
+    try:
+        workers = int(sys.argv[2])
+    except (IndexError, ValueError):
+        pass
+
+    begin = time.perf_counter()
+    count = sum(1 for _ in walk_tree(root_dir, workers))
+    elapsed = time.perf_counter() - begin
+    print("Walked {} entries under '{}' in {:.3g} s".format(count, root_dir, elapsed))
+
+    if nx is not None:
+        begin = time.perf_counter()
+        G, root_node = build_graph(root_dir, workers)
+        elapsed = time.perf_counter() - begin
+        print("Built a graph of {} nodes and {} edges rooted at '{}' in {:.3g} s".format(
+            G.number_of_nodes(), G.number_of_edges(), root_node, elapsed))
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+""" Disk usage queries over a directory tree, answered from indexes precomputed in one pass.
+
+DirectoryIndex walks a CompactTree once from the leaves up to total the bytes, number of files and depth below every
+directory, and once top-down to number the entries in depth-first order so that each subtree is a contiguous range
+of those numbers.  From then on:
+
+- the largest subtrees are a slice of the directories sorted by total size
+- files larger than X are a slice of the files sorted by size, and files under path P are a slice of the files sorted
+  by pre-order number, so "larger than X under P" scans whichever of the two slices is shorter
+- files with a given mode are a dict lookup
+
+so no query has to traverse the tree.  Rebuild the index after refreshing the tree.
+
+Usage: dir_query.py [-h] [-k TOP] [--larger-than BYTES] [--under PATH] [--mode MODE] [root_dir]
+"""
+import argparse
+import bisect
+import collections
+import heapq
+import stat
+import time
+from array import array
+
+from compact_tree import CompactTree
+
+# Aggregates for one entry of a DirectoryIndex
+#   total_bytes: size of the entry plus everything below it
+#   file_count: number of non-directories at or below the entry
+#   max_depth: number of levels below the entry, 0 for files and empty directories
+Aggregates = collections.namedtuple('Aggregates', ['total_bytes', 'file_count', 'max_depth'])
+
+
+class DirectoryIndex:
+    """Precomputed subtree aggregates and query indexes for a CompactTree."""
+    def __init__(self, tree):
+        """
+        :param tree: compact_tree.CompactTree, which must not be changed while the index is in use
+        """
+        self.tree = tree
+        n = len(tree)
+        parent = tree.parent
+        is_dir = [stat.S_ISDIR(mode) for mode in tree.mode]
+
+        self.total_bytes = array('Q', tree.size)
+        self.file_count = array('Q', [0 if d else 1 for d in is_dir])
+        self.max_depth = array('H', bytes(2 * n))
+        entry_count = array('Q', [1] * n)
+        # Children always come after their parents, so one reverse pass folds every subtree into its parent
+        for index in range(n - 1, 0, -1):
+            p = parent[index]
+            self.total_bytes[p] += self.total_bytes[index]
+            self.file_count[p] += self.file_count[index]
+            entry_count[p] += entry_count[index]
+            if self.max_depth[index] + 1 > self.max_depth[p]:
+                self.max_depth[p] = self.max_depth[index] + 1
+
+        # The subtree of i is every entry whose pre-order number is in [_preorder[i], _preorder[i] + entry_count[i])
+        self._preorder = array('q', bytes(8 * n))
+        for number, index in enumerate(tree.dfs() if n else ()):
+            self._preorder[index] = number
+        self._entry_count = entry_count
+
+        dirs = [i for i in range(n) if is_dir[i]]
+        dirs.sort(key=self.total_bytes.__getitem__, reverse=True)
+        self._dirs_by_total = array('q', dirs)
+
+        files = [i for i in range(n) if not is_dir[i]]
+        files.sort(key=tree.size.__getitem__)
+        self._files_by_size = array('q', files)
+        self._file_sizes = array('Q', [tree.size[i] for i in files])
+
+        # The files of every subtree are a contiguous run of this order
+        files.sort(key=self._preorder.__getitem__)
+        self._files_by_preorder = array('q', files)
+        self._file_preorder = array('q', [self._preorder[i] for i in files])
+
+        self._files_by_mode = collections.defaultdict(lambda: array('q'))
+        for i in files:
+            self._files_by_mode[tree.mode[i]].append(i)
+        self._files_by_mode.default_factory = None
+
+    @classmethod
+    def from_walk(cls, root, max_workers=None, onerror=None):
+        """Walk a directory tree and index it."""
+        return cls(CompactTree.from_walk(root, max_workers, onerror))
+
+    @classmethod
+    def from_networkx(cls, graph, root):
+        """Index a networkx graph built by dir_graph.build_graph()."""
+        return cls(CompactTree.from_networkx(graph, root))
+
+    def _lookup(self, path):
+        index = self.tree.find(path)
+        if index is None:
+            raise KeyError(path)
+        return index
+
+    def _contains(self, ancestor, index):
+        start = self._preorder[ancestor]
+        return start <= self._preorder[index] < start + self._entry_count[ancestor]
+
+    def aggregates(self, path):
+        """Return the Aggregates for an entry.
+
+        :param path: full path, or a path relative to the root
+        :raises KeyError: if the path isn't in the tree
+        """
+        index = self._lookup(path)
+        return Aggregates(self.total_bytes[index], self.file_count[index], self.max_depth[index])
+
+    def largest_subtrees(self, k=10):
+        """Return the k directories with the largest total size, largest first.
+
+        Every directory is counted, so a large directory and its ancestors all appear.
+
+        :return: list of (path, Aggregates)
+        """
+        return [(self.tree.path(i), Aggregates(self.total_bytes[i], self.file_count[i], self.max_depth[i]))
+                for i in self._dirs_by_total[:k]]
+
+    def files_larger_than(self, size, under=None, limit=None):
+        """Return the files larger than size bytes, largest first.
+
+        With under, only the files below it or only the files larger than size are looked at, whichever are fewer.
+
+        :param size: only return files with more than this many bytes
+        :param under: (optional) only return files below this path
+        :param limit: (optional) return at most this many files
+        :return: list of (path, size)
+        :raises KeyError: if under isn't in the tree
+        """
+        start = bisect.bisect_right(self._file_sizes, size)
+        if under is not None:
+            ancestor = self._lookup(under)
+            first = self._preorder[ancestor]
+            low = bisect.bisect_left(self._file_preorder, first)
+            high = bisect.bisect_left(self._file_preorder, first + self._entry_count[ancestor], low)
+            if high - low < len(self._file_sizes) - start:
+                # Fewer files under the directory than larger than size overall, so only look at those
+                sizes = self.tree.size
+                found = [(sizes[i], i) for i in self._files_by_preorder[low:high] if sizes[i] > size]
+                found = heapq.nlargest(limit, found) if limit is not None else sorted(found, reverse=True)
+                return [(self.tree.path(i), file_size) for file_size, i in found]
+        else:
+            ancestor = None
+
+        matches = []
+        for position in range(len(self._files_by_size) - 1, start - 1, -1):
+            if limit is not None and len(matches) >= limit:
+                break
+            index = self._files_by_size[position]
+            if ancestor is None or self._contains(ancestor, index):
+                matches.append((self.tree.path(index), self._file_sizes[position]))
+        return matches
+
+    def files_by_mode(self, mode):
+        """Return the paths of the files with exactly the given st_mode, e.g. 0o100755 for executable regular files."""
+        return [self.tree.path(i) for i in self._files_by_mode.get(mode, ())]
+
+    def mode_counts(self):
+        """Return a dict of st_mode to the number of files with that mode."""
+        return {mode: len(files) for mode, files in self._files_by_mode.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Disk usage report for a directory tree')
+    parser.add_argument('root_dir', nargs='?', default='.', help='directory to index')
+    parser.add_argument('-k', '--top', type=int, default=10, help='number of largest subtrees to show')
+    parser.add_argument('--larger-than', type=int, help='list the files with more than this many bytes')
+    parser.add_argument('--under', help='only list files below this path, used with --larger-than')
+    parser.add_argument('--mode', type=lambda value: int(value, 8), help='list the files with this octal st_mode')
+    args = parser.parse_args(argv)
+
+    begin = time.perf_counter()
+    index = DirectoryIndex.from_walk(args.root_dir)
+    elapsed = time.perf_counter() - begin
+    root = index.aggregates('.')
+    print("Indexed {} entries ({} files, {} bytes, {} levels deep) in {:.3g} s".format(
+        len(index.tree), root.file_count, root.total_bytes, root.max_depth, elapsed))
+
+    print("\nLargest subtrees:")
+    for path, agg in index.largest_subtrees(args.top):
+        print("\t{:>14} {:>8} files  {}".format(agg.total_bytes, agg.file_count, path))
+
+    if args.larger_than is not None:
+        print("\nFiles larger than {} bytes{}:".format(args.larger_than,
+                                                      ' under ' + args.under if args.under else ''))
+        for path, size in index.files_larger_than(args.larger_than, args.under):
+            print("\t{:>14} {}".format(size, path))
+
+    print("\nFiles by mode:")
+    for mode, count in sorted(index.mode_counts().items(), key=lambda item: item[1], reverse=True):
+        print("\t{:o} {} {:>8}".format(mode, stat.filemode(mode), count))
+    if args.mode is not None:
+        print("\nFiles with mode {:o}:".format(args.mode))
+        for path in index.files_by_mode(args.mode):
+            print("\t{}".format(path))
+
+
+if __name__ == '__main__':
+    main()
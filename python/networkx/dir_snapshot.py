@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+""" Incremental refresh of a directory graph from a saved snapshot.
+
+A directory's mtime changes whenever an entry is created, deleted or renamed inside it, so a rescan only needs to
+list the directories whose mtime differs from the snapshot.  Every other directory costs a single stat() to check it,
+which is far cheaper than listing it and stat'ing each of its entries.
+
+Note that writing to an existing file does not change its directory's mtime.  Pass stat_files=True to refresh() to
+also stat the files in unchanged directories, which catches in-place modifications without listing any directories.
+
+The graph is the one built by dir_graph.build_graph(), and is patched in place.
+
+Usage: dir_snapshot.py [root_dir] [snapshot_file] [--stat-files]
+    Builds and saves a snapshot the first time, then refreshes it and reports what changed on every later run.
+"""
+import collections
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import networkx as nx
+
+from dir_graph import build_graph, scan_directory
+
+SNAPSHOT_FILE = 'graph.snapshot'
+
+# Bump this whenever the snapshot layout changes so that old snapshots get rebuilt instead of misread
+SNAPSHOT_VERSION = 1
+
+# Paths of the entries added, deleted and modified by a refresh
+Changes = collections.namedtuple('Changes', ['added', 'deleted', 'modified'])
+
+
+def save_snapshot(path, graph, root):
+    """Atomically save a directory graph so a crash can't leave a truncated snapshot behind.
+
+    :param path: snapshot file to write
+    :param graph: graph from dir_graph.build_graph()
+    :param root: full path of the root node
+    """
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as snapshot_file:
+        pickle.dump((SNAPSHOT_VERSION, root, graph), snapshot_file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path):
+    """Load a directory graph saved by save_snapshot().
+
+    :param path: snapshot file to read
+    :return: (graph, full path of the root node)
+    :raises ValueError: if the snapshot was written by an incompatible version
+    """
+    with open(path, 'rb') as snapshot_file:
+        version, root, graph = pickle.load(snapshot_file)
+    if version != SNAPSHOT_VERSION:
+        raise ValueError('snapshot {} has version {}, expected {}'.format(path, version, SNAPSHOT_VERSION))
+    return graph, root
+
+
+def _check_directory(path, known_mtime, files, onerror):
+    """Thread function which does all of the filesystem work for one directory of a refresh.
+
+    :param path: full path of the directory
+    :param known_mtime: mtime from the snapshot, or None to always list the directory
+    :param files: paths of files in the directory to stat if the directory is unchanged
+    :param onerror: (optional) called with any OSError
+    :return: (path, current stat or None if it has gone, list of Entry if it was listed or else None,
+              dict of file path to current stat or None if it has gone)
+    """
+    try:
+        st = os.stat(path, follow_symlinks=False)
+    except OSError as err:
+        if onerror is not None:
+            onerror(err)
+        return path, None, None, {}
+
+    if st.st_mtime_ns != known_mtime:
+        return path, st, scan_directory(path, onerror), {}
+
+    file_stats = {}
+    for file_path in files:
+        try:
+            file_stats[file_path] = os.stat(file_path, follow_symlinks=False)
+        except OSError:
+            file_stats[file_path] = None
+    return path, st, None, file_stats
+
+
+def _remove_subtree(graph, path, deleted):
+    """Remove an entry and everything below it from the graph, recording the removed paths."""
+    nodes = nx.descendants(graph, path)
+    nodes.add(path)
+    deleted.extend(nodes)
+    graph.remove_nodes_from(nodes)
+
+
+def _changed(attrs, size, mode, mtime):
+    return (attrs['size'], attrs['mode'], attrs['mtime']) != (size, mode, mtime)
+
+
+def refresh(graph, root, max_workers=None, stat_files=False, onerror=None):
+    """Bring a directory graph up to date, listing only the directories whose mtime has changed.
+
+    :param graph: graph from dir_graph.build_graph() or load_snapshot(), which is patched in place
+    :param root: full path of the root node
+    :param max_workers: (optional) number of directories to check at once
+    :param stat_files: also stat the files in unchanged directories to catch in-place modifications
+    :param onerror: (optional) called with any OSError
+    :return: Changes listing the paths which were added, deleted and modified
+    """
+    added, deleted, modified = [], [], []
+    nodes = graph.nodes
+
+    def known_files(path):
+        if not stat_files:
+            return ()
+        return [child for child in graph.successors(path) if not nodes[child]['is_dir']]
+
+    with ThreadPoolExecutor(max_workers) as pool:
+        pending = {pool.submit(_check_directory, root, nodes[root]['mtime'], known_files(root), onerror)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, st, entries, file_stats = future.result()
+                if st is None or path not in graph:
+                    # Gone since the parent was checked - the parent's listing records the deletion
+                    continue
+                attrs = nodes[path]
+                attrs['size'], attrs['mode'], attrs['mtime'] = st.st_size, st.st_mode, st.st_mtime_ns
+
+                subdirs = []
+                if entries is None:
+                    for file_path, file_st in file_stats.items():
+                        if file_st is None:
+                            _remove_subtree(graph, file_path, deleted)
+                        elif _changed(nodes[file_path], file_st.st_size, file_st.st_mode, file_st.st_mtime_ns):
+                            nodes[file_path].update(size=file_st.st_size, mode=file_st.st_mode,
+                                                    mtime=file_st.st_mtime_ns)
+                            modified.append(file_path)
+                    subdirs = [(child, nodes[child]['mtime']) for child in graph.successors(path)
+                               if nodes[child]['is_dir']]
+                else:
+                    listed = {entry.path for entry in entries}
+                    for child in [c for c in graph.successors(path) if c not in listed]:
+                        _remove_subtree(graph, child, deleted)
+
+                    for entry in entries:
+                        old = nodes[entry.path] if entry.path in graph else None
+                        if old is not None and old['is_dir'] != entry.is_dir:
+                            # Replaced by an entry of the other type, e.g. a file by a directory of the same name
+                            _remove_subtree(graph, entry.path, deleted)
+                            old = None
+                        if old is None:
+                            graph.add_node(entry.path, name=entry.name, is_dir=entry.is_dir, size=entry.size,
+                                           mode=entry.mode, mtime=entry.mtime)
+                            graph.add_edge(path, entry.path)
+                            added.append(entry.path)
+                            if entry.is_dir:
+                                subdirs.append((entry.path, None))
+                        elif entry.is_dir:
+                            # Leave the directory's attributes alone until it is checked against its old mtime
+                            subdirs.append((entry.path, old['mtime']))
+                        elif _changed(old, entry.size, entry.mode, entry.mtime):
+                            old.update(size=entry.size, mode=entry.mode, mtime=entry.mtime)
+                            modified.append(entry.path)
+
+                for subdir, known_mtime in subdirs:
+                    pending.add(pool.submit(_check_directory, subdir, known_mtime,
+                                            known_files(subdir) if known_mtime is not None else (), onerror))
+
+    return Changes(sorted(added), sorted(deleted), sorted(modified))
+
+
+if __name__ == '__main__':
+    args = [arg for arg in sys.argv[1:] if arg != '--stat-files']
+    root_dir = args[0] if args else '.'
+    snapshot = args[1] if len(args) > 1 else SNAPSHOT_FILE
+
+    begin = time.perf_counter()
+    try:
+        G, root_name = load_snapshot(snapshot)
+    except (OSError, ValueError):
+        G, root_name = build_graph(root_dir)
+        print("Built a new snapshot of {} entries in {:.3g} s".format(G.number_of_nodes(),
+                                                                      time.perf_counter() - begin))
+    else:
+        if root_name != os.path.abspath(root_dir):
+            sys.exit("Snapshot {} is of {}, not {}".format(snapshot, root_name, os.path.abspath(root_dir)))
+        changes = refresh(G, root_name, stat_files='--stat-files' in sys.argv)
+        print("Refreshed a snapshot of {} entries in {:.3g} s".format(G.number_of_nodes(),
+                                                                     time.perf_counter() - begin))
+        for label, paths in zip(('Added', 'Deleted', 'Modified'), changes):
+            print("{}: {}".format(label, len(paths)))
+            for path in paths:
+                print("\t{}".format(path))
+    save_snapshot(snapshot, G, root_name)
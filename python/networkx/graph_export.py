@@ -0,0 +1,247 @@
+#!/usr/bin/env python
+""" Streaming, bounded-memory exporters for directory graphs.
+
+networkx's node_link_data() and write_graphml() build a copy of the whole graph as dicts or an XML tree before anything
+is written.  These writers instead take iterables of nodes and edges and write each one to a file handle as soon as
+it is produced, so the memory they use doesn't depend on the size of the graph:
+
+- JSON lines: one {"type": "node", ...} or {"type": "edge", ...} object per line
+- node-link JSON: the same document as json.dump(networkx.node_link_data(G)), one node or edge per line
+- GraphML: readable by networkx.read_graphml(), Gephi, yEd, etc.
+
+Nodes are (id, attribute dict) pairs and edges are (source, target) pairs.  graph_items() and tree_items() produce
+them from a networkx graph or a CompactTree without copying it.
+
+Output files ending in .zst are compressed with zstd, which requires the zstandard package.  Bytes in file names which
+aren't valid UTF-8 are written as backslash escapes, and export() writes to a temporary file which only replaces the
+output once it is complete.
+
+Usage: graph_export.py [root_dir] [output_file]
+    The format is chosen from the extension: .jsonl, .json or .graphml, optionally followed by .zst
+"""
+import io
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from xml.sax.saxutils import escape, quoteattr
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# GraphML types of the attributes on every node of a directory graph
+DIRECTORY_ATTRS = OrderedDict([('name', 'string'), ('is_dir', 'boolean'), ('size', 'long'), ('mode', 'int'),
+                               ('mtime', 'long')])
+
+FORMATS = ('jsonl', 'node-link', 'graphml')
+
+_EXTENSION_FORMATS = {'.jsonl': 'jsonl', '.json': 'node-link', '.graphml': 'graphml'}
+
+_compact_json = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), check_circular=False).encode
+
+
+def graph_items(graph):
+    """Return lazy (nodes, edges) iterables for a networkx graph.
+
+    :param graph: networkx graph
+    :return: (iterable of (id, attribute dict), iterable of (source, target))
+    """
+    return graph.nodes(data=True), graph.edges()
+
+
+def tree_items(tree):
+    """Return lazy (nodes, edges) iterables for a CompactTree, laid out like dir_graph.build_graph().
+
+    :param tree: compact_tree.CompactTree
+    :return: (iterable of (id, attribute dict), iterable of (source, target))
+    """
+    def nodes():
+        for index in range(len(tree)):
+            path = tree.path(index)
+            yield path, {'name': os.path.basename(path) or path, 'is_dir': tree.is_dir(index),
+                         'size': tree.size[index], 'mode': tree.mode[index], 'mtime': tree.mtime[index]}
+
+    def edges():
+        for index in range(1, len(tree)):
+            yield tree.path(tree.parent[index]), tree.path(index)
+
+    return nodes(), edges()
+
+
+def write_jsonl(fh, nodes, edges):
+    """Write a graph as JSON lines - every node, then every edge.
+
+    :param fh: text file handle to write to
+    :param nodes: iterable of (id, attribute dict)
+    :param edges: iterable of (source, target)
+    :return: (number of nodes, number of edges) written
+    """
+    num_nodes = num_edges = 0
+    for node, attrs in nodes:
+        record = {'type': 'node', 'id': node}
+        record.update(attrs)
+        fh.write(_compact_json(record))
+        fh.write('\n')
+        num_nodes += 1
+    for source, target in edges:
+        fh.write(_compact_json({'type': 'edge', 'source': source, 'target': target}))
+        fh.write('\n')
+        num_edges += 1
+    return num_nodes, num_edges
+
+
+def write_node_link(fh, nodes, edges, directed=True, edges_key='edges'):
+    """Write a graph in networkx's node-link JSON format.
+
+    :param fh: text file handle to write to
+    :param nodes: iterable of (id, attribute dict)
+    :param edges: iterable of (source, target)
+    :param directed: value of the "directed" member
+    :param edges_key: name of the edge list - networkx before 3.4 used "links"
+    :return: (number of nodes, number of edges) written
+    """
+    fh.write('{{"directed":{},"multigraph":false,"graph":{{}},"nodes":['.format(_compact_json(directed)))
+    num_nodes = num_edges = 0
+    for node, attrs in nodes:
+        record = dict(attrs)
+        record['id'] = node
+        fh.write('\n' if num_nodes == 0 else ',\n')
+        fh.write(_compact_json(record))
+        num_nodes += 1
+    fh.write('\n],{}:['.format(_compact_json(edges_key)))
+    for source, target in edges:
+        fh.write('\n' if num_edges == 0 else ',\n')
+        fh.write(_compact_json({'source': source, 'target': target}))
+        num_edges += 1
+    fh.write('\n]}\n')
+    return num_nodes, num_edges
+
+
+def _graphml_value(value):
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return escape(str(value))
+
+
+def write_graphml(fh, nodes, edges, attr_types=DIRECTORY_ATTRS, directed=True):
+    """Write a graph as GraphML.
+
+    GraphML declares every attribute before the first node, so the attribute names and types must be known up front.
+    Attributes which aren't in attr_types are not written.
+
+    :param fh: text file handle to write to
+    :param nodes: iterable of (id, attribute dict)
+    :param edges: iterable of (source, target)
+    :param attr_types: ordered mapping of node attribute name to GraphML type (string, boolean, int, long, ...)
+    :param directed: write a directed graph
+    :return: (number of nodes, number of edges) written
+    """
+    fh.write('<?xml version="1.0" encoding="utf-8"?>\n'
+             '<graphml xmlns="http://graphml.graphdrawing.org/xmlns" '
+             'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+             'xsi:schemaLocation="http://graphml.graphdrawing.org/xmlns '
+             'http://graphml.graphdrawing.org/xmlns/1.0/graphml.xsd">\n')
+    keys = OrderedDict()
+    for i, (name, attr_type) in enumerate(attr_types.items()):
+        keys[name] = 'd{}'.format(i)
+        fh.write('  <key id="{}" for="node" attr.name={} attr.type="{}" />\n'.format(keys[name], quoteattr(name),
+                                                                                      attr_type))
+    fh.write('  <graph edgedefault="{}">\n'.format('directed' if directed else 'undirected'))
+
+    num_nodes = num_edges = 0
+    for node, attrs in nodes:
+        data = ''.join('\n      <data key="{}">{}</data>'.format(key, _graphml_value(attrs[name]))
+                       for name, key in keys.items() if name in attrs)
+        fh.write('    <node id={}>{}\n    </node>\n'.format(quoteattr(str(node)), data) if data else
+                 '    <node id={} />\n'.format(quoteattr(str(node))))
+        num_nodes += 1
+    for source, target in edges:
+        fh.write('    <edge source={} target={} />\n'.format(quoteattr(str(source)), quoteattr(str(target))))
+        num_edges += 1
+    fh.write('  </graph>\n</graphml>\n')
+    return num_nodes, num_edges
+
+
+def open_output(path, compress=None, level=3):
+    """Open a text file for writing, compressing it with zstd if asked to or if the name ends in .zst.
+
+    :param path: file to write
+    :param compress: (optional) True or False to override the choice made from the file extension
+    :param level: zstd compression level
+    :return: text file handle, which must be closed to finish the compressed stream
+    """
+    if compress is None:
+        compress = path.endswith('.zst')
+    # os.scandir() decodes undecodable bytes in file names as lone surrogates, which UTF-8 can't encode.  Writing them
+    # as \udcXX keeps the output valid, and in JSON strings that is an escape which decodes back to the same name.
+    if not compress:
+        return open(path, 'w', encoding='utf-8', errors='backslashreplace')
+    if zstandard is None:
+        raise ImportError('zstd compression requires the zstandard package')
+    raw = open(path, 'wb')
+    writer = zstandard.ZstdCompressor(level=level).stream_writer(raw, closefd=True)
+    return io.TextIOWrapper(writer, encoding='utf-8', errors='backslashreplace')
+
+
+def format_for(path):
+    """Choose an export format from a file name, ignoring any .zst suffix.
+
+    :param path: output file name
+    :return: one of FORMATS
+    """
+    if path.endswith('.zst'):
+        path = path[:-len('.zst')]
+    try:
+        return _EXTENSION_FORMATS[os.path.splitext(path)[1]]
+    except KeyError:
+        raise ValueError('unknown export format for {}, expected one of {}'.format(
+            path, ', '.join(sorted(_EXTENSION_FORMATS))))
+
+
+def export(path, nodes, edges, fmt=None, compress=None):
+    """Write a graph to a file in any of the supported formats.
+
+    The graph is written to path + '.tmp' and renamed to path once complete, so a failed export never leaves a
+    truncated file behind.
+
+    :param path: file to write
+    :param nodes: iterable of (id, attribute dict)
+    :param edges: iterable of (source, target)
+    :param fmt: (optional) one of FORMATS, chosen from the file name by default
+    :param compress: (optional) override whether to compress with zstd
+    :return: (number of nodes, number of edges) written
+    """
+    writers = {'jsonl': write_jsonl, 'node-link': write_node_link, 'graphml': write_graphml}
+    writer = writers[fmt or format_for(path)]
+    if compress is None:
+        compress = path.endswith('.zst')
+    tmp_path = path + '.tmp'
+    try:
+        with open_output(tmp_path, compress) as fh:
+            counts = writer(fh, nodes, edges)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+    return counts
+
+
+if __name__ == '__main__':
+    from compact_tree import CompactTree
+
+    root_dir = '.'
+    if len(sys.argv) > 1:
+        root_dir = sys.argv[1]
+
+    output = 'graph.jsonl'
+    if len(sys.argv) > 2:
+        output = sys.argv[2]
+
+    tree = CompactTree.from_walk(root_dir)
+    begin = time.perf_counter()
+    counts = export(output, *tree_items(tree))
+    elapsed = time.perf_counter() - begin
+    print("Wrote {} nodes and {} edges to {} in {:.3g} s".format(counts[0], counts[1], output, elapsed))
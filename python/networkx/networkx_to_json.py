@@ -2,47 +2,24 @@
 """ Experiment at using Networkx to store a directory structure and doing either a breath-first
 or depth-first traversal.
 """
-import os
 import sys
 
 import networkx as nx
 
-# Create an empty directed graph
-G = nx.DiGraph()
+from dir_graph import build_graph
+from graph_export import export, graph_items, write_node_link
 
 # Set the directory you want to start from
 root_dir = '.'
 if len(sys.argv) > 1:
     root_dir = sys.argv[1]
 
-root_name = os.path.basename(os.path.realpath(root_dir))
-
 print("Building a directory tree with root directory '{}'".format(root_dir))
-print("Root node name is: {}".format(root_name))
-
-# Traverse the directory structure breadth-first or depth-first?
-BREADTH_FIRST = False
-
-# Set topdown False to purpposely traverse in a depth-first fashion (not the default)
-for root, dirs, files in os.walk(root_dir, topdown=BREADTH_FIRST):
-    # print("root = {}".format(root))
-    dir_name = os.path.basename(os.path.realpath(root))
-    # print("dir_name = {}".format(dir_name))
-
-    for subdir in dirs:
-        # Note, adding edges automatically creates the associated nodes if they don't already exist
-        G.add_edge(dir_name, subdir)
-    for fname in files:
-        G.add_edge(dir_name, fname)
-        # Get info on file
-        path = os.path.join(root, fname)
-        file_stats = os.stat(path)
-        size = file_stats.st_size # in bytes
-        mode = file_stats.st_mode
 
-        # Each node contains a dictionary of attributes where it can store arbitrary data
-        G.node[fname]['size'] = size
-        G.node[fname]['mode'] = mode
+# Nodes are keyed by full path, so same-named files in different directories don't collide.  Each node contains a
+# dictionary of attributes where it can store arbitrary data - here name, is_dir, size, mode and mtime.
+G, root_name = build_graph(root_dir)
+print("Root node name is: {}".format(root_name))
 
 print("Nodes:")
 # the data=True also returns the attribute dictionary
@@ -63,19 +40,10 @@ for edge in bfs_edges:
 # bfs_tree = nx.bfs_tree(G, root_name)
 # bfs_successors = nx.bfs_successors(G, root_name)
 
-# You can also save the graph in several formats including JSON, YAML, and GraphML (an XML format)
-
-# Save in GraphML
-nx.write_graphml(G, 'graph.graphml')
-
-# Save in YAML
-nx.write_yaml(G, 'graph.yaml')
-
-# JSON - each node is a dict containing an "id" key and a "children" key pointing to a list of nodes
-from networkx.readwrite import json_graph
-data = json_graph.node_link_data(G)
-print("Directory graph in as JSON link data:\n{}".format(data))
+# You can also save the graph in several formats, including GraphML (an XML format) and JSON.  These are written one
+# node or edge at a time, so memory use doesn't grow with the size of the graph.
+export('graph.graphml', *graph_items(G))
 
-import json
-json_formatted = json.dumps(data, sort_keys = True, indent = 4, ensure_ascii=False)
-print("\nDirectory graph as more formatted JSON link data:\n{}".format(json_formatted))
+# JSON node-link data, streamed one node or edge per line instead of being built up as one big dict and string
+print("Directory graph as JSON node-link data:")
+write_node_link(sys.stdout, *graph_items(G))
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# coding=utf-8
+"""Benchmark ways of loading users and their email addresses with SQLAlchemy, from slowest to fastest:
+
+- ORM per row: session.add() and session.commit() for every user, as sqlalchemy_sqlite.py does
+- ORM bulk_save_objects: Session.bulk_save_objects() for each batch of users and then their addresses
+- Core batches: bulk_load.load_users(), one executemany insert per batch
+- Core upsert: bulk_load.load_users(upsert=True) reloading users which are all already there
+
+Each method starts from empty tables.  Per-row loading is so slow that it only loads a sample of the users, which is
+enough to measure its rate.  By default the database is a SQLite file in a temporary directory, so commits really do
+go to disk - give a database URL to benchmark another database, whose users and addresses tables will be dropped.
+
+Usage: bulk_load_benchmark.py [-h] [-n COUNT] [--per-row-count COUNT] [-b BATCH_SIZE] [-a ADDRESSES] [db_url]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import sqlalchemy as sa
+import sqlalchemy.orm as sa_orm
+
+import bulk_load
+from bulk_load import Address, Base, User
+
+
+def orm_per_row(engine, records, batch_size):
+    """Add and commit one user, with their addresses, at a time."""
+    with sa_orm.Session(engine) as session:
+        for r in records:
+            session.add(User(name=r['name'], fullname=r['fullname'], password=r['password'],
+                             addresses=[Address(email_address=email) for email in r['addresses']]))
+            session.commit()
+
+
+def orm_bulk_save_objects(engine, records, batch_size):
+    """Save each batch of users with bulk_save_objects(), then their addresses once the users' ids are known."""
+    with sa_orm.Session(engine) as session:
+        for batch in bulk_load.batched(records, batch_size):
+            users = [User(name=r['name'], fullname=r['fullname'], password=r['password']) for r in batch]
+            # return_defaults fetches each new user's id, which the addresses need
+            session.bulk_save_objects(users, return_defaults=True)
+            session.bulk_save_objects([Address(email_address=email, user_id=user.id)
+                                       for user, r in zip(users, batch) for email in r['addresses']])
+            session.commit()
+
+
+def core_batches(engine, records, batch_size):
+    """Insert each batch of users and then their addresses with Core executemany."""
+    bulk_load.load_users(engine, records, batch_size)
+
+
+def core_upsert(engine, records, batch_size):
+    """Upsert each batch of users, which already exist, and replace their addresses."""
+    bulk_load.load_users(engine, records, batch_size, upsert=True)
+
+
+def time_method(engine, method, count, addresses, batch_size, preload=False):
+    """Time loading generated users into empty tables.
+
+    :param engine: SQLAlchemy engine
+    :param method: callable taking (engine, records, batch_size)
+    :param count: number of users to load
+    :param addresses: email addresses per user
+    :param batch_size: users per batch
+    :param preload: load the same users first, untimed, so that they all already exist
+    :return: seconds taken
+    """
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    if preload:
+        bulk_load.load_users(engine, bulk_load.generate_users(count, addresses), batch_size)
+    begin = time.perf_counter()
+    method(engine, bulk_load.generate_users(count, addresses), batch_size)
+    elapsed = time.perf_counter() - begin
+
+    with engine.connect() as conn:
+        loaded = conn.execute(sa.select(sa.func.count()).select_from(User.__table__)).scalar()
+    assert loaded == count, '{} loaded {} of {} users'.format(method.__name__, loaded, count)
+    return elapsed
+
+
+def format_table(results):
+    """Format (name, users, seconds) results as a table, with each method's speedup over the first."""
+    lines = ['{:<24} {:>10} {:>10} {:>12} {:>9}'.format('Method', 'Users', 'Seconds', 'Users/sec', 'Speedup')]
+    baseline = None
+    for name, users, seconds in results:
+        rate = users / seconds if seconds > 0 else float('inf')
+        if baseline is None:
+            baseline = rate
+        lines.append('{:<24} {:>10} {:>10.3f} {:>12.0f} {:>8.1f}x'.format(name, users, seconds, rate,
+                                                                         rate / baseline))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare ways of bulk loading users with SQLAlchemy')
+    parser.add_argument('db_url', nargs='?', help='database URL, by default a temporary SQLite file')
+    parser.add_argument('-n', '--count', type=int, default=50000, help='number of users for the bulk methods')
+    parser.add_argument('--per-row-count', type=int, default=1000, help='number of users to load one at a time')
+    parser.add_argument('-b', '--batch-size', type=int, default=bulk_load.DEFAULT_BATCH_SIZE, help='users per batch')
+    parser.add_argument('-a', '--addresses', type=int, default=2, help='email addresses per user')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_url = args.db_url or 'sqlite:///{}'.format(os.path.join(tmp_dir, 'benchmark.db'))
+        engine = sa.create_engine(db_url)
+        print('Loading users with {} email addresses each into {}\n'.format(args.addresses, engine.url))
+
+        methods = [
+            ('ORM per row', orm_per_row, args.per_row_count, False),
+            ('ORM bulk_save_objects', orm_bulk_save_objects, args.count, False),
+            ('Core batches', core_batches, args.count, False),
+            ('Core upsert (existing)', core_upsert, args.count, True),
+        ]
+        results = []
+        for name, method, count, preload in methods:
+            results.append((name, count, time_method(engine, method, count, args.addresses, args.batch_size,
+                                                     preload)))
+        Base.metadata.drop_all(engine)
+        engine.dispose()
+    print(format_table(results))
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,7 @@
  *
  * Implementation of the algorithm in C
  */
+#include "fibonacci.h"
 #include <stdio.h>  // printf()
 #include <stdlib.h> // atoi()
 #include <time.h>   // clock_t, clock()
@@ -20,6 +21,14 @@ int compute_fibonacci(int n)
     return a;
 }
 
+void compute_fibonacci_batch(const int *ns, int *out, size_t count)
+{
+    for (size_t i = 0; i < count; i++)
+    {
+        out[i] = compute_fibonacci(ns[i]);
+    }
+}
+
 int main(int argc, char *argv[])
 {
     // Make this volatile to prevent compiler from completely optimizing out the loop
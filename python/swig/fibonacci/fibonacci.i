@@ -5,5 +5,69 @@
  #include "fibonacci.h"
  %}
 
+#ifdef SWIGPYTHON
+/* The raw pointer version can't be called from Python, so wrap it in a function which accepts any objects supporting
+ * the buffer protocol (array.array('i'), NumPy int32 arrays, etc.) and fills the output buffer in a single C call.
+ * compute_fibonacci_batch() in the Python module below allocates the output buffer when it isn't given, the same as
+ * the CFFI and Cython batch functions. */
+%ignore compute_fibonacci_batch;
+%rename(_compute_fibonacci_batch) py_compute_fibonacci_batch;
+
+%{
+/* True if a buffer format string describes native C ints - a NULL format means unsigned bytes */
+static int is_int_format(const char *format)
+{
+    return format != NULL && (strcmp(format, "i") == 0 || strcmp(format, "@i") == 0 || strcmp(format, "=i") == 0);
+}
+%}
+
+%inline %{
+PyObject *py_compute_fibonacci_batch(PyObject *ns_obj, PyObject *out_obj)
+{
+    Py_buffer ns, out;
+    if (PyObject_GetBuffer(ns_obj, &ns, PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) < 0)
+        return NULL;
+    if (PyObject_GetBuffer(out_obj, &out, PyBUF_C_CONTIGUOUS | PyBUF_FORMAT | PyBUF_WRITABLE) < 0)
+    {
+        PyBuffer_Release(&ns);
+        return NULL;
+    }
+
+    PyObject *result = NULL;
+    if (ns.itemsize != sizeof(int) || out.itemsize != sizeof(int) || !is_int_format(ns.format) ||
+        !is_int_format(out.format))
+        PyErr_SetString(PyExc_TypeError, "buffers must contain C ints");
+    else if (out.len < ns.len)
+        PyErr_SetString(PyExc_ValueError, "output buffer is smaller than the input buffer");
+    else
+    {
+        Py_BEGIN_ALLOW_THREADS
+        compute_fibonacci_batch((const int *)ns.buf, (int *)out.buf, (size_t)(ns.len / sizeof(int)));
+        Py_END_ALLOW_THREADS
+        Py_INCREF(out_obj);
+        result = out_obj;
+    }
+
+    PyBuffer_Release(&out);
+    PyBuffer_Release(&ns);
+    return result;
+}
+%}
+
+%pythoncode %{
+import array as _array
+
+
+def compute_fibonacci_batch(ns, out=None):
+    """Compute the fibonacci number for every n in a buffer of C ints with a single call into the C library.
+
+    The results are written to out, which is allocated as an array.array('i') if not given, and out is returned.
+    """
+    if out is None:
+        out = _array.array('i', bytes(memoryview(ns).nbytes))
+    return _compute_fibonacci_batch(ns, out)
+%}
+#endif
+
 /* Parse the header file to generate wrappers */
  %include "fibonacci.h"
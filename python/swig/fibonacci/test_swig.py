@@ -5,6 +5,26 @@ in a non-recursive fashion and compare it to the pure Python implementation.
 import fibonacci
 import fib_python
 
+
+def test_batch():
+    import array
+    ns = array.array('i', [0, 1, 20])
+    out = array.array('i', [0, 0, 0])
+    assert([1, 2, 17711] == list(fibonacci.compute_fibonacci_batch(ns, out)))
+    assert([1, 2, 17711] == list(fibonacci.compute_fibonacci_batch(ns)))
+
+
+def test_batch_rejects_non_int_buffers():
+    import array
+    import pytest
+    with pytest.raises(TypeError):
+        fibonacci.compute_fibonacci_batch(array.array('f', [20.0]), array.array('i', [0]))
+    with pytest.raises(TypeError):
+        fibonacci.compute_fibonacci_batch(array.array('f', [20.0]))
+    with pytest.raises(TypeError):
+        fibonacci.compute_fibonacci_batch(array.array('i', [20]), array.array('f', [0.0]))
+
+
 if __name__ == '__main__':
     import sys
     import timeit
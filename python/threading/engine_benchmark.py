@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+Compares the thread, process and asyncio engines of thread_queue.Pipeline on CPU-bound and I/O-bound work.
+
+One producer puts a fixed number of items on the queue as fast as it can and M consumers work through them:
+- cpu: each item is a pure-Python loop, which threads and asyncio can only run one at a time because of the GIL
+- io: each item is a short sleep standing in for a network or disk wait, which every engine can overlap
+
+Expect processes to win for CPU-bound work, and threads or asyncio to win for I/O-bound work where the cost of
+starting processes and pickling items across them isn't repaid.
+
+Run with --help for the command-line options.
+"""
+import argparse
+import os
+import time
+
+from thread_queue import ENGINES, Consumer, Pipeline
+
+WORKLOADS = ('cpu', 'io')
+
+
+class WorkConsumer(Consumer):
+    """A Consumer which does a fixed amount of CPU-bound or I/O-bound work per item."""
+    def __init__(self, q, workload='cpu', cpu_iterations=100000, io_seconds=0.005, **kwargs):
+        """
+        :param q: queue to get work items from
+        :param workload: 'cpu' or 'io'
+        :param cpu_iterations: loop iterations per item for the cpu workload
+        :param io_seconds: seconds to sleep per item for the io workload
+        :param kwargs: other Consumer arguments
+        """
+        super().__init__(q, **kwargs)
+        self.workload = workload
+        self.cpu_iterations = cpu_iterations
+        self.io_seconds = io_seconds
+
+    def consume(self, item):
+        if self.workload == 'io':
+            return self.sleep(self.io_seconds)
+        total = 0
+        for i in range(self.cpu_iterations):
+            total += i * i
+        return None
+
+
+def time_engine(engine, workload, num_items, num_consumers, queue_size, **work_args):
+    """Time one engine on one workload.
+
+    :param engine: one of thread_queue.ENGINES
+    :param workload: one of WORKLOADS
+    :param num_items: number of items to produce
+    :param num_consumers: number of consumers
+    :param queue_size: maximum number of items in the queue
+    :param work_args: other WorkConsumer arguments
+    :return: dict with the engine, workload, elapsed seconds, items consumed and items per second
+    """
+    pipeline = Pipeline.create(1, num_consumers, queue_size, engine=engine, consumer_class=WorkConsumer,
+                               producer_args=dict(duration=float('inf'), max_delay=0.0, num_items=num_items,
+                                                  verbose=False),
+                               consumer_args=dict(workload=workload, verbose=False, **work_args))
+    begin = time.perf_counter()
+    pipeline.run()
+    elapsed = time.perf_counter() - begin
+    consumed = sum(c.consumed for c in pipeline.consumers)
+    return {'engine': engine, 'workload': workload, 'elapsed': elapsed, 'items': consumed,
+            'items_per_sec': consumed / elapsed if elapsed > 0 else 0.0}
+
+
+def format_table(results):
+    """Format benchmark results as a text table, marking the fastest engine for each workload with a *."""
+    best = {}
+    for r in results:
+        if r['workload'] not in best or r['elapsed'] < best[r['workload']]['elapsed']:
+            best[r['workload']] = r
+    lines = ['{:<10} {:<10} {:>10} {:>8} {:>12}'.format('workload', 'engine', 'seconds', 'items', 'items/sec')]
+    for r in results:
+        lines.append('{:<10} {:<10} {:>10.3f} {:>8} {:>12.1f}{}'.format(
+            r['workload'], r['engine'], r['elapsed'], r['items'], r['items_per_sec'],
+            ' *' if best[r['workload']] is r else ''))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare Pipeline engines on CPU-bound and I/O-bound work')
+    parser.add_argument('-n', '--num-items', type=int, default=200, help='number of items to produce')
+    parser.add_argument('-c', '--num-consumers', type=int, default=os.cpu_count() or 1, help='number of consumers')
+    parser.add_argument('-s', '--queue-size', type=int, default=100, help='maximum number of items in the queue')
+    parser.add_argument('-e', '--engine', choices=ENGINES, action='append', help='engine to time (repeatable)')
+    parser.add_argument('-w', '--workload', choices=WORKLOADS, action='append', help='workload to time (repeatable)')
+    parser.add_argument('--cpu-iterations', type=int, default=100000, help='loop iterations per cpu item')
+    parser.add_argument('--io-ms', type=float, default=5.0, help='milliseconds to sleep per io item')
+    args = parser.parse_args(argv)
+
+    results = [time_engine(engine, workload, args.num_items, args.num_consumers, args.queue_size,
+                           cpu_iterations=args.cpu_iterations, io_seconds=args.io_ms / 1000.0)
+               for workload in args.workload or WORKLOADS
+               for engine in args.engine or ENGINES]
+    print(format_table(results))
+
+
+if __name__ == '__main__':
+    main()
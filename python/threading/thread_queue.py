@@ -2,7 +2,31 @@
 # coding=utf-8
 """
 This module is a simple Producer/Consumer example of sending data between threads in a queue.
+
+The same Producer and Consumer classes can also be run by a Pipeline using one of three engines:
+- thread: threading.Thread workers sharing a queue.Queue (the default)
+- process: multiprocessing.Process workers sharing a multiprocessing.JoinableQueue, so CPU-bound consumers are not
+  serialized on the GIL
+- asyncio: asyncio tasks sharing an asyncio.Queue on a single event loop, for large numbers of I/O-bound workers
+
+Producers and consumers block on the queue rather than polling it, so idle threads use no CPU:
+- Producers block in put() while the bounded queue is full, which applies backpressure to them
+- Consumers block in get() until something is available
+- When all producers are done, one sentinel per consumer is put on the queue to tell the consumers to exit
+- Neither blocks forever if every consumer has exited early, e.g. after get_timeout - a Pipeline tells its producers
+  how many consumers are still running, and they give up rather than wait for room which will never come
+
+A BatchingConsumer can be used instead of a Consumer to take up to K items off the queue at a time, waiting up to T
+milliseconds to fill each batch, and QueueMetrics collects throughput, queue depth and enqueue-to-dequeue latency.
+
+Run with --help for the command-line options.
 """
+import argparse
+import asyncio
+import collections
+import inspect
+import logging
+import multiprocessing
 import random
 import threading
 import time
@@ -13,52 +37,611 @@ try:
 except ImportError:
     import Queue as queue
 
+logger = logging.getLogger(__name__)
+
+# Put on the queue once per consumer to tell the consumers there is nothing more to come
+SENTINEL = None
+
+# Ways in which a Pipeline can run its producers and consumers
+ENGINES = ('thread', 'process', 'asyncio')
+
 
 class Producer:
-    """A Producder puts plates of food on the table."""
-    def __init__(self):
+    """A Producer puts plates of food on the table."""
+    def __init__(self, q, duration=10.0, max_delay=1.0, put_timeout=0.5, stop_event=None, verbose=True,
+                 timestamp=False, num_items=None):
+        """
+        :param q: queue to put food on
+        :param duration: stop producing after this many seconds
+        :param max_delay: wait between 0 and this many seconds before putting more food on the table
+        :param put_timeout: how long to block in put() when the queue is full before checking whether to stop
+        :param stop_event: (optional) Event which can be set to make the producer stop early - a threading.Event,
+                           multiprocessing.Event or asyncio.Event to match the engine
+        :param verbose: print each item as it is produced
+        :param timestamp: put (time.monotonic(), item) tuples on the queue so consumers can measure latency
+        :param num_items: (optional) stop after producing this many items
+        """
+        # Set by a Pipeline to a multiprocessing.Value counting its running consumers
+        self.live_consumers = None
+        self.q = q
         self.food = ["ham", "soup", "salad"]
-        # nextTime simply randomizes the amount of time inbetween putting a new plate of food on the table
-        self.nextTime = 0
+        self.duration = duration
+        self.max_delay = max_delay
+        self.put_timeout = put_timeout
+        self.stop_event = stop_event if stop_event is not None else threading.Event()
+        self.verbose = verbose
+        self.timestamp = timestamp
+        self.num_items = num_items
+        self.produced = 0
+
+    def produce(self):
+        """Create the next item to put on the queue."""
+        return random.choice(self.food)
+
+    def consumers_gone(self):
+        """Whether every consumer has exited, so a full queue will never have room again - always False unless this
+        producer was created by a Pipeline.
+        """
+        if self.live_consumers is None or self.live_consumers.value > 0:
+            return False
+        logger.warning('Queue is full and every consumer has exited, so the producer is giving up')
+        return True
+
+    def put(self, item):
+        """Block until the item is on the queue, the producer is asked to stop or there are no consumers left.
+
+        :param item: item to put on the queue
+        :return: True if the item was queued, False if the producer was stopped or abandoned first
+        """
+        while not self.stop_event.is_set():
+            try:
+                self.q.put(item, timeout=self.put_timeout)
+                return True
+            except queue.Full:
+                # Backpressure - the consumers are behind, so keep waiting as long as there are any
+                if self.consumers_gone():
+                    break
+        return False
+
+    async def put_async(self, item):
+        """Coroutine version of put() for an asyncio.Queue."""
+        while not self.stop_event.is_set():
+            try:
+                await asyncio.wait_for(self.q.put(item), self.put_timeout)
+                return True
+            except asyncio.TimeoutError:
+                if self.consumers_gone():
+                    break
+        return False
+
+    def _keep_producing(self, deadline):
+        """Whether to produce another item - False once the deadline or item count is reached or we are stopped."""
+        if self.num_items is not None and self.produced >= self.num_items:
+            return False
+        return time.monotonic() < deadline and not self.stop_event.is_set()
 
     def run(self):
         """Thread function for Producer class - puts food in the table queue"""
-        global q
-        # Only run for up to 10 seconds
-        while time.clock() < 10:
-            if self.nextTime < time.clock():
-                f = self.food[random.randrange(len(self.food))]
-                q.put(f)
+        deadline = time.monotonic() + self.duration
+        while self._keep_producing(deadline):
+            f = self.produce()
+            if not self.put((time.monotonic(), f) if self.timestamp else f):
+                break
+            self.produced += 1
+            if self.verbose:
                 print("Adding " + f)
-                # Wait between 0.0 and 1.0 seconds before putting more food on the table
-                self.nextTime += random.random()
+            # Wait between 0.0 and max_delay seconds before putting more food on the table, waking early if stopped
+            self.stop_event.wait(random.random() * self.max_delay)
+
+    async def run_async(self):
+        """Coroutine version of run() for the asyncio engine"""
+        deadline = time.monotonic() + self.duration
+        while self._keep_producing(deadline):
+            f = self.produce()
+            if not await self.put_async((time.monotonic(), f) if self.timestamp else f):
+                break
+            self.produced += 1
+            if self.verbose:
+                print("Adding " + f)
+            # Always yields to the event loop, even with no delay, so the consumers get a turn
+            try:
+                await asyncio.wait_for(self.stop_event.wait(), random.random() * self.max_delay)
+            except asyncio.TimeoutError:
+                pass
 
 
 class Consumer:
     """A Consumer consumes plates of food on the table."""
-    def __init__(self):
-        self.nextTime = 0
+    def __init__(self, q, max_delay=2.0, get_timeout=None, verbose=True):
+        """
+        :param q: queue to get food from
+        :param max_delay: spend between 0 and this many seconds eating each plate of food
+        :param get_timeout: (optional) give up and exit if nothing arrives for this many seconds
+        :param verbose: print each item as it is consumed
+        """
+        self.q = q
+        self.max_delay = max_delay
+        self.get_timeout = get_timeout
+        self.verbose = verbose
+        self.consumed = 0
+        # Set while running under the asyncio engine
+        self.running_async = False
+
+    def sleep(self, seconds):
+        """Sleep in whichever way suits the engine - under asyncio this returns an awaitable which consume() should
+        return rather than blocking the event loop.
+        """
+        if self.running_async:
+            return asyncio.sleep(seconds)
+        time.sleep(seconds)
+
+    def consume(self, item):
+        """Process one item taken off the queue.
+
+        Under the asyncio engine, this may return an awaitable which is awaited before the next item is taken.
+        """
+        if self.verbose:
+            print("Removing " + item)
+        # Make the consumer slower than the producer, on average
+        return self.sleep(random.random() * self.max_delay)
 
     def run(self):
-        """Thread function for Consumer class - gets food from the table queue"""
-        global q
-        while time.clock() < 10:
-            if self.nextTime < time.clock() and not q.empty():
-                f = q.get()
-                print("Removing " + f)
-                # Make the consumer slower than the producer, on averge
-                self.nextTime += random.random() * 2
+        """Thread function for Consumer class - gets food from the table queue until it gets the sentinel"""
+        while True:
+            try:
+                f = self.q.get(timeout=self.get_timeout)
+            except queue.Empty:
+                break
+            try:
+                if f is SENTINEL:
+                    break
+                self.consume(f)
+                self.consumed += 1
+            finally:
+                self.q.task_done()
 
+    async def run_async(self):
+        """Coroutine version of run() for the asyncio engine"""
+        self.running_async = True
+        try:
+            while True:
+                try:
+                    f = await asyncio.wait_for(self.q.get(), self.get_timeout)
+                except asyncio.TimeoutError:
+                    break
+                try:
+                    if f is SENTINEL:
+                        break
+                    result = self.consume(f)
+                    if inspect.isawaitable(result):
+                        await result
+                    self.consumed += 1
+                finally:
+                    self.q.task_done()
+        finally:
+            self.running_async = False
+
+
+def get_batch(q, max_items, timeout=None, batch_timeout=0.0):
+    """Take up to max_items items off a queue.Queue while holding its lock once per wakeup instead of once per item.
+
+    Blocks until at least one item is available, then keeps collecting items until max_items have been taken or
+    batch_timeout seconds have passed since the first item arrived.
+
+    :param q: queue.Queue to take items from
+    :param max_items: maximum number of items to return
+    :param timeout: (optional) raise queue.Empty if no item arrives within this many seconds
+    :param batch_timeout: how long to wait for more items once the first one has arrived
+    :return: list of between 1 and max_items items
+    """
+    items = []
+    deadline = None if timeout is None else time.monotonic() + timeout
+    with q.not_empty:
+        while True:
+            available = q._qsize()
+            if available:
+                count = min(available, max_items - len(items))
+                items.extend(q._get() for _ in range(count))
+                # Wake up as many blocked producers as we just made room for
+                q.not_full.notify(count)
+                if len(items) >= max_items:
+                    break
+                if len(items) == count:
+                    # Got the first items of this batch, so now only wait as long as the batch window allows
+                    deadline = time.monotonic() + batch_timeout
+
+            if deadline is None:
+                q.not_empty.wait()
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                if items:
+                    break
+                raise queue.Empty
+            q.not_empty.wait(remaining)
+    return items
+
+
+class QueueMetrics:
+    """Thread-safe throughput, queue depth and latency statistics for consumers."""
+    def __init__(self, max_samples=100000):
+        """
+        :param max_samples: keep at most this many latency and queue depth samples to bound memory use
+        """
+        self._lock = threading.Lock()
+        self.max_samples = max_samples
+        self.start_time = time.monotonic()
+        self.items = 0
+        self.batches = 0
+        # Reservoir sample of enqueue-to-dequeue latencies in seconds
+        self._latencies = []
+        self._latencies_seen = 0
+        # Most recent (seconds since start, queue depth) samples, one per batch
+        self.depths = collections.deque(maxlen=max_samples)
+
+    def record_batch(self, latencies, depth):
+        """Record a batch taken off the queue.
+
+        :param latencies: enqueue-to-dequeue latency of each item in the batch, in seconds
+        :param depth: number of items still in the queue after the batch was taken
+        """
+        with self._lock:
+            self.items += len(latencies)
+            self.batches += 1
+            self.depths.append((time.monotonic() - self.start_time, depth))
+            for latency in latencies:
+                self._latencies_seen += 1
+                if len(self._latencies) < self.max_samples:
+                    self._latencies.append(latency)
+                else:
+                    index = random.randrange(self._latencies_seen)
+                    if index < self.max_samples:
+                        self._latencies[index] = latency
+
+    def latency_percentile(self, percentile):
+        """Return the given percentile (0-100) of the sampled latencies in seconds, or None if there are none."""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(percentile / 100.0 * (len(samples) - 1))))
+        return samples[index]
+
+    def summary(self):
+        """Return a dict summarizing everything recorded so far."""
+        elapsed = time.monotonic() - self.start_time
+        with self._lock:
+            depths = [depth for _, depth in self.depths]
+            items, batches = self.items, self.batches
+        return {
+            'items': items,
+            'batches': batches,
+            'elapsed': elapsed,
+            'items_per_sec': items / elapsed if elapsed > 0 else 0.0,
+            'mean_batch_size': items / batches if batches else 0.0,
+            'latency_p50': self.latency_percentile(50),
+            'latency_p99': self.latency_percentile(99),
+            'depth_mean': sum(depths) / len(depths) if depths else 0.0,
+            'depth_max': max(depths) if depths else 0,
+        }
+
+
+class BatchingConsumer(Consumer):
+    """A Consumer which takes whole batches of plates off the table at once."""
+    def __init__(self, q, batch_size=100, batch_timeout=0.01, metrics=None, timestamped=False, **kwargs):
+        """
+        :param q: queue.Queue to get food from
+        :param batch_size: maximum number of items per batch (K)
+        :param batch_timeout: maximum number of seconds to wait to fill a batch once it has its first item (T)
+        :param metrics: (optional) QueueMetrics to record each batch in
+        :param timestamped: items are (enqueue time, item) tuples from a Producer created with timestamp=True
+        :param kwargs: other Consumer arguments
+        """
+        super().__init__(q, **kwargs)
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+        self.metrics = metrics
+        self.timestamped = timestamped
+
+    def consume_batch(self, items):
+        """Process a batch of items taken off the queue - by default one at a time via consume()."""
+        for item in items:
+            self.consume(item)
+
+    def run(self):
+        """Thread function for BatchingConsumer class - gets batches of food until it gets the sentinel"""
+        done = False
+        while not done:
+            try:
+                batch = get_batch(self.q, self.batch_size, self.get_timeout, self.batch_timeout)
+            except queue.Empty:
+                break
+            dequeue_time = time.monotonic()
+
+            if SENTINEL in batch:
+                # Everything before our sentinel is real work, anything after it is for another consumer
+                done = True
+                index = batch.index(SENTINEL)
+                for item in batch[index + 1:]:
+                    self.q.put(item)
+                    self.q.task_done()
+                self.q.task_done()
+                batch = batch[:index]
+
+            if self.timestamped:
+                latencies = [dequeue_time - enqueue_time for enqueue_time, _ in batch]
+                batch = [item for _, item in batch]
+            else:
+                latencies = [0.0] * len(batch)
+
+            try:
+                if batch:
+                    self.consume_batch(batch)
+                    self.consumed += len(batch)
+                    if self.metrics is not None:
+                        self.metrics.record_batch(latencies, self.q.qsize())
+            finally:
+                for _ in batch:
+                    self.q.task_done()
+
+
+def _run_consumer(consumer, live_consumers):
+    """Thread target - runs a Consumer, counting it out of live_consumers however it exits."""
+    try:
+        consumer.run()
+    finally:
+        with live_consumers.get_lock():
+            live_consumers.value -= 1
+
+
+async def _run_consumer_async(consumer, live_consumers):
+    """Coroutine version of _run_consumer() for the asyncio engine"""
+    try:
+        await consumer.run_async()
+    finally:
+        with live_consumers.get_lock():
+            live_consumers.value -= 1
+
+
+def _run_in_process(worker, index, results, live_consumers=None):
+    """Process target - runs a Producer or Consumer and sends its item count back to the parent process.
+
+    :param live_consumers: (optional) multiprocessing.Value to count a Consumer out of when it exits
+    """
+    if live_consumers is None:
+        worker.run()
+    else:
+        _run_consumer(worker, live_consumers)
+    results.put((index, worker.produced if isinstance(worker, Producer) else worker.consumed))
+
+
+class Pipeline:
+    """Runs N producers and M consumers sharing one bounded queue."""
+    def __init__(self, producers, consumers, q, engine='thread'):
+        """
+        :param producers: list of Producer instances
+        :param consumers: list of Consumer instances
+        :param q: queue shared by the producers and consumers - bound its size to apply backpressure.  This must be a
+                  queue.Queue, multiprocessing.JoinableQueue or asyncio.Queue to match the engine
+        :param engine: one of ENGINES
+        """
+        if engine not in ENGINES:
+            raise ValueError('engine must be one of {}'.format(', '.join(ENGINES)))
+        self.producers = producers
+        self.consumers = consumers
+        self.q = q
+        self.engine = engine
+        self._results = None
+        # Number of consumers still running, which the producers check when the queue is full.  A shared Value works
+        # for threads, processes and asyncio tasks alike.
+        self.live_consumers = multiprocessing.Value('i', len(consumers))
+        for p in producers:
+            p.live_consumers = self.live_consumers
+        if engine == 'thread':
+            self._producer_workers = [threading.Thread(target=p.run, name='producer-{}'.format(i))
+                                      for i, p in enumerate(producers)]
+            self._consumer_workers = [threading.Thread(target=_run_consumer, args=(c, self.live_consumers),
+                                                       name='consumer-{}'.format(i))
+                                      for i, c in enumerate(consumers)]
+        elif engine == 'process':
+            # Each process works on its own copy of its Producer or Consumer, so the counts are sent back separately
+            self._results = multiprocessing.Queue()
+            self._producer_workers = [multiprocessing.Process(target=_run_in_process, args=(p, i, self._results),
+                                                              name='producer-{}'.format(i))
+                                      for i, p in enumerate(producers)]
+            self._consumer_workers = [multiprocessing.Process(target=_run_in_process,
+                                                              args=(c, len(producers) + i, self._results,
+                                                                    self.live_consumers),
+                                                              name='consumer-{}'.format(i))
+                                      for i, c in enumerate(consumers)]
+        else:
+            # Tasks can only be created once the event loop is running
+            self._producer_workers = []
+            self._consumer_workers = []
+
+    @classmethod
+    def create(cls, num_producers=1, num_consumers=1, maxsize=10, producer_args=None, consumer_args=None,
+               batch_size=None, batch_timeout=0.01, metrics=None, engine='thread', consumer_class=None):
+        """Build a pipeline of identical producers and consumers around a new bounded queue.
+
+        :param num_producers: number of Producer workers
+        :param num_consumers: number of Consumer workers
+        :param maxsize: maximum number of items in the queue, 0 for unbounded
+        :param producer_args: (optional) dict of keyword arguments for each Producer
+        :param consumer_args: (optional) dict of keyword arguments for each Consumer
+        :param batch_size: (optional) use BatchingConsumers taking up to this many items at a time
+        :param batch_timeout: seconds each BatchingConsumer waits to fill a batch
+        :param metrics: (optional) QueueMetrics the BatchingConsumers record to; producers then timestamp each item
+        :param engine: one of ENGINES - batching and metrics are only supported by the thread engine
+        :param consumer_class: (optional) Consumer subclass to use instead of Consumer or BatchingConsumer
+        :return: Pipeline
+        """
+        batching = batch_size is not None or metrics is not None
+        if engine == 'thread':
+            q = queue.Queue(maxsize)
+            stop_event = threading.Event()
+        elif batching:
+            raise ValueError('batching consumers and metrics need the thread engine')
+        elif engine == 'process':
+            q = multiprocessing.JoinableQueue(maxsize)
+            stop_event = multiprocessing.Event()
+        elif engine == 'asyncio':
+            q = asyncio.Queue(maxsize)
+            stop_event = asyncio.Event()
+        else:
+            raise ValueError('engine must be one of {}'.format(', '.join(ENGINES)))
+
+        timestamp = metrics is not None
+        producers = [Producer(q, stop_event=stop_event, timestamp=timestamp, **(producer_args or {}))
+                     for _ in range(num_producers)]
+        if consumer_class is None:
+            consumer_class = BatchingConsumer if batching else Consumer
+        if batching:
+            consumers = [consumer_class(q, batch_size=batch_size or 1, batch_timeout=batch_timeout, metrics=metrics,
+                                        timestamped=timestamp, **(consumer_args or {}))
+                         for _ in range(num_consumers)]
+        else:
+            consumers = [consumer_class(q, **(consumer_args or {})) for _ in range(num_consumers)]
+        return cls(producers, consumers, q, engine)
+
+    def start(self):
+        if self.engine == 'asyncio':
+            raise RuntimeError('use run() or run_async() with the asyncio engine')
+        for w in self._consumer_workers + self._producer_workers:
+            w.start()
+
+    def stop(self):
+        """Ask the producers to stop early - the consumers still finish whatever is already queued."""
+        for p in self.producers:
+            p.stop_event.set()
+
+    def join(self, put_timeout=0.5):
+        """Wait for the producers to finish, then shut the consumers down with one sentinel each.
+
+        :param put_timeout: how long to block putting each sentinel on a full queue before checking whether any
+                            consumers are left to take it
+        """
+        for w in self._producer_workers:
+            w.join()
+        for _ in self._consumer_workers:
+            if not self._put_sentinel(put_timeout):
+                logger.warning('Queue is full and every consumer has exited, so not all sentinels were sent')
+                break
+        for w in self._consumer_workers:
+            w.join()
+        if self.engine == 'process':
+            self._collect_counts()
+
+    def _put_sentinel(self, put_timeout):
+        """Put one sentinel on the queue - unlike Producer.put(), this must not give up while any consumer is running,
+        or that consumer would never exit.
+
+        :param put_timeout: how long to block on a full queue before checking whether any consumers are left
+        :return: True if the sentinel was queued, False if the queue is full and there are no consumers to empty it
+        """
+        while True:
+            try:
+                self.q.put(SENTINEL, timeout=put_timeout)
+                return True
+            except queue.Full:
+                if not any(w.is_alive() for w in self._consumer_workers):
+                    return False
+
+    async def _put_sentinel_async(self, put_timeout):
+        """Coroutine version of _put_sentinel() for an asyncio.Queue."""
+        while True:
+            try:
+                await asyncio.wait_for(self.q.put(SENTINEL), put_timeout)
+                return True
+            except asyncio.TimeoutError:
+                if all(w.done() for w in self._consumer_workers):
+                    return False
+
+    def _collect_counts(self):
+        """Copy the item counts reported by the worker processes onto the parent's Producers and Consumers."""
+        workers = self.producers + self.consumers
+        for _ in workers:
+            try:
+                index, count = self._results.get(timeout=1.0)
+            except queue.Empty:
+                # A worker process died without reporting, e.g. after a KeyboardInterrupt
+                break
+            if index < len(self.producers):
+                workers[index].produced = count
+            else:
+                workers[index].consumed = count
+
+    async def run_async(self):
+        """Run the whole pipeline on the current event loop - asyncio engine only."""
+        if self.engine != 'asyncio':
+            raise RuntimeError('run_async() needs the asyncio engine')
+        self._consumer_workers = [asyncio.ensure_future(_run_consumer_async(c, self.live_consumers))
+                                  for c in self.consumers]
+        self._producer_workers = [asyncio.ensure_future(p.run_async()) for p in self.producers]
+        await asyncio.gather(*self._producer_workers)
+        for _ in self._consumer_workers:
+            if not await self._put_sentinel_async(0.5):
+                logger.warning('Queue is full and every consumer has exited, so not all sentinels were sent')
+                break
+        await asyncio.gather(*self._consumer_workers)
+
+    def run(self):
+        if self.engine == 'asyncio':
+            try:
+                asyncio.run(self.run_async())
+            except KeyboardInterrupt:
+                # asyncio.run() has already cancelled the producer and consumer tasks
+                pass
+            return
+
+        self.start()
+        try:
+            self.join()
+        except KeyboardInterrupt:
+            self.stop()
+            self.join()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Producer/Consumer example using a bounded queue')
+    parser.add_argument('num_producers', nargs='?', type=int, default=1, help='number of producers')
+    parser.add_argument('num_consumers', nargs='?', type=int, default=1, help='number of consumers')
+    parser.add_argument('queue_size', nargs='?', type=int, default=10, help='maximum number of items in the queue')
+    parser.add_argument('-d', '--duration', type=float, default=10.0, help='seconds to keep producing for')
+    parser.add_argument('--producer-delay', type=float, default=1.0, help='max seconds between produced items')
+    parser.add_argument('--consumer-delay', type=float, default=2.0, help='max seconds spent consuming each item')
+    parser.add_argument('-b', '--batch-size', type=int, help='consume up to this many items at a time (K)')
+    parser.add_argument('-t', '--batch-ms', type=float, default=10.0,
+                        help='milliseconds to wait to fill a batch (T), used with --batch-size')
+    parser.add_argument('-m', '--metrics', action='store_true', help='report throughput, queue depth and latency')
+    parser.add_argument('-e', '--engine', choices=ENGINES, default='thread',
+                        help='run the producers and consumers as threads, processes or asyncio tasks')
+    parser.add_argument('-q', '--quiet', action='store_true', help="don't print every item")
+    args = parser.parse_args(argv)
+
+    metrics = QueueMetrics() if args.metrics else None
+    verbose = not args.quiet
 
-if __name__ == '__main__':
     # FIFO queue representing the order in which food is placed on the table
-    q = queue.Queue(10)
+    pipeline = Pipeline.create(args.num_producers, args.num_consumers, args.queue_size,
+                               producer_args=dict(duration=args.duration, max_delay=args.producer_delay,
+                                                  verbose=verbose),
+                               consumer_args=dict(max_delay=args.consumer_delay, verbose=verbose),
+                               batch_size=args.batch_size, batch_timeout=args.batch_ms / 1000.0, metrics=metrics,
+                               engine=args.engine)
+    pipeline.run()
 
-    p = Producer()
-    c = Consumer()
+    print("Produced {} and consumed {} plates of food".format(sum(p.produced for p in pipeline.producers),
+                                                            sum(c.consumed for c in pipeline.consumers)))
+    if metrics is not None:
+        summary = metrics.summary()
+        print("Throughput:       {:.1f} items/sec over {:.2f} s".format(summary['items_per_sec'], summary['elapsed']))
+        print("Batches:          {} (mean size {:.1f})".format(summary['batches'], summary['mean_batch_size']))
+        print("Queue depth:      mean {:.1f}, max {}".format(summary['depth_mean'], summary['depth_max']))
+        if summary['latency_p50'] is not None:
+            print("Latency:          p50 {:.3g} ms, p99 {:.3g} ms".format(summary['latency_p50'] * 1000,
+                                                                         summary['latency_p99'] * 1000))
 
-    pt = threading.Thread(target=p.run, args=())
-    ct = threading.Thread(target=c.run, args=())
 
-    pt.start()
-    ct.start()
+if __name__ == '__main__':
+    main()